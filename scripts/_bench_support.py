@@ -0,0 +1,237 @@
+"""
+Shared helpers for the local benchmark scripts.
+
+- Synthetic registration sheets with the real Vietnamese headers (HEADER_MAP)
+- A MongoManager bound to a local mongod or an in-process mongomock stand-in
+- Round-trip counting around the Mongo collections
+- A local aiohttp server standing in for the Google Sheets / Drive APIs
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import random
+import re
+import sys
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # add project root to path
+
+from src.utils.mongo import MongoManager  # noqa: E402
+from src.utils.sheets import HEADER_MAP  # noqa: E402
+
+
+FAMILY_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ", "Hồ", "Ngô", "Dương"]
+MIDDLE_NAMES = ["Văn", "Thị", "Minh", "Ngọc", "Quốc", "Thanh", "Hoàng", "Gia", "Bảo", "Đức", "Thu", "Hữu"]
+GIVEN_NAMES = ["An", "Bình", "Châu", "Dũng", "Giang", "Hà", "Hải", "Hạnh", "Huy", "Khánh", "Linh", "Long", "Mai", "Nam", "Nhi", "Phúc", "Quân", "Quỳnh", "Sơn", "Tâm", "Thảo", "Trang", "Tú", "Uyên", "Vy", "Yến"]
+SCHOOLS = [
+    "Trường Đại học Công nghệ Thông tin",
+    "Trường Đại học Bách Khoa",
+    "Trường Đại học Khoa học Tự nhiên",
+    "Trường Đại học Khoa học Xã hội và Nhân văn",
+    "Trường Đại học Quốc tế",
+    "Trường Đại học Kinh tế - Luật",
+]
+FACULTIES = ["Khoa học Máy tính", "Kỹ thuật Phần mềm", "Hệ thống Thông tin", "Điện - Điện tử", "Cơ khí", "Hóa học", "Vật lý", "Ngữ văn", "Kinh tế", "Luật"]
+TEAM_WORDS = ["Rồng", "Phượng", "Sao", "Biển", "Núi", "Gió", "Lửa", "Mây", "Sông", "Trăng"]
+
+
+def generate_sheet_values(rows: int, team_size: int = 5, seed: int = 2025) -> List[List[str]]:
+    """Build a `values` payload (header row + data rows) like the Sheets API returns."""
+    rng = random.Random(seed)
+    headers = list(HEADER_MAP.keys())
+    values: List[List[str]] = [headers]
+    for i in range(rows):
+        team_no = i // team_size + 1
+        full_name = f"{rng.choice(FAMILY_NAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(GIVEN_NAMES)}"
+        mssv = f"2{rng.randint(2, 5)}{520000 + i:06d}"
+        row = [
+            str(i + 1),
+            f"Đội {TEAM_WORDS[team_no % len(TEAM_WORDS)]} {team_no}",
+            f"T{team_no:04d}",
+            mssv,
+            full_name,
+            f"https://facebook.com/{mssv}",
+            rng.choice(SCHOOLS),
+            rng.choice(FACULTIES),
+            f"{mssv}@gm.uit.edu.vn",
+            f"09{rng.randint(10000000, 99999999)}",
+        ]
+        # The API trims trailing empty cells, mimic a few sparse rows
+        if rng.random() < 0.05:
+            row = row[:8]
+        values.append(row)
+    return values
+
+
+def sheet_payload(values: List[List[str]], range_name: str = "A1:K") -> bytes:
+    return json.dumps(
+        {"range": f"Sheet1!{range_name}", "majorDimension": "ROWS", "values": values},
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+# ----- Mongo -----
+class RoundTripCounter:
+    def __init__(self):
+        self.total = 0
+        self.by_op: Dict[str, int] = {}
+
+    def hit(self, op: str):
+        self.total += 1
+        self.by_op[op] = self.by_op.get(op, 0) + 1
+
+    def reset(self):
+        self.total = 0
+        self.by_op.clear()
+
+
+class CountingCollection:
+    """Proxy around a pymongo/mongomock collection counting server round trips."""
+
+    OPS = {
+        "find", "find_one", "insert_one", "insert_many", "update_one", "update_many",
+        "replace_one", "delete_one", "delete_many", "bulk_write", "count_documents",
+        "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+        "aggregate", "distinct", "create_index",
+    }
+
+    def __init__(self, collection: Any, counter: RoundTripCounter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if name not in self.OPS or not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            self._counter.hit(name)
+            return attr(*args, **kwargs)
+
+        return wrapper
+
+
+def make_mongo(uri: Optional[str], db_name: Optional[str] = None) -> tuple[MongoManager, RoundTripCounter]:
+    """MongoManager on a throwaway database plus its round-trip counter.
+
+    Uses the given mongod URI, otherwise an in-process mongomock client.
+    """
+    db_name = db_name or f"vnutour_bench_{uuid.uuid4().hex[:8]}"
+    if uri:
+        mongo = MongoManager(uri, db_name)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("Cần --mongo-uri tới mongod local hoặc `pip install mongomock`.")
+        mongo = MongoManager(None, db_name, client=mongomock.MongoClient())
+
+    counter = RoundTripCounter()
+    mongo.participants = CountingCollection(mongo.participants, counter)
+    mongo.teams = CountingCollection(mongo.teams, counter)
+    mongo.meta = CountingCollection(mongo.meta, counter)
+    return mongo, counter
+
+
+def drop_mongo(mongo: MongoManager):
+    try:
+        mongo.client.drop_database(mongo.db_name)
+    except Exception:
+        pass
+    mongo.close()
+
+
+# ----- Sheets API stand-in -----
+class SheetsStandIn:
+    """Local aiohttp server standing in for the Sheets and Drive APIs.
+
+    Serves `values/{range}`, `values:batchGet` over row windows, the grid
+    row count and the Drive `files/{id}` revision metadata, gzip-compressed
+    when the client asks. Like the real API, ranges past the grid are a 400.
+    """
+
+    _A1 = re.compile(r"^(?:.+!)?[A-Z]+(\d+):[A-Z]+(\d*)$")
+
+    def __init__(self, payload: bytes = b"{}", values: Optional[List[List[str]]] = None, revision: int = 1):
+        self.payload = payload
+        self.values = values
+        self.revision = revision
+        # A new sheet has 1000 rows; the grid grows with the data
+        self.grid_rows = max(1000, len(values or []))
+        self.requests = 0
+        self.bytes_sent = 0
+        self._runner = None
+        self.base_url = ""
+        self.drive_base_url = ""
+
+    def _respond(self, request, body: bytes):
+        from aiohttp import web
+
+        self.requests += 1
+        resp = web.Response(body=body, content_type="application/json")
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            resp = web.Response(body=body, content_type="application/json", headers={"Content-Encoding": "gzip"})
+        self.bytes_sent += len(body)
+        return resp
+
+    async def _values(self, request):
+        return self._respond(request, self.payload)
+
+    async def _spreadsheet(self, request):
+        props = {"title": "Sheet1", "gridProperties": {"rowCount": self.grid_rows}}
+        body = json.dumps({"sheets": [{"properties": props}]}).encode("utf-8")
+        return self._respond(request, body)
+
+    async def _batch_get(self, request):
+        from aiohttp import web
+
+        value_ranges = []
+        for r in request.query.getall("ranges", []):
+            m = self._A1.match(r)
+            if m and m.group(2) and int(m.group(2)) > self.grid_rows:
+                self.requests += 1
+                return web.json_response({"error": {"code": 400, "message": f"Range ({r}) exceeds grid limits"}}, status=400)
+            entry: Dict[str, Any] = {"range": r, "majorDimension": "ROWS"}
+            if m and self.values is not None:
+                start = int(m.group(1))
+                end = int(m.group(2)) if m.group(2) else len(self.values)
+                rows = self.values[start - 1:end]
+                if rows:
+                    entry["values"] = rows
+            value_ranges.append(entry)
+        body = json.dumps({"valueRanges": value_ranges}, ensure_ascii=False).encode("utf-8")
+        return self._respond(request, body)
+
+    async def _drive_file(self, request):
+        body = json.dumps({"version": str(self.revision)}).encode("utf-8")
+        return self._respond(request, body)
+
+    async def start(self) -> str:
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/v4/spreadsheets/{sheet_id}/values:batchGet", self._batch_get)
+        app.router.add_get("/v4/spreadsheets/{sheet_id}/values/{range_name}", self._values)
+        app.router.add_get("/v4/spreadsheets/{sheet_id}", self._spreadsheet)
+        app.router.add_get("/drive/v3/files/{sheet_id}", self._drive_file)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}/v4"
+        self.drive_base_url = f"http://127.0.0.1:{port}/drive/v3"
+        return self.base_url
+
+    def reset_counters(self):
+        self.requests = 0
+        self.bytes_sent = 0
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
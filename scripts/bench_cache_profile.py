@@ -0,0 +1,189 @@
+"""
+Startup time and memory of the gateway cache profiles (CACHE_PROFILE).
+
+Usage:
+  python scripts/bench_cache_profile.py [--members 5000] [--participants 1000]
+                                        [--messages 20000] [--profiles full,event]
+
+No Discord connection is made. For every profile a fresh interpreter builds
+the discord.py client with BotConfig.client_options() and feeds its
+ConnectionState synthetic gateway payloads:
+
+  - GUILD_CREATE for one guild, then every member cached the way startup
+    chunking does when the profile chunks, or only the participants held by
+    MemberResolver when it does not
+  - --messages MESSAGE_CREATE events spread over the guild's members
+
+The report shows the RSS growth, tracemalloc retained size, cached members
+and messages, enabled intents and the time spent processing the payloads.
+Set LOG_CHANNEL_ID to size the event profile's message cache for logging.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # add project root to path
+
+GUILD_ID = 900000000000000000
+CHANNEL_ID = GUILD_ID + 1
+USER_BASE = 100000000000000000
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/status", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def user_payload(i: int) -> Dict[str, Any]:
+    return {
+        "id": str(USER_BASE + i),
+        "username": f"user{i}",
+        "global_name": f"Người dùng {i}",
+        "discriminator": "0",
+        "avatar": None,
+    }
+
+
+def member_payload(i: int, joined_at: str) -> Dict[str, Any]:
+    return {"user": user_payload(i), "roles": [], "joined_at": joined_at, "nick": None, "deaf": False, "mute": False, "flags": 0}
+
+
+def guild_payload(members: int) -> Dict[str, Any]:
+    return {
+        "id": str(GUILD_ID),
+        "name": "Bench Guild",
+        "owner_id": str(USER_BASE),
+        "member_count": members,
+        "large": members > 250,
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "members": [],
+        "voice_states": [],
+        "presences": [],
+        "threads": [],
+        "stage_instances": [],
+        "guild_scheduled_events": [],
+        "roles": [{
+            "id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0,
+        }],
+        "channels": [{
+            "id": str(CHANNEL_ID), "type": 0, "name": "general", "position": 0, "permission_overwrites": [],
+        }],
+    }
+
+
+def run_profile(args) -> Dict[str, Any]:
+    os.environ.setdefault("DISCORD_TOKEN", "bench")
+    os.environ["CACHE_PROFILE"] = args.profile
+    import discord
+    from src.bot.config import BotConfig
+
+    config = BotConfig()
+    options = config.client_options()
+    joined_at = datetime.now(timezone.utc).isoformat()
+
+    async def feed() -> Dict[str, Any]:
+        client = discord.Client(**options)
+        state = client._connection
+        state.user = discord.ClientUser(state=state, data=user_payload(0))
+        kept: List[Any] = []  # stands in for MemberResolver's participant map
+
+        base_rss = rss_bytes()
+        tracemalloc.start()
+        started = time.perf_counter()
+
+        guild = state._add_guild_from_data(guild_payload(args.members))
+        if options["chunk_guilds_at_startup"]:
+            # What the startup ChunkRequest(cache=True) does with each GUILD_MEMBERS_CHUNK
+            for n in range(args.members):
+                guild._add_member(discord.Member(data=member_payload(n, joined_at), guild=guild, state=state))
+        else:
+            for n in range(args.participants):
+                kept.append(discord.Member(data=member_payload(n, joined_at), guild=guild, state=state))
+        loaded = time.perf_counter() - started
+
+        for n in range(args.messages):
+            author = n % args.members
+            state.parse_message_create({
+                "id": str(GUILD_ID + 10 + n), "channel_id": str(CHANNEL_ID), "guild_id": str(GUILD_ID),
+                "author": user_payload(author),
+                "member": {k: v for k, v in member_payload(author, joined_at).items() if k != "user"},
+                "content": f"Tin nhắn thử nghiệm số {n} " + "x" * 40,
+                "timestamp": joined_at, "edited_timestamp": None, "tts": False, "mention_everyone": False,
+                "mentions": [], "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0,
+            })
+        elapsed = time.perf_counter() - started
+
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        cached_members = len(guild._members)
+        cached_messages = len(state._messages) if state._messages is not None else 0
+        result = {
+            "profile": args.profile,
+            "intents": sum(1 for _, on in options["intents"] if on),
+            "chunk": options["chunk_guilds_at_startup"],
+            "max_messages": options["max_messages"],
+            "members_cached": cached_members + len(kept),
+            "messages_cached": cached_messages,
+            "load_s": round(loaded, 3),
+            "total_s": round(elapsed, 3),
+            "rss_mib": round((rss_bytes() - base_rss) / 2**20, 1),
+            "traced_mib": round(retained / 2**20, 1),
+        }
+        await client.close()
+        return result
+
+    return asyncio.run(feed())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare gateway cache profiles")
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--participants", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--profiles", default="full,event")
+    parser.add_argument("--profile", help=argparse.SUPPRESS)  # child process mode
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run_profile(args)))
+        return
+
+    rows = []
+    for profile in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+        cmd = [
+            sys.executable, __file__, "--profile", profile, "--members", str(args.members),
+            "--participants", str(args.participants), "--messages", str(args.messages),
+        ]
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        rows.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"Guild: {args.members} members, {args.participants} participants, {args.messages} messages")
+    header = f"{'profile':<8} {'intents':>7} {'chunk':>5} {'max_msg':>7} {'members':>8} {'msgs':>6} {'load s':>7} {'total s':>7} {'RSS MiB':>8} {'traced MiB':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['profile']:<8} {r['intents']:>7} {str(r['chunk']):>5} {str(r['max_messages']):>7} "
+            f"{r['members_cached']:>8} {r['messages_cached']:>6} {r['load_s']:>7} {r['total_s']:>7} "
+            f"{r['rss_mib']:>8} {r['traced_mib']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
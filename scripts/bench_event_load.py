@@ -0,0 +1,719 @@
+"""
+Event-day load rehearsal: command events replayed into VnuTourBot.
+
+Usage:
+  python scripts/bench_event_load.py [--rate 200] [--duration 30]
+                                     [--mix "/assign=3,/check=3,!checkin=2,!checkout=1,!play=1"]
+                                     [--participants 2000] [--users 2000] [--channels 20]
+                                     [--api-latency 0.08] [--search-latency 1.5] [--songs 200]
+                                     [--mongo-uri mongodb://localhost:27017] [--no-directory]
+                                     [--replay events.jsonl] [--speed 1.0] [--save-events PATH]
+                                     [--json report.json] [--max-p95-ms 2000] [--max-error-rate 0.01]
+
+No Discord connection is made. The bot is constructed and its feature
+extensions loaded the way setup_hook does, then:
+
+  - MESSAGE_CREATE and INTERACTION_CREATE payloads go through discord.py's
+    ConnectionState, so the bot's event handlers, prefix commands and the
+    slash command tree all run as in production
+  - a fake transport answers the REST and interaction webhook calls after
+    ~--api-latency seconds and echoes the bot's channel messages back as
+    MESSAGE_CREATE (Discord rate limits are not modelled; spread the load
+    over --channels text channels)
+  - the participants live in a MongoDB stand-in (mongomock, or a throwaway
+    database on --mongo-uri) and are loaded into the participant directory
+    as at startup; --no-directory measures the MongoDB fallback instead
+  - !play and /play run against a voice client that always has a track
+    playing, and yt-dlp is replaced by an extractor holding an executor
+    thread for --search-latency seconds: search, queue and reply are
+    measured, audio decoding is not
+
+Events arrive open loop (Poisson, --rate per second for --duration seconds,
+weighted by --mix), or at the offsets recorded in a --replay file with one
+JSON object per line:
+
+  {"at": 0.004, "user": 17, "channel": 2, "content": "!checkin 3 Đội Sao 4"}
+  {"at": 0.009, "user": 4, "command": "assign", "options": {"mssv": "22520004"}}
+
+`user` and `channel` index the synthetic members and text channels.
+--save-events writes the synthetic schedule in the same format.
+
+Per command the report shows throughput, latency percentiles (until the
+command finished, and until its first Discord call, which for slash commands
+must land within Discord's 3 s deadline), ❌ replies, errors (uncaught
+exceptions and commands still running --drain seconds after the last event)
+and Discord calls per event; then event-loop lag, service timings and MongoDB
+round trips. With --max-p95-ms / --max-error-rate the run exits with status 1
+when any command exceeds them.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from _bench_support import drop_mongo, generate_sheet_values, make_mongo  # noqa: E402
+from src.utils.sheets import values_to_rows  # noqa: E402
+
+GUILD_ID = 900000000000000000
+VOICE_CHANNEL_ID = GUILD_ID + 1
+CHANNEL_BASE = GUILD_ID + 100
+USER_BASE = 100000000000000000
+BOT_ID = USER_BASE - 1
+STATIONS = 10
+
+DEFAULT_MIX = "/assign=3,/check=3,!checkin=2,!checkout=1,!play=1"
+
+_ids = itertools.count(GUILD_ID + 1_000_000)
+
+# Event being handled: tasks created while it is fed inherit it, so Discord
+# calls and command completions are attributed without matching IDs
+current_event: contextvars.ContextVar[Optional["EventRecord"]] = contextvars.ContextVar("current_event", default=None)
+
+
+# ----- Gateway payloads -----
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def user_payload(user_id: int, name: str, bot: bool = False) -> Dict[str, Any]:
+    return {"id": str(user_id), "username": name, "global_name": name, "discriminator": "0", "avatar": None, "bot": bot}
+
+
+def member_payload(user: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    data = {"roles": [], "joined_at": now_iso(), "nick": None, "deaf": False, "mute": False, "flags": 0}
+    if user is not None:
+        data["user"] = user
+    return data
+
+
+def member_user(i: int) -> Dict[str, Any]:
+    return user_payload(USER_BASE + i, f"user{i}")
+
+
+def text_channel_payload(k: int) -> Dict[str, Any]:
+    return {"id": str(CHANNEL_BASE + k), "type": 0, "name": f"kenh-{k}", "position": k, "permission_overwrites": [], "guild_id": str(GUILD_ID)}
+
+
+def guild_payload(users: int, channels: int) -> Dict[str, Any]:
+    return {
+        "id": str(GUILD_ID),
+        "name": "Bench Guild",
+        "owner_id": str(USER_BASE),
+        "member_count": users + 1,
+        "large": users > 250,
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "members": [],
+        "presences": [],
+        "threads": [],
+        "stage_instances": [],
+        "guild_scheduled_events": [],
+        "roles": [{
+            "id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0,
+        }],
+        "channels": [text_channel_payload(k) for k in range(channels)] + [{
+            "id": str(VOICE_CHANNEL_ID), "type": 2, "name": "Âm nhạc", "position": channels,
+            "permission_overwrites": [], "bitrate": 64000, "user_limit": 0,
+        }],
+        # Everyone is in the music channel, so any member may !play
+        "voice_states": [{
+            "user_id": str(USER_BASE + i), "channel_id": str(VOICE_CHANNEL_ID), "session_id": f"s{i}",
+            "deaf": False, "mute": False, "self_deaf": False, "self_mute": False, "self_video": False,
+            "suppress": False, "request_to_speak_timestamp": None,
+        } for i in range(users)],
+    }
+
+
+def message_payload(channel_id: int, author: Dict[str, Any], content: str = "", embeds: Optional[List[Any]] = None,
+                    message_id: Optional[int] = None, guild: bool = True, flags: int = 0) -> Dict[str, Any]:
+    data = {
+        "id": str(message_id or next(_ids)), "channel_id": str(channel_id), "author": author,
+        "content": content or "", "timestamp": now_iso(), "edited_timestamp": None, "tts": False,
+        "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+        "embeds": embeds or [], "components": [], "pinned": False, "type": 0, "flags": flags,
+    }
+    if guild:
+        data["guild_id"] = str(GUILD_ID)
+        data["member"] = member_payload()
+    return data
+
+
+def option_payload(name: str, value: Any) -> Dict[str, Any]:
+    kind = 5 if isinstance(value, bool) else 4 if isinstance(value, int) else 3
+    return {"name": name, "type": kind, "value": value}
+
+
+def interaction_payload(name: str, options: Dict[str, Any], user: Dict[str, Any], channel_id: int) -> Dict[str, Any]:
+    interaction_id = next(_ids)
+    return {
+        "id": str(interaction_id),
+        "application_id": str(BOT_ID),
+        "type": 2,
+        "token": f"bench-{interaction_id}",
+        "version": 1,
+        "guild_id": str(GUILD_ID),
+        "channel_id": str(channel_id),
+        "channel": text_channel_payload(channel_id - CHANNEL_BASE),
+        "member": dict(member_payload(user), permissions="0"),
+        "data": {
+            "id": str(BOT_ID + 1), "name": name, "type": 1, "guild_id": str(GUILD_ID),
+            "options": [option_payload(k, v) for k, v in options.items()],
+        },
+        "locale": "vi",
+        "guild_locale": "vi",
+        "app_permissions": "0",
+        "entitlements": [],
+        "attachment_size_limit": 10 * 2**20,
+        "authorizing_integration_owners": {"0": str(GUILD_ID)},
+        "context": 0,
+    }
+
+
+# ----- Measurement -----
+class EventRecord:
+    __slots__ = ("name", "channel_id", "started", "first_call", "finished", "error", "refused", "calls")
+
+    def __init__(self, name: str, channel_id: int):
+        self.name = name
+        self.channel_id = channel_id
+        self.started = time.perf_counter()
+        self.first_call: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+        self.refused = False
+        self.calls = 0
+
+    def called(self, payload: Optional[Dict[str, Any]]):
+        self.calls += 1
+        if self.first_call is None:
+            self.first_call = time.perf_counter()
+        if payload and is_refusal(payload):
+            self.refused = True
+
+    def finish(self, error: Optional[BaseException] = None):
+        if self.finished is not None:
+            return
+        self.finished = time.perf_counter()
+        if error is None:
+            return
+        # Bad input and unknown or forbidden commands are the user's mistake
+        from discord import app_commands
+        from discord.ext import commands
+        if isinstance(error, (commands.UserInputError, commands.CommandNotFound, commands.CheckFailure,
+                              app_commands.CommandNotFound, app_commands.CheckFailure)):
+            self.refused = True
+        else:
+            self.error = f"{type(error).__name__}: {error}"
+
+
+def is_refusal(payload: Dict[str, Any]) -> bool:
+    """A reply reporting a failure (the commands' "❌ ..." / "Lỗi: ..." messages)."""
+    data = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+    texts = [data.get("content") or ""] + [(e or {}).get("title") or "" for e in data.get("embeds") or []]
+    return any(t.lstrip("*").startswith(("❌", "Lỗi")) for t in texts)
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class LoopLagMonitor:
+    """How late the event loop wakes a task that asked to sleep INTERVAL seconds."""
+
+    INTERVAL = 0.05
+
+    def __init__(self):
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.INTERVAL)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.INTERVAL))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+
+# ----- Discord stand-ins -----
+class FakeTransport:
+    """Answers the bot's REST and interaction webhook calls after a simulated round trip."""
+
+    def __init__(self, state, bot_user: Dict[str, Any], latency: float, seed: int):
+        self.state = state
+        self.bot_user = bot_user
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.by_route: Dict[str, int] = {}
+        self.unattributed = 0
+
+    async def request(self, route, **kwargs) -> Any:
+        payload = kwargs.get("json") or kwargs.get("payload")
+        key = f"{route.method} {route.path}"
+        self.by_route[key] = self.by_route.get(key, 0) + 1
+        record = current_event.get()
+        if record is not None:
+            record.called(payload)
+        else:
+            self.unattributed += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        return self._respond(route, payload or {}, record)
+
+    def _respond(self, route, payload: Dict[str, Any], record: Optional[EventRecord]) -> Any:
+        path = route.path
+        if path == "/users/@me/channels":
+            recipient = int(payload["recipient_id"])
+            return {"id": str(next(_ids)), "type": 1, "recipients": [user_payload(recipient, f"user{recipient - USER_BASE}")]}
+
+        channel_id = route.channel_id or (record.channel_id if record else CHANNEL_BASE)
+        if path.endswith("/callback"):
+            # Interaction response; the message exists for types 4 (message) and 7 (update)
+            data = payload.get("data") or {}
+            flags = data.get("flags") or 0
+            message = message_payload(channel_id, self.bot_user, data.get("content"), data.get("embeds"), flags=flags)
+            result = {"interaction": {
+                "id": str(route.webhook_id), "type": 2, "response_message_id": message["id"],
+                "response_message_loading": payload.get("type") == 5, "response_message_ephemeral": bool(flags & 64),
+            }}
+            if payload.get("type") in (4, 7):
+                result["resource"] = {"type": payload["type"], "message": message}
+            return result
+
+        if path.startswith("/webhooks/") and route.method in ("GET", "POST", "PATCH"):
+            # Follow-ups, fetches and edits of the original response
+            return message_payload(channel_id, self.bot_user, payload.get("content"), payload.get("embeds"), flags=payload.get("flags") or 0)
+
+        if path.startswith("/channels/{channel_id}/messages") and route.method in ("POST", "PATCH"):
+            message_id = int(route.url.rsplit("/", 1)[1]) if route.method == "PATCH" else None
+            guild = self.state._get_guild_channel({"channel_id": channel_id})[0].__class__.__name__ != "DMChannel"
+            message = message_payload(channel_id, self.bot_user, payload.get("content"), payload.get("embeds"), message_id, guild=guild)
+            if route.method == "POST" and guild:
+                # What the gateway sends back for the bot's own message
+                self.state.parse_message_create(dict(message))
+            return message
+        return None
+
+
+def make_webhook_adapter(transport: FakeTransport):
+    from discord.webhook.async_ import AsyncWebhookAdapter
+
+    class FakeWebhookAdapter(AsyncWebhookAdapter):
+        async def request(self, route, session=None, **kwargs):
+            return await transport.request(route, **kwargs)
+
+    return FakeWebhookAdapter()
+
+
+class BusyVoiceClient:
+    """Voice connection stand-in that always has a track playing."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.guild = channel.guild
+        self.source = None
+
+    def is_connected(self) -> bool:
+        return True
+
+    def is_playing(self) -> bool:
+        return True
+
+    def is_paused(self) -> bool:
+        return False
+
+    def play(self, source, *, after=None, **kwargs):
+        source.cleanup()
+
+    def stop(self):
+        pass
+
+    async def move_to(self, channel, **kwargs):
+        self.channel = channel
+
+    async def disconnect(self, *, force: bool = False):
+        pass
+
+
+def search_stand_in(latency: float):
+    """extract_track_info replacement: holds the executor thread like a yt-dlp search."""
+
+    def extract(query: str) -> Dict[str, Any]:
+        time.sleep(latency)
+        video_id = f"{zlib.crc32(query.encode('utf-8')):011x}"[-11:]
+        return {
+            "title": query, "stream_url": f"https://media.invalid/{video_id}.webm",
+            "page_url": f"https://www.youtube.com/watch?v={video_id}", "duration": 180,
+            "headers": {}, "uploader": "Bench", "video_id": video_id,
+        }
+
+    return extract
+
+
+# ----- Workload -----
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    entries = []
+    for part in mix.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name:
+            if name[0] not in "!/":
+                raise SystemExit(f"--mix: '{name}' phải bắt đầu bằng ! (lệnh prefix) hoặc / (slash)")
+            entries.append((name, float(weight or 1)))
+    if not entries:
+        raise SystemExit("--mix trống")
+    return entries
+
+
+def synthetic_events(args, mssvs: List[str], teams: List[str]) -> List[Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    names, weights = zip(*parse_mix(args.mix))
+    events: List[Dict[str, Any]] = []
+    at = rng.expovariate(args.rate)
+    while at < args.duration:
+        user = rng.randrange(args.users)
+        event: Dict[str, Any] = {"at": round(at, 4), "user": user, "channel": rng.randrange(args.channels)}
+        name = rng.choices(names, weights)[0]
+        command = name[1:]
+        mssv = mssvs[user % len(mssvs)]
+        team = teams[user % len(teams)]
+        song = f"Bài hát sự kiện {rng.randrange(args.songs)}"
+        if name[0] == "/":
+            options = {
+                "assign": {"mssv": mssv},
+                # Half look themselves up, half somebody else
+                "check": {} if rng.random() < 0.5 else {"mssv": rng.choice(mssvs)},
+                "play": {"query": song},
+            }.get(command, {})
+            event.update(command=command, options=options)
+        else:
+            arguments = {
+                "assign": mssv,
+                "check": "" if rng.random() < 0.5 else rng.choice(mssvs),
+                "checkin": f"{rng.randint(1, STATIONS)} {team}",
+                "checkout": team,
+                "play": song,
+            }.get(command, "")
+            event["content"] = f"!{command} {arguments}".strip()
+        events.append(event)
+        at += rng.expovariate(args.rate)
+    return events
+
+
+def load_events(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return sorted(events, key=lambda e: e.get("at", 0))
+
+
+class EventFeeder:
+    def __init__(self, bot, users: int, channels: int):
+        self.bot = bot
+        self.state = bot._connection
+        self.users = users
+        self.channels = channels
+
+    def feed(self, event: Dict[str, Any]) -> EventRecord:
+        i = int(event.get("user", 0)) % self.users
+        channel_id = CHANNEL_BASE + int(event.get("channel", 0)) % self.channels
+        if "command" in event:
+            record = EventRecord(f"/{event['command']}", channel_id)
+            payload = interaction_payload(event["command"], event.get("options") or {}, member_user(i), channel_id)
+            parse = self.state.parse_interaction_create
+        else:
+            content = event.get("content", "")
+            prefix = self.bot.command_prefix
+            name = f"!{content[len(prefix):].split(' ', 1)[0]}" if content.startswith(prefix) else "(tin nhắn)"
+            record = EventRecord(name, channel_id)
+            payload = message_payload(channel_id, member_user(i), content)
+            parse = self.state.parse_message_create
+
+        token = current_event.set(record)
+        try:
+            parse(payload)
+        finally:
+            current_event.reset(token)
+        if record.name == "(tin nhắn)":
+            record.finish()  # no command will complete
+        return record
+
+
+def install_hooks(bot):
+    """Finish each event's record when its command completes or fails."""
+
+    async def on_command_completion(ctx):
+        record = current_event.get()
+        if record is not None:
+            record.finish()
+
+    async def on_command_error(ctx, error):
+        record = current_event.get()
+        if record is not None:
+            record.finish(getattr(error, "original", error))
+
+    async def on_app_command_completion(interaction, command):
+        record = current_event.get()
+        if record is not None:
+            record.finish()
+
+    bot.add_listener(on_command_completion, "on_command_completion")
+    bot.add_listener(on_command_error, "on_command_error")
+    bot.add_listener(on_app_command_completion, "on_app_command_completion")
+
+    tree_on_error = bot.tree.on_error
+
+    async def on_app_command_error(interaction, error):
+        record = current_event.get()
+        if record is not None:
+            record.finish(getattr(error, "original", error))
+        await tree_on_error(interaction, error)
+
+    bot.tree.on_error = on_app_command_error
+
+
+# ----- Run -----
+def configure_environment(journal_path: Path):
+    """Bot settings for an isolated run: no Discord, no files under data/, no audio."""
+    os.environ.setdefault("DISCORD_TOKEN", "bench")
+    os.environ.update({
+        "MongoDB": "",
+        "BOT_FEATURES": "admin,tour,music",
+        "AUDIO_WORKERS": "0",
+        "AUDIO_CACHE_DIR": "",
+        "LOUDNESS_PATH": "",
+        "PLAYER_STATE_PATH": "",
+        "SNAPSHOT_PATH": "",
+        "LOG_CHANNEL_ID": "",
+        "ASSIGN_JOURNAL_PATH": str(journal_path),
+    })
+
+
+async def run(args, workdir: Path) -> Dict[str, Any]:
+    configure_environment(workdir / "assign_journal.jsonl")
+    import discord
+    from discord.webhook.async_ import async_context
+    from src.bot import VnuTourBot
+    from src.music import ytdlp_handler
+    from src.services import service_stats
+
+    mongo, counter = make_mongo(args.mongo_uri)
+    rows = values_to_rows(generate_sheet_values(args.participants))
+    mongo.bulk_sync_rows(rows)
+    mssvs = [r["mssv"] for r in rows]
+    teams = [r.get("team_name") or "Đội ?" for r in rows]
+
+    if args.replay:
+        events = load_events(args.replay)
+    else:
+        events = synthetic_events(args, mssvs, teams)
+    if args.save_events:
+        with open(args.save_events, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        print(f"Đã lưu {len(events)} sự kiện vào {args.save_events}")
+
+    bot = VnuTourBot()
+    await bot._async_setup_hook()
+    state = bot._connection
+    bot_user = user_payload(BOT_ID, "VnuTourBot", bot=True)
+    state.user = discord.ClientUser(state=state, data=bot_user)
+    state.application_id = BOT_ID
+    guild = state._add_guild_from_data(guild_payload(args.users, args.channels))
+    guild._add_member(discord.Member._from_client_user(user=state.user, guild=guild, state=state))
+    state._add_voice_client(guild.id, BusyVoiceClient(guild.get_channel(VOICE_CHANNEL_ID)))
+
+    transport = FakeTransport(state, bot_user, args.api_latency, args.seed)
+    bot.http.request = transport.request
+    async_context.set(make_webhook_adapter(transport))
+    ytdlp_handler.extract_track_info = search_stand_in(args.search_latency)
+
+    await bot._load_features()
+    bot.mongo = mongo
+    if not args.no_directory:
+        await bot._setup_directory()
+    install_hooks(bot)
+    counter.reset()
+
+    feeder = EventFeeder(bot, args.users, args.channels)
+    monitor = LoopLagMonitor()
+    monitor.start()
+    # Tasks created from here on are the commands' (handlers, tree invokers, what they spawn)
+    background = asyncio.all_tasks()
+    records: List[EventRecord] = []
+    slip = 0.0
+    started = time.perf_counter()
+    for event in events:
+        delay = started + float(event.get("at", 0)) / args.speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            slip = max(slip, -delay)
+        records.append(feeder.feed(event))
+    fed = time.perf_counter() - started
+
+    deadline = time.perf_counter() + args.drain
+    while time.perf_counter() < deadline and any(r.finished is None for r in records):
+        await asyncio.sleep(0.05)
+    elapsed = max([r.finished for r in records if r.finished] + [time.perf_counter()]) - started
+    monitor.stop()
+    # Commands still running are errors; cancel them before bot.close() pulls the loop away
+    for record in records:
+        if record.finished is None:
+            record.error = f"chưa xong sau {args.drain:g}s (đã hủy)"
+    leftover = [t for t in asyncio.all_tasks() - background if t is not asyncio.current_task()]
+    for task in leftover:
+        task.cancel()
+    await asyncio.gather(*leftover, return_exceptions=True)
+
+    commands: Dict[str, Dict[str, Any]] = {}
+    for name in sorted({r.name for r in records}):
+        group = [r for r in records if r.name == name]
+        done = [r for r in group if r.finished is not None]
+        latencies = [(r.finished - r.started) * 1000 for r in done]
+        first = [(r.first_call - r.started) * 1000 for r in group if r.first_call is not None]
+        errors = sum(1 for r in group if r.error or r.finished is None)
+        commands[name] = {
+            "events": len(group),
+            "per_s": round(len(done) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies, default=0.0), 1),
+            "first_p95_ms": round(percentile(first, 95), 1),
+            "refused": sum(1 for r in group if r.refused),
+            "errors": errors,
+            "error_rate": round(errors / len(group), 4),
+            "calls_per_event": round(sum(r.calls for r in group) / len(group), 2),
+            "samples": sorted({r.error for r in group if r.error})[:3],
+        }
+
+    lags = [lag * 1000 for lag in monitor.lags]
+    report = {
+        "events": len(records),
+        "fed_s": round(fed, 2),
+        "elapsed_s": round(elapsed, 2),
+        "fed_per_s": round(len(records) / fed, 1) if fed else 0.0,
+        "max_slip_ms": round(slip * 1000, 1),
+        "directory": not args.no_directory,
+        "commands": commands,
+        "loop_lag_ms": {
+            "p50": round(percentile(lags, 50), 1),
+            "p99": round(percentile(lags, 99), 1),
+            "max": round(max(lags, default=0.0), 1),
+        },
+        "services": service_stats(),
+        "mongo_round_trips": {"total": counter.total, **counter.by_op},
+        "discord_calls": dict(sorted(transport.by_route.items(), key=lambda item: -item[1])),
+        "unattributed_calls": transport.unattributed,
+    }
+
+    await bot.close()
+    drop_mongo(mongo)
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(
+        f"\n{report['events']} sự kiện trong {report['fed_s']} s ({report['fed_per_s']}/s, trễ lịch tối đa "
+        f"{report['max_slip_ms']} ms), xong sau {report['elapsed_s']} s, "
+        f"danh bạ {'trong bộ nhớ' if report['directory'] else 'tắt (MongoDB)'}"
+    )
+    header = (f"{'command':<14} {'events':>7} {'done/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'max ms':>8} {'1st p95':>8} {'❌':>6} {'errors':>6} {'calls':>6}")
+    print(header)
+    print("-" * len(header))
+    for name, c in report["commands"].items():
+        print(
+            f"{name:<14} {c['events']:>7} {c['per_s']:>7} {c['p50_ms']:>8} {c['p95_ms']:>8} {c['p99_ms']:>8} "
+            f"{c['max_ms']:>8} {c['first_p95_ms']:>8} {c['refused']:>6} {c['errors']:>6} {c['calls_per_event']:>6}"
+        )
+        for sample in c["samples"]:
+            print(f"  ! {sample}")
+
+    lag = report["loop_lag_ms"]
+    print(f"\nEvent loop lag: p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+    if report["services"]:
+        print("Service:")
+        for name, s in report["services"].items():
+            print(f"  {name:<32} {s['calls']:>7} lần  TB {s['avg_ms']:>7} ms  tối đa {s['max_ms']:>8} ms  lỗi {s['errors']}")
+    mongo = dict(report["mongo_round_trips"])
+    total = mongo.pop("total")
+    print(f"MongoDB round trips: {total} {mongo if mongo else ''}")
+    print("Discord calls:")
+    for route, count in list(report["discord_calls"].items())[:8]:
+        print(f"  {count:>7}  {route}")
+
+
+def check_limits(report: Dict[str, Any], max_p95_ms: Optional[float], max_error_rate: Optional[float]) -> bool:
+    ok = True
+    for name, c in report["commands"].items():
+        if max_p95_ms is not None and c["p95_ms"] > max_p95_ms:
+            ok = False
+            print(f"  VƯỢT NGƯỠNG {name} p95: {c['p95_ms']} ms > {max_p95_ms} ms")
+        if max_error_rate is not None and c["error_rate"] > max_error_rate:
+            ok = False
+            print(f"  VƯỢT NGƯỠNG {name} lỗi: {c['error_rate']:.2%} > {max_error_rate:.2%}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay command events into the bot and report latency per command")
+    parser.add_argument("--rate", type=float, default=200, help="Synthetic events per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of synthetic events")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted commands, ! = prefix, / = slash")
+    parser.add_argument("--participants", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=2000, help="Members sending events (user i owns participant i)")
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--songs", type=int, default=200, help="Distinct !play queries")
+    parser.add_argument("--api-latency", type=float, default=0.08, help="Mean seconds per Discord call")
+    parser.add_argument("--search-latency", type=float, default=1.5, help="Seconds per yt-dlp search")
+    parser.add_argument("--mongo-uri", default=None, help="Local mongod (default: mongomock)")
+    parser.add_argument("--no-directory", action="store_true", help="Serve lookups from MongoDB, not the cache")
+    parser.add_argument("--replay", default=None, help="JSONL file of recorded events")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor")
+    parser.add_argument("--save-events", default=None, help="Write the event schedule as JSONL")
+    parser.add_argument("--drain", type=float, default=30, help="Seconds to wait for unfinished commands")
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--json", default=None, help="Write the report as JSON")
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    args = parser.parse_args()
+    if args.rate <= 0 or args.speed <= 0 or args.users <= 0 or args.channels <= 0:
+        parser.error("--rate, --speed, --users và --channels phải lớn hơn 0")
+
+    with tempfile.TemporaryDirectory(prefix="vnutour_load_") as workdir:
+        report = asyncio.run(run(args, Path(workdir)))
+
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nĐã ghi báo cáo vào {args.json}")
+    ok = check_limits(report, args.max_p95_ms, args.max_error_rate)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Memory budget and lookup latency of the in-memory participant index.
+
+Usage:
+  python scripts/bench_participant_index.py [--rows 50000] [--lookups 2000]
+
+Builds synthetic participants (same generator as bench_sheet_sync.py), decoded
+the way pymongo returns them (every string a separate object), and compares:
+
+  dicts  list of the raw documents + MSSV dict (what caching find() output gives)
+  index  ParticipantIndex (__slots__ records, interned school/faculty/team strings)
+
+For each it reports the retained tracemalloc size and bytes per participant,
+then times exact, prefix, edit-distance-1 and accent-insensitive name lookups
+plus the MSSV/team autocomplete queries on the index.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from _bench_support import generate_sheet_values  # noqa: E402
+from src.utils.participant_index import ParticipantIndex  # noqa: E402
+from src.utils.sheets import RowMapper, row_to_dict  # noqa: E402
+
+
+def _fresh(value: str) -> str:
+    # A new str object per document, like BSON decoding produces
+    return value.encode("utf-8").decode("utf-8") if value else value
+
+
+def iter_docs(rows: int) -> Iterator[Dict[str, Any]]:
+    values = generate_sheet_values(rows)
+    mapper = RowMapper(values[0])
+    now = datetime.now(timezone.utc)
+    for i, raw in enumerate(values[1:]):
+        d = row_to_dict(mapper.map(raw))
+        doc = {k: _fresh(d.get(k) or "") or None for k in (
+            "mssv", "full_name", "email", "phone", "school", "faculty", "facebook", "team_id", "team_name",
+        )}
+        doc["discord_id"] = 10**17 + i if i % 3 == 0 else None
+        doc["updated_at"] = now
+        yield doc
+
+
+def measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, retained
+
+
+def timed(label: str, fn, queries: List[str]) -> None:
+    start = time.perf_counter()
+    hits = 0
+    for q in queries:
+        result = fn(q)
+        hits += 1 if result else 0
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed / len(queries) * 1e6:9.1f} µs/lookup  ({hits}/{len(queries)} with results)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Participant index memory and lookup benchmark")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    def build_dicts():
+        docs = list(iter_docs(args.rows))
+        return docs, {d["mssv"]: d for d in docs}
+
+    baseline, dict_bytes = measure(build_dicts)
+    del baseline
+    index, index_bytes = measure(lambda: ParticipantIndex(iter_docs(args.rows)))
+    index.prefix("")  # build the sorted MSSV list before timing
+
+    n = len(index)
+    print(f"Participants: {n}")
+    print(f"  dicts  {dict_bytes / 2**20:8.2f} MiB  ({dict_bytes / n:6.0f} B/participant)")
+    print(f"  index  {index_bytes / 2**20:8.2f} MiB  ({index_bytes / n:6.0f} B/participant)"
+          f"  -> {100 * (1 - index_bytes / dict_bytes):.0f}% smaller")
+    report = index.memory_report()
+    print(f"  index.memory_report(): {report['total_bytes'] / 2**20:.2f} MiB, {report['bytes_per_record']} B/record")
+
+    rng = random.Random(7)
+    records = list(index)
+    sample = [rng.choice(records) for _ in range(args.lookups)]
+    typos = []
+    for r in sample:
+        pos = rng.randrange(len(r.mssv))
+        typos.append(r.mssv[:pos] + str((int(r.mssv[pos]) + 1) % 10) + r.mssv[pos + 1:])
+
+    print("Lookups:")
+    timed("exact MSSV", index.get, [r.mssv for r in sample])
+    timed("by Discord ID", index.by_discord, [10**17 + i * 3 for i in range(args.lookups)])
+    timed("prefix (6 chars)", index.prefix, [r.mssv[:6] for r in sample])
+    timed("suggest (1 typo)", index.suggest, typos)
+    timed("name (no accents)", index.search_name, ["nguyen van an", "tran thi", "hoang minh", "pham"] * (args.lookups // 20 or 1))
+    timed("autocomplete MSSV", index.complete_mssv, [r.mssv[:rng.randint(0, 8)] for r in sample])
+    timed("autocomplete team", index.search_teams, ["doi", "doi rong", "phuong 1", "sao 12"] * (args.lookups // 4 or 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmark and regression check for the Google Sheet -> MongoDB sync paths.
+
+Usage:
+  python scripts/bench_sheet_sync.py [--rows 1000,10000] [--paths sync,async,bulk,cog,stream,rerun]
+                                     [--mongo-uri mongodb://localhost:27017]
+                                     [--baseline bench_baseline.json] [--save-baseline]
+
+Without --mongo-uri an in-process mongomock client is used (`pip install mongomock`).
+mongomock scans linearly, so use a local mongod for the 50k-row runs.
+
+Paths:
+  sync   MongoManager.sync_from_rows
+  async  MongoManager.sync_from_rows_async
+  bulk   MongoManager.sync_from_row_stream (batched bulk writes)
+  cog    SheetSyncCog.run_sync, windowed batchGet against a local Sheets API stand-in
+  stream SheetSyncCog.run_sync, single streamed values.get request
+  rerun  SheetSyncCog.run_sync again after a sync, with an unchanged revision
+
+For every (path, rows) pair the report shows rows/sec, Mongo round trips per row,
+HTTP requests and the tracemalloc peak. The run exits with status 1 when a
+round-trip ceiling is exceeded, or when --baseline is given and throughput,
+round trips or peak memory regress by more than --tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from _bench_support import (  # noqa: E402
+    SheetsStandIn,
+    drop_mongo,
+    generate_sheet_values,
+    make_mongo,
+    sheet_payload,
+)
+from src.utils.http_client import HttpClient  # noqa: E402
+from src.utils.sheets import values_to_rows  # noqa: E402
+
+
+# Machine-independent ceilings on Mongo round trips: (fixed per sync, per synced row).
+# An unchanged rerun only reads/writes sync metadata, whatever the sheet size.
+ROUND_TRIP_LIMITS = {
+    "sync": (0, 8.0),
+    "async": (0, 8.0),
+    "bulk": (0, 0.05),
+    "cog": (0, 0.05),
+    "stream": (0, 0.05),
+    "rerun": (10, 0.0),
+}
+
+
+async def _run_path(path: str, values: List[List[str]], mongo_uri: str | None) -> Dict[str, float]:
+    mongo, counter = make_mongo(mongo_uri)
+    stand_in = SheetsStandIn(sheet_payload(values), values)
+    http_client = None
+    try:
+        rows = [r for r in values_to_rows(values) if r.get("mssv")]
+        if path in ("cog", "stream", "rerun"):
+            from src.bot.sheet_cog import SheetSyncCog
+
+            base_url = await stand_in.start()
+            bot = SimpleNamespace(
+                mongo=mongo,
+                logger=None,
+                config=SimpleNamespace(
+                    google_sheet_api_key="bench",
+                    google_sheet_id="bench-sheet",
+                    google_sheet_range="A1:K",
+                    google_sheet_api_base=base_url,
+                    google_drive_api_base=stand_in.drive_base_url,
+                    sheet_sync_batch_size=500,
+                    sheet_window_rows=0 if path == "stream" else 500,
+                    sheet_windows_per_request=10,
+                    sheet_sync_interval=60,
+                    sheet_sync_max_interval=600,
+                    sheet_sync_timeout=300,
+                    sheet_sync_lease_ttl=90,
+                    instance_id=None,
+                ),
+            )
+            http_client = bot.http_client = await HttpClient().start()
+            cog = SheetSyncCog(bot)
+            if path == "rerun":
+                await cog.run_sync()
+            stand_in.reset_counters()
+            # Payload is built outside the measured window, the server only writes bytes
+            rows = None
+
+        counter.reset()
+        tracemalloc.start()
+        started = time.perf_counter()
+        if path == "sync":
+            mongo.sync_from_rows(rows)
+        elif path == "async":
+            await mongo.sync_from_rows_async(rows)
+        elif path == "bulk":
+            await mongo.sync_from_row_stream(rows)
+        else:
+            await cog.run_sync()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        synced = len(values) - 1
+        return {
+            "rows": synced,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(synced / elapsed, 1) if elapsed else 0.0,
+            "round_trips": counter.total,
+            "round_trips_per_row": round(counter.total / synced, 2) if synced else 0.0,
+            "http_requests": stand_in.requests,
+            "http_kb": round(stand_in.bytes_sent / 1024, 1),
+            "peak_mb": round(peak / 1024 / 1024, 2),
+        }
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if http_client is not None:
+            await http_client.close()
+        await stand_in.stop()
+        drop_mongo(mongo)
+
+
+def _check(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    failures: List[str] = []
+    for key, r in results.items():
+        path = key.split(":", 1)[0]
+        limit = ROUND_TRIP_LIMITS.get(path)
+        if limit is not None:
+            fixed, per_row = limit
+            ceiling = fixed + per_row * r["rows"]
+            if r["round_trips"] > ceiling:
+                failures.append(f"{key}: {r['round_trips']} round trips > {ceiling:g} ({fixed} + {per_row}/row)")
+
+        base = baseline.get(key)
+        if not base:
+            continue
+        if r["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+            failures.append(f"{key}: rows/sec {r['rows_per_sec']} < baseline {base['rows_per_sec']}")
+        if r["round_trips"] > base["round_trips"]:
+            failures.append(f"{key}: round trips {r['round_trips']} > baseline {base['round_trips']}")
+        if r["peak_mb"] > base["peak_mb"] * (1 + tolerance) + 1:
+            failures.append(f"{key}: peak {r['peak_mb']}MB > baseline {base['peak_mb']}MB")
+    return failures
+
+
+async def main_async(args) -> int:
+    sizes = [int(x) for x in args.rows.split(",") if x.strip()]
+    paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+    results: Dict[str, Dict[str, float]] = {}
+
+    print(f"{'path':<8}{'rows':>8}{'sec':>10}{'rows/s':>11}{'rt':>9}{'rt/row':>8}{'http':>6}{'KB':>9}{'peak MB':>9}")
+    for size in sizes:
+        values = generate_sheet_values(size)
+        for path in paths:
+            r = await _run_path(path, values, args.mongo_uri)
+            results[f"{path}:{size}"] = r
+            print(
+                f"{path:<8}{r['rows']:>8}{r['seconds']:>10}{r['rows_per_sec']:>11}"
+                f"{r['round_trips']:>9}{r['round_trips_per_row']:>8}{r['http_requests']:>6}{r['http_kb']:>9}{r['peak_mb']:>9}"
+            )
+
+    baseline_path = Path(args.baseline) if args.baseline else None
+    if baseline_path and args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    baseline = {}
+    if baseline_path and baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+    failures = _check(results, baseline, args.tolerance)
+    for f in failures:
+        print(f"[REGRESSION] {f}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Google Sheet -> MongoDB sync")
+    parser.add_argument("--rows", default="1000,10000", help="Comma separated sheet sizes (1k-50k)")
+    parser.add_argument("--paths", default="sync,async,bulk,cog,stream,rerun", help="Comma separated: sync, async, bulk, cog, stream, rerun")
+    parser.add_argument("--mongo-uri", default=None, help="Local mongod URI (default: mongomock)")
+    parser.add_argument("--baseline", default=None, help="JSON file with previous results")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to --baseline and exit")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression ratio (default 0.2)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
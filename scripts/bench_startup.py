@@ -0,0 +1,124 @@
+"""
+Cold-start import cost per feature set (python -X importtime summary).
+
+Usage:
+  python scripts/bench_startup.py [--features "admin,tour,music,sheet_sync;admin"] [--top 10]
+                                  [--baseline startup_baseline.json] [--save-baseline]
+                                  [--tolerance 0.25]
+
+For every feature set a fresh interpreter runs with -X importtime and does
+what VnuTourBot does before connecting: import src.bot, construct the bot
+(BOT_FEATURES set accordingly, no MongoDB) and load the feature extensions.
+A final "music+play" scenario also imports yt-dlp, which the bot otherwise
+defers to the first !play.
+
+The report shows total import time, RSS after startup and the packages
+that account for most of it (self time summed per top-level package).
+With --baseline the run exits with status 1 when the import time or RSS
+of a scenario grows by more than --tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CHILD = r"""
+import asyncio, os, sys
+sys.path.insert(0, {root!r})
+from src.bot import VnuTourBot
+
+async def main():
+    bot = VnuTourBot()
+    await bot._load_features()
+    if {play!r}:
+        import yt_dlp  # noqa: F401  (what the first !play triggers)
+
+asyncio.run(main())
+with open("/proc/self/status", encoding="utf-8") as f:
+    rss = next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+print("RSS_KB", rss)
+"""
+
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_scenario(features: str, play: bool) -> Dict[str, object]:
+    env = dict(os.environ, DISCORD_TOKEN=os.getenv("DISCORD_TOKEN", "bench"), MongoDB="", BOT_FEATURES=features)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(root=str(ROOT), play=play)],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        return {"error": tail[0]}
+    rss = next((int(l.split()[1]) for l in proc.stdout.splitlines() if l.startswith("RSS_KB")), 0)
+    by_package: Dict[str, int] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if not m:
+            continue
+        self_us, name = int(m.group(1)), m.group(4)
+        total_us += self_us
+        root = name.split(".")[0]
+        by_package[root] = by_package.get(root, 0) + self_us
+    top = sorted(((us, name) for name, us in by_package.items()), reverse=True)
+    return {"import_ms": round(total_us / 1000, 1), "rss_mib": round(rss / 1024, 1), "top": top}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and RSS report per BOT_FEATURES set")
+    parser.add_argument("--features", default="admin,tour,music,sheet_sync;admin,sheet_sync;admin",
+                        help="';'-separated BOT_FEATURES values to compare")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    parser.add_argument("--baseline", default=None, help="JSON file with a previous report")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    scenarios = [(f, f, False) for f in args.features.split(";") if f.strip()]
+    scenarios.append(("music+play", "music", True))
+
+    report: Dict[str, Dict[str, object]] = {}
+    for label, features, play in scenarios:
+        result = run_scenario(features, play)
+        report[label] = result
+        print(f"\n== {label} ==")
+        if "error" in result:
+            print(f"  failed: {result['error']}")
+            continue
+        print(f"  imports: {result['import_ms']} ms, RSS: {result['rss_mib']} MiB")
+        for self_us, name in result["top"][: args.top]:
+            print(f"  {self_us / 1000:9.1f} ms  {name}")
+
+    summary = {k: {"import_ms": v["import_ms"], "rss_mib": v["rss_mib"]} for k, v in report.items() if "error" not in v}
+    failed = False
+    if args.baseline and not args.save_baseline and Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print("\nAgainst baseline:")
+        for label, now in summary.items():
+            old = baseline.get(label)
+            if not old:
+                continue
+            for key in ("import_ms", "rss_mib"):
+                if old[key] and now[key] > old[key] * (1 + args.tolerance):
+                    failed = True
+                    print(f"  REGRESSION {label} {key}: {old[key]} -> {now[key]}")
+                else:
+                    print(f"  ok {label} {key}: {old[key]} -> {now[key]}")
+    if args.baseline and args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        print(f"\nBaseline saved to {args.baseline}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Export, inspect or restore the local MongoDB snapshot used for offline boots.
+
+Usage:
+  python scripts/snapshot.py export  [path]   # default: SNAPSHOT_PATH or data/snapshot.jsonl.gz
+  python scripts/snapshot.py info    [path]
+  python scripts/snapshot.py restore [path]   # upsert every document back by _id
+
+export/restore use the `MongoDB` / `MONGODB_DB_NAME` variables from .env.
+"""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))  # add project root to path
+
+from dotenv import load_dotenv  # noqa: E402
+
+from src.utils.mongo import MongoManager  # noqa: E402
+from src.utils.snapshot import OfflineMongoManager, export_snapshot, restore_snapshot  # noqa: E402
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("export", "info", "restore"):
+        print("Usage: python scripts/snapshot.py export|info|restore [path]")
+        sys.exit(1)
+
+    load_dotenv(ROOT / ".env")
+    action = sys.argv[1]
+    path = Path(sys.argv[2]) if len(sys.argv) > 2 else ROOT / os.getenv("SNAPSHOT_PATH", "data/snapshot.jsonl.gz")
+
+    if action == "info":
+        offline = OfflineMongoManager(path)
+        print(f"Snapshot: {path} ({path.stat().st_size / 1024:.1f} KB)")
+        print(f"Created at: {offline.snapshot_created_at}, db: {offline.db_name}")
+        for name in ("participants", "teams", "meta"):
+            print(f"  {name}: {getattr(offline, name).count_documents({})}")
+        print(f"Pending offline writes: {len(offline.pending)}")
+        return
+
+    mongo = MongoManager(os.getenv("MongoDB"), os.getenv("MONGODB_DB_NAME", "vnutour"))
+    try:
+        if action == "export":
+            counts = export_snapshot(mongo, path)
+            print(f"Exported to {path}: {counts} ({path.stat().st_size / 1024:.1f} KB)")
+        else:
+            counts = restore_snapshot(mongo, path)
+            print(f"Restored from {path}: {counts}")
+    finally:
+        mongo.close()
+
+
+if __name__ == "__main__":
+    main()
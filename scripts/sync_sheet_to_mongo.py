@@ -3,73 +3,281 @@ Sync Google Sheet CSV export into MongoDB.
 
 Usage:
   python scripts/sync_sheet_to_mongo.py path/to/export.csv
+         [--batch-size 1000] [--workers 4] [--dry-run [--show 20]]
+         [--checkpoint import.ckpt.json]
 
 The CSV is expected to have headers (Vietnamese sample):
-STT, Tên đội, ID đội, MSSV, Họ và tên, Link Facebook, Trường, Khoa, Email, Số điện thoại
+STT, Tên đội, ID đội, MSSV, Họ và tên, Link Facebook, Trường, Khoa, Email, Số điện thoại
+
+The file is streamed in batches and each batch is written with unordered
+bulk_write (MongoManager.bulk_sync_rows) on a thread pool, so only
+`workers * 2` batches are in memory at a time. Batches complete out of
+order, so an MSSV repeated in the CSV is imported from its last row only
+(found by a first pass over the file), as a sequential import would.
+
+--dry-run   Write nothing; report how many rows would be created, changed or
+            left unchanged, with a sample of field-level differences.
+--checkpoint
+            Record the number of rows fully written; rerunning with the same
+            checkpoint skips them. The checkpoint is discarded if the CSV changed.
 """
 from __future__ import annotations
 
+import argparse
 import csv
+import json
 import os
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))  # add project root to path
 
 from src.utils.mongo import MongoManager  # noqa: E402
+from src.utils.sheets import MSSV_SLOT, RowMapper, row_to_dict  # noqa: E402
+
+
+# Participant fields compared in --dry-run (updated_at always differs)
+DIFF_FIELDS = ("full_name", "email", "phone", "faculty", "school", "facebook", "team_id", "team_name")
 
 
-HEADER_MAP = {
-    "STT": "stt",
-    "Tên đội": "team_name",
-    "ID đội": "team_id",
-    "MSSV": "mssv",
-    "Họ và tên": "full_name",
-    "Link Facebook": "facebook",
-    "Trường": "school",
-    "Khoa": "faculty",
-    "Email": "email",
-    "Số điện thoại": "phone",
-}
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.skipped = 0
+        self.repeated = 0
+        self.resumed = 0
+        self.batches = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = 0
+        self.started = time.perf_counter()
 
+    def add(self, result: Dict[str, Any]):
+        self.batches += 1
+        self.created += result.get("created", 0)
+        self.updated += result.get("updated", 0)
+        self.unchanged += result.get("unchanged", 0)
+        self.errors += result.get("errors", 0)
 
-def read_csv(path: Path) -> list[Dict[str, str]]:
+    def summary(self, dry_run: bool) -> str:
+        elapsed = time.perf_counter() - self.started
+        processed = self.read - self.resumed
+        rate = processed / elapsed if elapsed else 0.0
+        verb = "Would create" if dry_run else "Created"
+        lines = [
+            f"Rows read: {self.read} (no MSSV: {self.skipped}, repeated MSSV: {self.repeated}, resumed past: {self.resumed})",
+            f"{verb}: {self.created}, {'changed' if dry_run else 'updated'}: {self.updated}"
+            + (f", unchanged: {self.unchanged}" if dry_run else "")
+            + f", errors: {self.errors}",
+            f"Batches: {self.batches}, elapsed: {elapsed:.2f}s, throughput: {rate:.0f} rows/s",
+        ]
+        return "\n".join(lines)
+
+
+# ----- Reading -----
+def repeated_mssv_rows(path: Path) -> Dict[str, int]:
+    """Data row number of the last occurrence of every MSSV that appears more than once."""
+    seen = set()
+    last: Dict[str, int] = {}
     with path.open("r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        rows = []
-        for row in reader:
-            mapped: Dict[str, str] = {}
-            for k, v in row.items():
-                key = k.strip()
-                dest = HEADER_MAP.get(key)
-                if dest:
-                    mapped[dest] = (v or "").strip()
-            rows.append(mapped)
-        return rows
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return last
+        mapper = RowMapper(header)
+        for number, raw in enumerate(reader, 1):
+            mssv = mapper.map(raw)[MSSV_SLOT]
+            if not mssv:
+                continue
+            if mssv in seen:
+                last[mssv] = number
+            else:
+                seen.add(mssv)
+    return last
+
+
+def iter_batches(
+    path: Path, batch_size: int, skip: int, stats: ImportStats, last_rows: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[int, List[Dict[str, str]]]]:
+    """Yield (data rows consumed so far, batch of mapped rows) while streaming the CSV.
+
+    Rows of an MSSV listed in `last_rows` are dropped except the last one.
+    """
+    last_rows = last_rows or {}
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        mapper = RowMapper(header)
+        batch: List[Dict[str, str]] = []
+        for raw in reader:
+            stats.read += 1
+            if stats.read <= skip:
+                stats.resumed += 1
+                continue
+            row = mapper.map(raw)
+            if not row[MSSV_SLOT]:
+                stats.skipped += 1
+                continue
+            if last_rows.get(row[MSSV_SLOT], stats.read) != stats.read:
+                stats.repeated += 1  # a later row of the file wins
+                continue
+            batch.append(row_to_dict(row))
+            if len(batch) >= batch_size:
+                yield stats.read, batch
+                batch = []
+        if batch:
+            yield stats.read, batch
+
+
+# ----- Checkpoint -----
+def _fingerprint(path: Path) -> Dict[str, Any]:
+    st = path.stat()
+    return {"csv": str(path), "size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def load_checkpoint(ckpt: Optional[Path], csv_path: Path) -> int:
+    if not ckpt or not ckpt.exists():
+        return 0
+    data = json.loads(ckpt.read_text(encoding="utf-8"))
+    fp = _fingerprint(csv_path)
+    if any(data.get(k) != v for k, v in fp.items()):
+        print(f"Checkpoint {ckpt} belongs to a different CSV version, starting over")
+        return 0
+    return int(data.get("rows_done", 0))
+
+
+def save_checkpoint(ckpt: Path, csv_path: Path, rows_done: int):
+    data = dict(_fingerprint(csv_path), rows_done=rows_done)
+    tmp = ckpt.with_suffix(ckpt.suffix + ".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, ckpt)
+
+
+# ----- Dry run -----
+def diff_batch(mongo: MongoManager, rows: List[Dict[str, str]], show: int) -> Dict[str, Any]:
+    """Compare a batch with the stored participants without writing."""
+    docs = {}
+    for r in rows:
+        mssv = mongo._norm_mssv(r["mssv"])
+        docs[mssv] = mongo._participant_doc(mssv, r)
+    projection = {f: 1 for f in DIFF_FIELDS}
+    projection.update(_id=0, mssv=1)
+    existing = {d["mssv"]: d for d in mongo.participants.find({"mssv": {"$in": list(docs)}}, projection)}
+
+    created = changed = unchanged = 0
+    samples: List[str] = []
+    for mssv, doc in docs.items():
+        old = existing.get(mssv)
+        if old is None:
+            created += 1
+            if len(samples) < show:
+                samples.append(f"+ {mssv} {doc['full_name']}")
+            continue
+        fields = [f for f in DIFF_FIELDS if old.get(f) != doc.get(f)]
+        if not fields:
+            unchanged += 1
+            continue
+        changed += 1
+        if len(samples) < show:
+            parts = ", ".join(f"{f}: {old.get(f)!r} -> {doc.get(f)!r}" for f in fields)
+            samples.append(f"~ {mssv} {parts}")
+    return {"created": created, "updated": changed, "unchanged": unchanged, "samples": samples}
+
+
+# ----- Main -----
+def run_import(mongo: MongoManager, args) -> ImportStats:
+    csv_path: Path = args.csv_path
+    ckpt = Path(args.checkpoint).resolve() if args.checkpoint else None
+    skip = 0 if args.dry_run else load_checkpoint(ckpt, csv_path)
+    if skip:
+        print(f"Resuming after {skip} rows (checkpoint {ckpt})")
+
+    last_rows = repeated_mssv_rows(csv_path)
+    if last_rows:
+        print(f"{len(last_rows)} MSSV appear more than once; only their last row is imported")
+    stats = ImportStats()
+    shown = 0
+    # Batches finish out of order; the checkpoint only advances over a
+    # contiguous prefix of completed batches, and never past one with errors
+    # (a resumed run retries it)
+    pending: Dict[Future, int] = {}
+    ends: Dict[int, int] = {}
+    done_ends: Dict[int, int] = {}
+    order: List[int] = []
+    next_seq = 0
+    max_in_flight = args.workers * 2
+
+    def collect(futures):
+        nonlocal shown
+        for fut in futures:
+            seq = pending.pop(fut)
+            result = fut.result()
+            stats.add(result)
+            for line in result.get("samples", [])[: max(0, args.show - shown)]:
+                print(line)
+                shown += 1
+            if not result.get("errors"):
+                done_ends[seq] = ends[seq]
+        advanced = None
+        while order and order[0] in done_ends:
+            advanced = done_ends.pop(order.pop(0))
+        if advanced is not None and ckpt and not args.dry_run:
+            save_checkpoint(ckpt, csv_path, advanced)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for end, batch in iter_batches(csv_path, args.batch_size, skip, stats, last_rows):
+            if args.dry_run:
+                fut = pool.submit(diff_batch, mongo, batch, args.show)
+            else:
+                fut = pool.submit(mongo.bulk_sync_rows, batch)
+            pending[fut] = next_seq
+            ends[next_seq] = end
+            order.append(next_seq)
+            next_seq += 1
+            if len(pending) >= max_in_flight:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+        if pending:
+            finished, _ = wait(pending)
+            collect(finished)
+
+    if ckpt and not args.dry_run and not stats.errors:
+        # Everything landed; the next run can skip the whole file
+        save_checkpoint(ckpt, csv_path, stats.read)
+    return stats
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python scripts/sync_sheet_to_mongo.py <path_to_csv>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Bulk import a registration CSV export into MongoDB")
+    parser.add_argument("csv_path", type=lambda p: Path(p).resolve(), help="CSV exported from the registration sheet")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk_write (default 1000)")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel bulk writers (default 4)")
+    parser.add_argument("--dry-run", action="store_true", help="Report differences without writing")
+    parser.add_argument("--show", type=int, default=20, help="Differences to print in --dry-run (default 20)")
+    parser.add_argument("--checkpoint", default=None, help="JSON file used to resume an interrupted import")
+    args = parser.parse_args()
+    args.batch_size = max(1, args.batch_size)
+    args.workers = max(1, args.workers)
 
-    csv_path = Path(sys.argv[1]).resolve()
-    if not csv_path.exists():
-        print(f"CSV not found: {csv_path}")
+    if not args.csv_path.exists():
+        print(f"CSV not found: {args.csv_path}")
         sys.exit(1)
 
     # Init Mongo from env
     mongo = MongoManager(os.getenv("MongoDB"), os.getenv("MONGODB_DB_NAME", "vnutour"))
-
-    rows = read_csv(csv_path)
-    # Filter invalid rows (no MSSV)
-    rows = [r for r in rows if r.get("mssv")]
-
-    result = mongo.sync_from_rows(rows)
-    print(f"Done. Created: {result['created']}, Updated: {result['updated']}")
+    try:
+        stats = run_import(mongo, args)
+    finally:
+        mongo.close()
+    print(("Dry run. " if args.dry_run else "Done. ") + stats.summary(args.dry_run))
+    sys.exit(1 if stats.errors else 0)
 
 
 if __name__ == "__main__":
     main()
-
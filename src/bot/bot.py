@@ -1,44 +1,167 @@
 """
 Main bot class
 """
+import asyncio
+import hashlib
+import json
+import time
+
 import discord
 from discord.ext import commands
 from .config import BotConfig
 from .logger import BotLogger
-from ..utils import MongoManager
-from .sync import SheetSyncer
+from ..utils import MongoManager, HttpClient
+from ..utils.member_resolver import MemberResolver
+
+
+# meta key holding the hash of the last slash command tree synced to Discord
+COMMAND_TREE_HASH_KEY = "command_tree_hash"
 
 
 class VnuTourBot(commands.Bot):
     """Main bot class with commands support"""
     
     def __init__(self):
+        self._boot_started = time.perf_counter()
         config = BotConfig()
         super().__init__(
             command_prefix=config.prefix,
-            intents=config.get_intents(),
-            help_command=None
+            help_command=None,
+            **config.client_options(),
         )
         
         self.config = config
         self.logger = BotLogger(self)
         self.prefix = config.prefix
         self.mongo = None
-        self.sheet_syncer = None
-        
+        # Shared pooled HTTP client, created in setup_hook (needs the running loop)
+        self.http_client = None
+        self._mongo_reconnect_task = None
+        # Background snapshot export (one at a time, finished before close)
+        self._snapshot_task = None
+        # MongoDB connects in the background while the gateway logs in (setup_hook)
+        self._startup_task = None
+        self._ready_logged = False
+        # Cached participant directory + assignment replay task (setup_hook)
+        self.directory = None
+        self._assign_replay_task = None
+        # Participant members resolved in bulk (addallrole, reactions)
+        self.member_resolver = MemberResolver(self)
+        # Audio worker processes (music feature with AUDIO_WORKERS > 0)
+        self.audio_pool = None
+        self.audio_cache = None
+        self.loudness = None
+        self.player_state = None
+        # Command services shared by prefix and slash commands (feature extensions)
+        self.music_service = None
+        self.directory_service = None
+        self.provisioning_service = None
+
         # Initialize components
         self._setup_events()
         self._setup_commands()
 
-        # Initialize MongoDB if configured
+    def _open_mongo(self):
+        """Blocking connect + ping; falls back to the local snapshot"""
         try:
-            if self.config.mongodb_uri:
-                self.mongo = MongoManager(self.config.mongodb_uri, self.config.mongodb_db)
-                print("[DB] Kết nối MongoDB thành công")
-            else:
-                print("[DB] Chưa cấu hình MongoDB (bỏ qua)")
+            return MongoManager(self.config.mongodb_uri, self.config.mongodb_db)
         except Exception as e:
             print(f"[DB ERROR] Không thể kết nối MongoDB: {e}")
+            return self._load_snapshot()
+
+    def _load_snapshot(self):
+        """Serve the local snapshot while MongoDB is unreachable; writes are journaled for replay"""
+        path = self.config.snapshot_path
+        if not path or not path.exists():
+            return None
+        try:
+            from ..utils.snapshot import OfflineMongoManager
+            mongo = OfflineMongoManager(path)
+            print(
+                f"[DB] Chạy offline từ snapshot {path.name} (tạo lúc {mongo.snapshot_created_at}); "
+                f"thao tác ghi được lưu vào journal và ghi lại vào MongoDB khi kết nối lại "
+                f"({len(mongo.pending)} ghi đang chờ)"
+            )
+            return mongo
+        except Exception as e:
+            print(f"[DB ERROR] Không thể đọc snapshot: {e}")
+            return None
+
+    async def export_snapshot(self):
+        """Write the local snapshot from the live database (no-op when offline)"""
+        mongo = self.mongo
+        if not mongo or getattr(mongo, "offline", False) or not self.config.snapshot_path:
+            return
+        try:
+            from ..utils.snapshot import export_snapshot
+            counts = await asyncio.to_thread(export_snapshot, mongo, self.config.snapshot_path)
+            print(f"[DB] Đã lưu snapshot: {counts}")
+        except Exception as e:
+            print(f"[DB ERROR] Không thể lưu snapshot: {e}")
+
+    def schedule_snapshot_export(self):
+        """Run export_snapshot in the background unless an export is already running"""
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self.export_snapshot())
+
+    async def _setup_directory(self):
+        """Load the participant cache and start replaying journaled assignments"""
+        from ..utils.directory import ParticipantDirectory
+        from ..utils.journal import AssignmentJournal
+        try:
+            journal = AssignmentJournal(self.config.assign_journal_path)
+            self.directory = ParticipantDirectory(journal)
+            count = await self.directory.refresh(self.mongo)
+            print(f"[DB] Đã nạp {count} MSSV vào bộ nhớ ({len(journal)} gán đang chờ ghi)")
+            self._assign_replay_task = asyncio.create_task(self.directory.run_replay(lambda: self.mongo))
+        except Exception as e:
+            # Fall back to direct MongoDB writes in /assign
+            self.directory = None
+            print(f"[DB ERROR] Không thể nạp danh bạ MSSV: {e}")
+
+    async def _reconnect_mongo(self):
+        """Retry MongoDB in the background, replay offline writes, then switch over"""
+        offline = self.mongo
+        while True:
+            await asyncio.sleep(self.config.mongo_reconnect_interval)
+            try:
+                online = await asyncio.to_thread(MongoManager, self.config.mongodb_uri, self.config.mongodb_db)
+            except Exception as e:
+                print(f"[DB] MongoDB vẫn chưa kết nối được: {e}")
+                continue
+            try:
+                result = await asyncio.to_thread(offline.reconcile, online)
+            except Exception as e:
+                print(f"[DB] Lỗi ghi lại thay đổi offline, thử lại sau: {e}")
+                online.close()
+                continue
+            # Switch over, then replay what was journaled during the first pass;
+            # the sealed journal refuses writes still aimed at the offline copy
+            self.mongo = online
+            offline.pending.seal()
+            while True:
+                try:
+                    final = await asyncio.to_thread(offline.reconcile, online)
+                    break
+                except Exception as e:
+                    print(f"[DB] Lỗi ghi lại thay đổi offline cuối cùng, thử lại sau: {e}")
+                    await asyncio.sleep(self.config.mongo_reconnect_interval)
+            result = {key: result[key] + final[key] for key in result}
+            await self.logger.log(
+                f"MongoDB đã kết nối lại: ghi lại {result['applied']} thay đổi offline ({result['failed']} lỗi)"
+            )
+            # Sheet sync was disabled while offline
+            if "sheet_sync" in self.config.features:
+                try:
+                    from .sheet_cog import setup_sheet_sync
+                    await self.remove_cog("SheetSyncCog")
+                    await setup_sheet_sync(self)
+                except Exception as e:
+                    print(f"[SHEET SYNC] Không thể khởi tạo lại Cog: {e}")
+            if self.directory is not None:
+                await self.directory.refresh(online)
+            self.schedule_snapshot_export()
+            return
     
     def _setup_events(self):
         """Setup bot event handlers"""
@@ -46,27 +169,94 @@ class VnuTourBot(commands.Bot):
         setup_events(self)
     
     def _setup_commands(self):
-        """Setup bot commands"""
-        from ..commands import setup_commands
-        setup_commands(self)
-        
-        # Setup slash commands
-        from ..commands import setup_slash_commands
-        setup_slash_commands(self)
-        
+        """Setup commands every deployment has; features come as extensions (setup_hook)"""
+        from ..commands import setup_help_command
+        setup_help_command(self)
+
+    async def _load_features(self):
+        """Load the enabled feature extensions before slash commands are synced"""
+        for feature in self.config.features:
+            if feature == "sheet_sync":
+                continue  # a Cog started once MongoDB is up (_start_services)
+            started = time.perf_counter()
+            try:
+                await self.load_extension(f"..extensions.{feature}", package=__package__)
+                print(f"[BOT] Đã nạp tính năng {feature} ({(time.perf_counter() - started) * 1000:.0f}ms)")
+            except Exception as e:
+                print(f"[BOT ERROR] Không thể nạp tính năng {feature}: {e}")
     
     async def setup_hook(self):
         """Called when the bot is starting up"""
         await self.logger.log("Bot đang khởi động...")
+
+        # Outbound HTTP pool shared by sheet sync and other integrations
+        self.http_client = HttpClient(
+            limit=self.config.http_pool_limit,
+            limit_per_host=self.config.http_pool_per_host,
+        )
+        await self.http_client.start()
+
+        await self._load_features()
+
+        # Everything that needs the database runs alongside the gateway login
+        # instead of delaying it; commands see `bot.mongo is None` until then
+        self._startup_task = asyncio.create_task(self._start_services())
+
+    async def _start_services(self):
+        """Connect MongoDB, then start the services built on it and sync slash commands"""
+        started = time.perf_counter()
+        if self.config.mongodb_uri:
+            self.mongo = await asyncio.to_thread(self._open_mongo)
+            if self.mongo:
+                mode = "offline từ snapshot, ghi vào journal chờ đồng bộ" if getattr(self.mongo, "offline", False) else "trực tuyến"
+                print(f"[DB] MongoDB sẵn sàng ({mode}) sau {time.perf_counter() - started:.2f}s")
+        else:
+            print("[DB] Chưa cấu hình MongoDB (bỏ qua)")
+
+        if self.mongo:
+            await self._setup_directory()
+
+        if getattr(self.mongo, "offline", False) and self.config.mongodb_uri:
+            self._mongo_reconnect_task = asyncio.create_task(self._reconnect_mongo())
+        else:
+            # Refresh the offline fallback on every healthy boot
+            self.schedule_snapshot_export()
         
         # Setup Google Sheet sync as Cog
-        try:
-            from .sheet_cog import setup_sheet_sync
-            await setup_sheet_sync(self)
-        except Exception as e:
-            print(f"[SHEET SYNC] Không thể khởi tạo Cog: {e}")
-        
-        # Sync slash commands with Discord
+        if "sheet_sync" in self.config.features:
+            try:
+                from .sheet_cog import setup_sheet_sync
+                await setup_sheet_sync(self)
+            except Exception as e:
+                print(f"[SHEET SYNC] Không thể khởi tạo Cog: {e}")
+
+        await self._sync_command_tree()
+        print(f"[BOT] Khởi động dịch vụ hoàn tất sau {time.perf_counter() - self._boot_started:.2f}s")
+        if self.is_ready():
+            self._warm_all_members()
+
+    def _command_tree_hash(self) -> str:
+        """Hash of the local slash command signatures (names, options, permissions...)"""
+        payload = sorted(
+            (cmd.to_dict(self.tree) for cmd in self.tree.get_commands()),
+            key=lambda c: (c.get("type", 1), c["name"]),
+        )
+        raw = json.dumps([self.application_id, payload], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _sync_command_tree(self):
+        """Sync slash commands with Discord only when their signatures changed"""
+        mongo = self.mongo
+        current = self._command_tree_hash()
+        if mongo:
+            try:
+                stored = await asyncio.to_thread(mongo.get_meta, COMMAND_TREE_HASH_KEY)
+            except Exception as e:
+                print(f"[BOT] Không đọc được hash slash commands, sẽ đồng bộ lại: {e}")
+                stored = None
+            if stored == current:
+                print("[BOT] Slash commands không đổi, bỏ qua đồng bộ")
+                return
         try:
             synced = await self.tree.sync()
             await self.logger.log(f"Đã đồng bộ {len(synced)} slash command(s)")
@@ -74,11 +264,23 @@ class VnuTourBot(commands.Bot):
         except Exception as e:
             await self.logger.log(f"Lỗi đồng bộ slash commands: {e}")
             print(f"[BOT ERROR] Lỗi đồng bộ slash commands: {e}")
+            return
+        # Offline the hash is not stored; the next online boot does
+        if mongo and not getattr(mongo, "offline", False):
+            try:
+                await asyncio.to_thread(mongo.set_meta, COMMAND_TREE_HASH_KEY, current)
+            except Exception as e:
+                print(f"[BOT] Không lưu được hash slash commands: {e}")
     
     async def on_ready(self):
         """Called when the bot is ready"""
         await self.logger.log(f"Bot đã sẵn sàng! Đăng nhập với tên: {self.user}")
         print(f"[BOT] Đã đăng nhập với tên: {self.user}")
+        if not self._ready_logged:
+            self._ready_logged = True
+            elapsed = time.perf_counter() - self._boot_started
+            await self.logger.log(f"Thời gian khởi động: {elapsed:.2f}s")
+            print(f"[BOT] Sẵn sàng sau {elapsed:.2f}s kể từ khi khởi tạo")
         
         # Set bot status
         await self.change_presence(
@@ -87,6 +289,24 @@ class VnuTourBot(commands.Bot):
                 name="!help để xem lệnh"
             )
         )
+
+        # Participants come from the database: wait for the startup task too
+        if self._startup_task is None or self._startup_task.done():
+            self._warm_all_members()
+
+    def _warm_all_members(self):
+        """Warm each guild once (on_ready fires again after reconnects)"""
+        if self.config.member_warmup == "lazy":
+            return
+        for guild in self.guilds:
+            if not self.member_resolver.warmed(guild.id):
+                asyncio.create_task(self._warm_members(guild))
+
+    async def _warm_members(self, guild):
+        try:
+            await self.member_resolver.warm(guild)
+        except Exception as e:
+            print(f"[MEMBERS] Lỗi nạp thành viên cho {guild.name}: {e}")
     
     async def on_command_error(self, ctx, error):
         """Global command error handler"""
@@ -116,6 +336,26 @@ class VnuTourBot(commands.Bot):
         await self.logger.log(error_msg)
         print(f"[ERROR] {error_msg}")
     
+    async def close(self):
+        """Close outbound HTTP connections before the gateway shuts down"""
+        for task in (self._startup_task, self._mongo_reconnect_task, self._assign_replay_task):
+            if task and not task.done():
+                task.cancel()
+        if self._snapshot_task and not self._snapshot_task.done():
+            # Let a running export finish its file rather than leave a .tmp behind
+            await asyncio.wait({self._snapshot_task}, timeout=30)
+            self._snapshot_task.cancel()
+        if self.player_state:
+            self.player_state.stop()  # before voice clients disconnect
+        if self.audio_pool:
+            await self.audio_pool.close()
+        if self.http_client:
+            try:
+                await self.http_client.close()
+            except Exception as e:
+                print(f"[HTTP] Lỗi đóng HTTP client: {e}")
+        await super().close()
+    
     def run_bot(self):
         """Start the bot"""
         try:
@@ -6,6 +6,16 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 
+# Features loadable as extensions (src/extensions) plus the sheet sync cog
+FEATURES = ("admin", "music", "tour", "sheet_sync")
+CACHE_PROFILES = ("full", "event")
+# Intents with no handler anywhere in the bot; dropped by the "event" profile
+EVENT_UNUSED_INTENTS = (
+    "typing", "invites", "webhooks", "integrations", "emojis_and_stickers",
+    "guild_scheduled_events", "auto_moderation", "dm_reactions", "polls",
+)
+
+
 class BotConfig:
     """Bot configuration class"""
     
@@ -26,10 +36,39 @@ class BotConfig:
         
         # FFmpeg configuration
         self.ffmpeg_exe = os.getenv("FFMPEG_EXE") or "ffmpeg"
+        # Music queues/positions saved across restarts ("" disables), save interval in seconds
+        player_state = os.getenv("PLAYER_STATE_PATH", "data/player_state.json")
+        self.player_state_path = (Path(__file__).parent.parent.parent / player_state) if player_state else None
+        self.player_state_interval = max(5, self._safe_int(os.getenv("PLAYER_STATE_INTERVAL")) or 30)
+        # Tracks one member may have queued at once (0 = unlimited)
+        self.music_max_per_user = max(0, self._safe_int(os.getenv("MUSIC_MAX_PER_USER")) or 0)
+        # Audio worker processes for extraction/decoding/encoding (0 = in the bot process)
+        self.audio_workers = max(0, self._safe_int(os.getenv("AUDIO_WORKERS")) or 0)
+        # Transcoded Opus files of played tracks ("" disables), size limit in MiB
+        audio_cache = os.getenv("AUDIO_CACHE_DIR", "data/audio_cache")
+        self.audio_cache_dir = (Path(__file__).parent.parent.parent / audio_cache) if audio_cache else None
+        self.audio_cache_max_mb = self._safe_int(os.getenv("AUDIO_CACHE_MAX_MB")) or 1024
+        # Measured loudness per video ("" disables normalisation), target level in LUFS
+        loudness = os.getenv("LOUDNESS_PATH", "data/loudness.json")
+        self.loudness_path = (Path(__file__).parent.parent.parent / loudness) if loudness else None
+        self.loudness_target = self._safe_int(os.getenv("LOUDNESS_TARGET")) or -16
         
         # Bot prefix
         self.prefix = "!"
 
+        # Enabled features, comma separated (default: all). A disabled feature's
+        # modules are never imported, e.g. BOT_FEATURES=admin,sheet_sync skips yt-dlp
+        features = os.getenv("BOT_FEATURES")
+        if features is None or not features.strip():
+            self.features = list(FEATURES)
+        else:
+            self.features = []
+            for name in (f.strip().lower() for f in features.split(",")):
+                if name in FEATURES and name not in self.features:
+                    self.features.append(name)
+                elif name:
+                    print(f"[CONFIG] Bỏ qua tính năng không hợp lệ: {name}")
+
         # Intents
         self.intents = {
             "message_content": True,
@@ -38,21 +77,84 @@ class BotConfig:
             "voice_states": True
         }
 
+        # Gateway/cache profile:
+        # "full"  = discord.py defaults: every member and 1000 messages cached
+        # "event" = members cached only while in voice (participants are kept by
+        #           MemberResolver), message cache only as large as edit/delete
+        #           logging needs, intents the bot never handles switched off
+        self.cache_profile = (os.getenv("CACHE_PROFILE") or "full").strip().lower()
+        if self.cache_profile not in CACHE_PROFILES:
+            self.cache_profile = "full"
+        # Messages kept for on_message_edit/delete logs (0 = no message cache)
+        self.message_cache_size = self._safe_int(os.getenv("MESSAGE_CACHE_SIZE"))
+        # Extra intents to switch off, comma separated (e.g. "typing,invites")
+        self.disabled_intents = [i.strip() for i in (os.getenv("DISABLED_INTENTS") or "").split(",") if i.strip()]
+        if self.cache_profile == "event":
+            self.disabled_intents += [i for i in EVENT_UNUSED_INTENTS if i not in self.disabled_intents]
+
+        # Member loading: "chunk" = full guild chunk at startup (discord.py default),
+        # "participants" = skip chunking and query only members with an MSSV,
+        # "lazy" = no warm-up, resolve members in batches on demand
+        default_warmup = "chunk" if self.cache_profile == "full" else "participants"
+        self.member_warmup = (os.getenv("MEMBER_WARMUP") or default_warmup).strip().lower()
+        if self.member_warmup not in ("chunk", "participants", "lazy"):
+            self.member_warmup = default_warmup
+
         # MongoDB configuration (optional but recommended)
         # MongoDB connection string is stored under key `MongoDB` in .env
         self.mongodb_uri = os.getenv("MongoDB")
         self.mongodb_db = os.getenv("MONGODB_DB_NAME", "vnutour")
+        # Local snapshot used to boot offline (writes journaled) when MongoDB is unreachable ("" disables)
+        snapshot = os.getenv("SNAPSHOT_PATH", "data/snapshot.jsonl.gz")
+        self.snapshot_path = (Path(__file__).parent.parent.parent / snapshot) if snapshot else None
+        self.mongo_reconnect_interval = max(10, self._safe_int(os.getenv("MONGO_RECONNECT_INTERVAL")) or 60)
+        # Write-behind journal for /assign (acknowledged from cache, replayed to MongoDB)
+        self.assign_journal_path = Path(__file__).parent.parent.parent / os.getenv("ASSIGN_JOURNAL_PATH", "data/assign_journal.jsonl")
+
+        # Shared outbound HTTP pool (Google APIs, future integrations)
+        self.http_pool_limit = self._safe_int(os.getenv("HTTP_POOL_LIMIT")) or 50
+        self.http_pool_per_host = self._safe_int(os.getenv("HTTP_POOL_PER_HOST")) or 10
 
         # Google Sheets sync configuration
         self.google_sheet_api_key = os.getenv("GoogleSheetAPI")
         self.google_sheet_id = os.getenv("GoogleSheetID")
         self.google_sheet_range = os.getenv("GOOGLE_SHEET_RANGE", "A1:K")
+        # Override only to point at a local stand-in (benchmarks)
+        self.google_sheet_api_base = os.getenv("GOOGLE_SHEET_API_BASE", "https://sheets.googleapis.com/v4")
         # sync interval: default 60s, minimum 30s
         try:
             interval = int(os.getenv("SHEET_SYNC_INTERVAL", "60"))
         except ValueError:
             interval = 60
         self.sheet_sync_interval = max(30, interval)
+        # adaptive interval ceiling while the sheet stays unchanged, per-run timeout
+        try:
+            self.sheet_sync_max_interval = max(self.sheet_sync_interval, int(os.getenv("SHEET_SYNC_MAX_INTERVAL", "600")))
+            self.sheet_sync_timeout = max(30, int(os.getenv("SHEET_SYNC_TIMEOUT", "300")))
+        except ValueError:
+            self.sheet_sync_max_interval = max(self.sheet_sync_interval, 600)
+            self.sheet_sync_timeout = 300
+        # Distributed sync lease: only the holder syncs, other instances stay idle
+        self.instance_id = os.getenv("BOT_INSTANCE_ID")
+        try:
+            self.sheet_sync_lease_ttl = max(15, int(os.getenv("SHEET_SYNC_LEASE_TTL", "90")))
+        except ValueError:
+            self.sheet_sync_lease_ttl = 90
+        # rows per bulk write while syncing (bounds peak memory)
+        try:
+            batch_size = int(os.getenv("SHEET_SYNC_BATCH_SIZE", "500"))
+        except ValueError:
+            batch_size = 500
+        self.sheet_sync_batch_size = max(50, batch_size)
+        # Drive metadata is used as a cheap revision check before fetching
+        self.google_drive_api_base = os.getenv("GOOGLE_DRIVE_API_BASE", "https://www.googleapis.com/drive/v3")
+        # rows per batchGet window (0 = single streamed request), windows per request
+        try:
+            self.sheet_window_rows = max(0, int(os.getenv("SHEET_WINDOW_ROWS", "500")))
+            self.sheet_windows_per_request = max(1, int(os.getenv("SHEET_WINDOWS_PER_REQUEST", "10")))
+        except ValueError:
+            self.sheet_window_rows = 500
+            self.sheet_windows_per_request = 10
     
     def _safe_int(self, value: str) -> int:
         """Safely convert string to int"""
@@ -67,8 +169,38 @@ class BotConfig:
         intents = discord.Intents.default()
         for key, value in self.intents.items():
             setattr(intents, key, value)
+        for key in self.disabled_intents:
+            if key in discord.Intents.VALID_FLAGS:
+                setattr(intents, key, False)
+            else:
+                print(f"[CONFIG] Bỏ qua intent không hợp lệ: {key}")
         return intents
 
+    def get_member_cache_flags(self, intents):
+        """None keeps discord.py's default (derived from intents)"""
+        import discord
+        if self.cache_profile == "full":
+            return None
+        return discord.MemberCacheFlags(voice=intents.voice_states, joined=False)
+
+    def get_max_messages(self):
+        if self.message_cache_size is not None:
+            return self.message_cache_size or None
+        if self.cache_profile == "full":
+            return 1000
+        # Edit/delete logs are the only reader of the message cache
+        return 500 if self.log_channel_id else None
+
+    def client_options(self) -> dict:
+        """Keyword arguments for commands.Bot covering intents and caches"""
+        intents = self.get_intents()
+        return {
+            "intents": intents,
+            "member_cache_flags": self.get_member_cache_flags(intents),
+            "max_messages": self.get_max_messages(),
+            "chunk_guilds_at_startup": self.member_warmup == "chunk" and intents.members,
+        }
+
 
 
 
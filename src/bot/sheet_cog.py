@@ -1,117 +1,415 @@
 """
 Cog chạy đồng bộ Google Sheet -> MongoDB định kỳ
+
+Single scheduler for the sheet sync: one run at a time (lock), adaptive
+interval with jitter, timeouts that never cut a meta commit in half, and a
+queue so `!syncnow` requests piggyback on the next run instead of overlapping.
+Across processes a lease in `meta` picks the one instance that syncs.
 """
 from __future__ import annotations
 
-from discord.ext import commands, tasks
+import asyncio
+import random
+import time
 from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from discord.ext import commands
+
+from ..utils.lease import MongoLease
+from ..utils.sheets import (
+    MSSV_SLOT,
+    FetchStats,
+    RowMapper,
+    RowSpool,
+    SheetHasher,
+    fetch_sheet_revision,
+    iter_sheet_rows,
+    iter_sheet_values,
+    iter_value_windows,
+    row_to_dict,
+    window_hash,
+)
+
+
+META_KEYS = ("sheet_hash", "sheet_revision", "sheet_window_hashes")
+HISTORY_KEY = "sheet_sync_history"
+HISTORY_LIMIT = 50
+LEASE_NAME = "sheet_sync"
+
+
+class LeaseLost(Exception):
+    """Another instance took the sync lease over while this one was running."""
+
+
+def _ts() -> str:
+    return datetime.now(timezone.utc).strftime('%H:%M:%S')
+
 
-from ..utils.sheets import fetch_sheet_rows_and_hash
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
 
 
 class SheetSyncCog(commands.Cog):
+    # Interval grows by this factor per unchanged/failed run, resets after an edit
+    BACKOFF_FACTOR = 1.5
+    # +/- fraction of the interval added as random jitter
+    JITTER = 0.1
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.enabled = bool(
             getattr(bot, "mongo", None)
+            and not getattr(bot.mongo, "offline", False)  # offline snapshot
             and bot.config.google_sheet_api_key
             and bot.config.google_sheet_id
         )
-        self.interval = bot.config.sheet_sync_interval
+        self.base_interval = max(30, bot.config.sheet_sync_interval)
+        self.max_interval = max(self.base_interval, bot.config.sheet_sync_max_interval)
+        self.timeout = bot.config.sheet_sync_timeout
+        self.interval = self.base_interval
+
+        mongo = getattr(bot, "mongo", None)
+        self.lease: Optional[MongoLease] = None
         if self.enabled:
-            # Bind the loop with dynamic interval
-            self.sheet_sync_loop.change_interval(seconds=max(30, self.interval))
-            self.sheet_sync_loop.start()
+            self.lease = MongoLease(
+                mongo.meta,
+                LEASE_NAME,
+                ttl=bot.config.sheet_sync_lease_ttl,
+                owner=bot.config.instance_id or None,
+            )
+        self._standby: Optional[bool] = None
 
-    def cog_unload(self):
-        if self.sheet_sync_loop.is_running():
-            self.sheet_sync_loop.cancel()
+        self.last_outcome: Optional[Dict[str, Any]] = None
+        self.next_run_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._manual: "asyncio.Queue[asyncio.Future]" = asyncio.Queue()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._keeper: Optional[asyncio.Task] = None
 
-    async def _sync_once(self):
-        mongo = getattr(self.bot, "mongo", None)
-        if not mongo:
-            return
-        # Log start
-        if getattr(self.bot, "logger", None):
+    async def cog_load(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._scheduler(), name="sheet-sync-scheduler")
+            self._keeper = asyncio.create_task(self._lease_keeper(), name="sheet-sync-lease")
+
+    async def cog_unload(self):
+        for task in (self._task, self._keeper):
+            if task and not task.done():
+                task.cancel()
+        self._task = self._keeper = None
+        # Hand the lease over right away instead of letting standbys wait for expiry
+        if self.lease is not None and self.lease.token is not None:
             try:
-                print("Đang đồng bộ Google Sheet -> MongoDB...")
-            except Exception:
+                await asyncio.to_thread(self.lease.release)
+                print(f"[{_ts()}] [SHEET SYNC] Đã trả lease đồng bộ")
+            except Exception as e:
+                print(f"[{_ts()}] [SHEET SYNC] Không thể trả lease: {e}")
+        # Fail pending manual triggers instead of leaving them hanging
+        while not self._manual.empty():
+            fut = self._manual.get_nowait()
+            if not fut.done():
+                fut.cancel()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    # ----- Lease -----
+    async def _lease_keeper(self):
+        """Renew the lease while held, during syncs and the idle wait between them."""
+        period = max(1.0, self.lease.ttl / 3)
+        while True:
+            await asyncio.sleep(period)
+            if self.lease.token is None:
+                continue
+            try:
+                if not await asyncio.to_thread(self.lease.renew):
+                    print(f"[{_ts()}] [SHEET SYNC] Mất lease đồng bộ, chuyển sang chờ")
+            except Exception as e:
+                print(f"[{_ts()}] [SHEET SYNC] Lỗi gia hạn lease: {e}")
+
+    async def _acquire_lease(self) -> bool:
+        if self.lease is None:
+            return True
+        try:
+            acquired = await asyncio.to_thread(self.lease.acquire)
+        except Exception as e:
+            print(f"[{_ts()}] [SHEET SYNC] Lỗi lấy lease: {e}")
+            return False
+        if self._standby is None or acquired == self._standby:
+            # Log only transitions, standbys poll every interval
+            if acquired:
+                print(f"[{_ts()}] [SHEET SYNC] Nhận lease đồng bộ (token {self.lease.token})")
+            else:
+                print(f"[{_ts()}] [SHEET SYNC] Instance khác đang đồng bộ, chuyển sang chờ")
+        self._standby = not acquired
+        return acquired
+
+    # ----- Scheduling -----
+    def _next_delay(self, outcome: Dict[str, Any]) -> float:
+        if outcome.get("status") in ("changed", "standby"):
+            # Standbys poll at the base interval so failover stays quick
+            self.interval = self.base_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.BACKOFF_FACTOR)
+        jitter = self.interval * self.JITTER
+        return max(1.0, self.interval + random.uniform(-jitter, jitter))
+
+    async def _scheduler(self):
+        await self.bot.wait_until_ready()
+        delay = 0.0  # immediate sync on startup
+        while True:
+            self.next_run_at = time.time() + delay
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
                 pass
+            self._wake.clear()
+
+            # Every trigger queued so far is served by this one run
+            waiters: List[asyncio.Future] = []
+            while not self._manual.empty():
+                waiters.append(self._manual.get_nowait())
+
+            try:
+                outcome = await self.run_sync("manual" if waiters else "scheduled")
+            except asyncio.CancelledError:
+                for fut in waiters:
+                    if not fut.done():
+                        fut.cancel()
+                raise
+            except Exception as e:
+                outcome = {"status": "error", "error": str(e)}
+                print(f"[{_ts()}] [SHEET SYNC ERROR] {e}")
+
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(outcome)
+            delay = self._next_delay(outcome)
+
+    async def request_sync(self) -> Dict[str, Any]:
+        """Queue a manual sync and wait for the run that serves it."""
+        if self._task is None or self._task.done():
+            # Scheduler not running (disabled/unloaded): run inline, still single-flight
+            return await self.run_sync("manual")
+        fut = asyncio.get_running_loop().create_future()
+        await self._manual.put(fut)
+        self._wake.set()
+        return await fut
+
+    async def run_sync(self, reason: str = "scheduled") -> Dict[str, Any]:
+        """Run one sync under the single-flight lock and record it in meta history."""
+        async with self._lock:
+            if not await self._acquire_lease():
+                self.last_outcome = {"status": "standby", "reason": reason, "started_at": _now_iso()}
+                return self.last_outcome
+
+            started_at = _now_iso()
+            started = time.perf_counter()
+            try:
+                outcome = await asyncio.wait_for(self._sync_once(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                outcome = {"status": "timeout"}
+                print(f"[{_ts()}] [SHEET SYNC TIMEOUT] Sync took too long, cancelled")
+
+            outcome.update(
+                reason=reason,
+                started_at=started_at,
+                duration_ms=round((time.perf_counter() - started) * 1000),
+                interval=round(self.interval),
+            )
+            self.last_outcome = outcome
+            if outcome["status"] == "changed":
+                directory = getattr(self.bot, "directory", None)
+                if directory is not None:
+                    # New MSSVs must be assignable right away
+                    asyncio.create_task(directory.refresh(self.bot.mongo))
+                if hasattr(self.bot, "schedule_snapshot_export"):
+                    # Keep the offline fallback close to the sheet
+                    self.bot.schedule_snapshot_export()
+            mongo = getattr(self.bot, "mongo", None)
+            if mongo and outcome["status"] != "disabled":
+                entry = {k: outcome.get(k) for k in ("reason", "status", "started_at", "duration_ms", "interval")}
+                if self.lease is not None:
+                    entry.update(owner=self.lease.owner, token=self.lease.token)
+                result = outcome.get("result") or {}
+                entry.update(created=result.get("created", 0), updated=result.get("updated", 0))
+                fetch = outcome.get("fetch") or {}
+                entry.update(bytes=fetch.get("bytes", 0), requests=fetch.get("requests", 0))
+                try:
+                    await asyncio.shield(asyncio.to_thread(mongo.push_meta_history, HISTORY_KEY, entry, HISTORY_LIMIT))
+                except Exception as e:
+                    print(f"[{_ts()}] [SHEET SYNC] Không thể lưu lịch sử: {e}")
+            return outcome
+
+    # ----- One sync pass -----
+    async def _fence(self):
+        # renew() only matches our token, so a stalled ex-holder stops writing
+        if self.lease is not None and not await asyncio.to_thread(self.lease.renew):
+            raise LeaseLost("lease đồng bộ đã chuyển sang instance khác")
+
+    async def _commit_meta(self, mongo, values: Dict[str, Any]):
+        await self._fence()
+        # Shielded so a timeout never leaves hash/revision/window hashes out of step
+        await asyncio.shield(asyncio.to_thread(mongo.update_meta, values))
+
+    async def _sync_once(self) -> Dict[str, Any]:
+        mongo = getattr(self.bot, "mongo", None)
+        if not mongo:
+            return {"status": "disabled"}
+        print("Đang đồng bộ Google Sheet -> MongoDB...")
+        config = self.bot.config
+        stats = FetchStats()
+        outcome: Dict[str, Any] = {"status": "error"}
         try:
-            # Fetch data with timeout
-            rows, h = await fetch_sheet_rows_and_hash(
-                self.bot.config.google_sheet_api_key,
-                self.bot.config.google_sheet_id,
-                self.bot.config.google_sheet_range,
+            prev = await asyncio.to_thread(mongo.get_meta_many, META_KEYS)
+            # Cheap revision check first: skip the download entirely when unchanged
+            revision = await fetch_sheet_revision(
+                config.google_sheet_api_key,
+                config.google_sheet_id,
+                config.google_drive_api_base,
+                stats,
+                http=getattr(self.bot, "http_client", None),
             )
-            
-            prev = mongo.get_meta("sheet_hash")
-            if prev == h:
-                # Update last sync time even if no changes
-                mongo.set_meta("sheet_last_sync_at", datetime.now(timezone.utc).isoformat())
-                print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] Không có thay đổi, cập nhật timestamp")
-                return
-                
-            # Process rows in smaller batches to avoid blocking
-            filtered_rows = [r for r in rows if r.get("mssv")]
-            total_rows = len(filtered_rows)
-            print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] Đang xử lý {total_rows} rows...")
-            
-            if total_rows == 0:
-                print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] Không có rows để xử lý")
-                return
-            
-            # Use async version to prevent blocking
-            if hasattr(mongo, 'sync_from_rows_async'):
-                print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] Sử dụng async sync (non-blocking)...")
-                result = await mongo.sync_from_rows_async(filtered_rows)
+            stats.revision = revision
+            if revision and revision == prev.get("sheet_revision") and prev.get("sheet_hash"):
+                stats.full_fetch_avoided = True
+                await self._commit_meta(mongo, {"sheet_last_sync_at": _now_iso()})
+                print(f"[{_ts()}] Revision {revision} không đổi, bỏ qua tải sheet")
+                outcome = {"status": "unchanged"}
+                return outcome
+
+            if config.sheet_window_rows > 0:
+                result, h, extra = await self._sync_windows(mongo, config, stats, prev)
             else:
-                # Fallback to sync version if async not available
-                print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] Sử dụng sync sync (có thể block)...")
-                result = mongo.sync_from_rows(filtered_rows)
-            
-            # Update metadata
-            mongo.set_meta("sheet_hash", h)
-            mongo.set_meta("sheet_last_sync_at", datetime.now(timezone.utc).isoformat())
-            mongo.set_meta("sheet_last_result", result)
-            
-            # Log result
-            print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] Đồng bộ xong: tạo {result['created']}, cập nhật {result['updated']}, lỗi {result.get('errors', 0)}")
-            
+                result, h, extra = await self._sync_stream(mongo, config, stats, prev)
+
+            updates: Dict[str, Any] = dict(extra)
+            updates["sheet_hash"] = h
+            updates["sheet_last_sync_at"] = _now_iso()
+            if revision:
+                updates["sheet_revision"] = revision
+            if result is not None:
+                updates["sheet_last_result"] = result
+            await self._commit_meta(mongo, updates)
+
+            if result is None:
+                print(f"[{_ts()}] Không có thay đổi, cập nhật timestamp")
+                outcome = {"status": "unchanged"}
+            else:
+                print(f"[{_ts()}] Đồng bộ xong: tạo {result['created']}, cập nhật {result['updated']}, lỗi {result.get('errors', 0)}")
+                outcome = {"status": "changed", "result": result}
+            return outcome
+
         except Exception as e:
-            error_msg = f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] [SHEET SYNC ERROR] {e}"
-            print(error_msg)
-            
-            # Update error metadata
+            print(f"[{_ts()}] [SHEET SYNC ERROR] {e}")
+            outcome = {"status": "error", "error": str(e)}
             try:
-                mongo.set_meta("sheet_last_error", str(e))
-                mongo.set_meta("sheet_last_error_at", datetime.now(timezone.utc).isoformat())
-            except:
+                await self._commit_meta(mongo, {"sheet_last_error": str(e), "sheet_last_error_at": _now_iso()})
+            except Exception:
+                pass
+            return outcome
+        finally:
+            outcome["fetch"] = stats.to_dict()
+            print(
+                f"[{_ts()}] Đã tải {stats.bytes} bytes / {stats.requests} request"
+                f" (bỏ qua tải toàn bộ: {'có' if stats.full_fetch_avoided else 'không'})"
+            )
+            try:
+                await asyncio.to_thread(mongo.set_meta, "sheet_last_fetch", stats.to_dict())
+            except Exception:
                 pass
 
-    @tasks.loop(seconds=60)  # This will be overridden by change_interval in __init__
-    async def sheet_sync_loop(self):
-        try:
-            # Add timeout to prevent blocking
-            import asyncio
-            await asyncio.wait_for(self._sync_once(), timeout=300)  # 5 minutes timeout
-        except asyncio.TimeoutError:
-            print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] [SHEET SYNC TIMEOUT] Sync took too long, cancelled")
-        except Exception as e:
-            print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] [SHEET SYNC ERROR] {e}")
+    async def _sync_windows(self, mongo, config, stats: FetchStats, prev: Dict[str, Any]):
+        """Fetch the sheet in row windows and only write windows whose hash changed.
 
-    @sheet_sync_loop.before_loop
-    async def before_sheet_sync(self):
-        # Wait for bot ready, then run an immediate sync before entering the interval loop
-        await self.bot.wait_until_ready()
-        try:
-            # Add timeout to prevent blocking
-            import asyncio
-            await asyncio.wait_for(self._sync_once(), timeout=300)  # 5 minutes timeout
-        except asyncio.TimeoutError:
-            print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] [SHEET SYNC TIMEOUT] Initial sync took too long, cancelled")
-        except Exception as e:
-            print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] [SHEET SYNC ERROR] {e}")
+        Returns (result or None if nothing changed, sheet hash, meta to commit).
+        """
+        prev_hashes = prev.get("sheet_window_hashes") or {}
+        prev_windows = prev_hashes.get("windows") or []
+        hasher = SheetHasher()
+        mapper = None
+        header_hash = None
+        header_changed = True
+        new_windows = []
+        totals = {"created": 0, "updated": 0, "errors": 0}
+
+        async for index, rows in iter_value_windows(
+            config.google_sheet_api_key,
+            config.google_sheet_id,
+            config.google_sheet_range,
+            config.sheet_window_rows,
+            config.sheet_windows_per_request,
+            config.google_sheet_api_base,
+            stats,
+            http=getattr(self.bot, "http_client", None),
+        ):
+            for row in rows:
+                hasher.update(row)
+            if index == 0:
+                header_hash = window_hash(rows)
+                header_changed = header_hash != prev_hashes.get("header")
+                mapper = RowMapper(rows[0] if rows else [])
+                continue
+
+            stats.windows_total += 1
+            wh = window_hash(rows)
+            new_windows.append(wh)
+            if not header_changed and index - 1 < len(prev_windows) and prev_windows[index - 1] == wh:
+                continue
+
+            stats.windows_changed += 1
+            if not rows:
+                continue  # rows cleared: nothing to write, the new hash is recorded
+            mapped = (row_to_dict(r) for r in map(mapper.map, rows) if r[MSSV_SLOT])
+            result = await mongo.sync_from_row_stream(
+                mapped, batch_size=config.sheet_sync_batch_size, before_batch=self._fence
+            )
+            for k in totals:
+                totals[k] += result.get(k, 0)
+
+        print(f"[{_ts()}] {stats.windows_changed}/{stats.windows_total} cửa sổ có thay đổi")
+        extra = {"sheet_window_hashes": {"header": header_hash, "windows": new_windows}}
+        return (totals if stats.windows_changed else None), hasher.hexdigest(), extra
+
+    async def _sync_stream(self, mongo, config, stats: FetchStats, prev: Dict[str, Any]):
+        """Stream the whole range in one request and write everything if the hash changed.
+
+        Returns (result or None if nothing changed, sheet hash, meta to commit).
+        """
+        # Rows are mapped and hashed as they download, and spooled
+        # (spilling to disk) until we know the hash changed
+        hasher = SheetHasher()
+        with RowSpool() as spool:
+            values = iter_sheet_values(
+                config.google_sheet_api_key,
+                config.google_sheet_id,
+                config.google_sheet_range,
+                config.google_sheet_api_base,
+                stats=stats,
+                http=getattr(self.bot, "http_client", None),
+            )
+            async for row in iter_sheet_rows(values, hasher):
+                if row[MSSV_SLOT]:
+                    spool.append(row)
+            h = hasher.hexdigest()
+
+            if prev.get("sheet_hash") == h:
+                return None, h, {}
+
+            total_rows = len(spool)
+            print(f"[{_ts()}] Đang xử lý {total_rows} rows...")
+            if total_rows == 0:
+                return None, h, {}
+
+            # Batched bulk writes, one batch in memory at a time
+            result = await mongo.sync_from_row_stream(
+                (row_to_dict(r) for r in spool),
+                batch_size=config.sheet_sync_batch_size,
+                before_batch=self._fence,
+            )
+        return result, h, {}
 
 
 async def setup_sheet_sync(bot: commands.Bot):
@@ -1,20 +1,35 @@
 """
 Commands module for bot commands
+
+Feature modules are imported on first access, so loading one feature (see
+src/extensions) does not import the others.
 """
+from importlib import import_module
 
-from .music_commands import setup_music_commands
-from .admin_commands import setup_admin_commands
-from .tour_commands import setup_tour_commands
 from .help_command import setup_help_command
-from .slash_commands import setup_slash_commands
+
+_LAZY = {
+    'setup_music_commands': '.music_commands',
+    'setup_music_slash_commands': '.music_slash_commands',
+    'setup_admin_commands': '.admin_commands',
+    'setup_tour_commands': '.tour_commands',
+    'setup_slash_commands': '.slash_commands',
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module, __name__), name)
 
 
 def setup_commands(bot):
     """Setup all bot commands"""
     setup_help_command(bot)  # Setup help command first
-    setup_music_commands(bot)
-    setup_admin_commands(bot)
-    setup_tour_commands(bot)
+    __getattr__('setup_music_commands')(bot)
+    __getattr__('setup_admin_commands')(bot)
+    __getattr__('setup_tour_commands')(bot)
 
 
-__all__ = ['setup_commands', 'setup_music_commands', 'setup_admin_commands', 'setup_tour_commands', 'setup_help_command', 'setup_slash_commands']
+__all__ = ['setup_commands', 'setup_help_command', *_LAZY]
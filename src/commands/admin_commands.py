@@ -5,6 +5,9 @@ import discord
 from discord.ext import commands
 from datetime import datetime, timezone
 
+from ..services import ServiceError, service_stats
+from ..utils.responder import Responder, api_call_stats
+
 
 def setup_admin_commands(bot):
     """Setup admin commands"""
@@ -49,107 +52,28 @@ def setup_admin_commands(bot):
     @bot.command(name="assign")
     async def assign(ctx, mssv: str):
         """Gán Discord ID của bạn vào MSSV trong cơ sở dữ liệu."""
+        service = bot.directory_service
         try:
-            mongo = getattr(bot, "mongo", None)
-            if not mongo:
-                await ctx.send("Hệ thống cơ sở dữ liệu chưa được cấu hình.")
-                return
-
-            status, message = mongo.assign_discord_by_mssv(mssv, ctx.author.id)
+            result = await service.assign(mssv, ctx.author.id)
 
-            # Fetch participant info for confirmation DM
-            doc = None
-            try:
-                doc = mongo.participants.find_one({"mssv": str(mssv).strip()})
-            except Exception:
-                doc = None
-
-            # Handle different status cases
-            if status == "discord_already_used":
-                # Find the participant who is currently using this Discord ID
-                current_discord_user = mongo.participants.find_one({"discord_id": ctx.author.id})
-                
-                # Send detailed error message to user
-                error_embed = discord.Embed(
-                    title="❌ **Lỗi: Discord ID đã được sử dụng**",
-                    description=message,
-                    color=0xe74c3c
-                )
-                error_embed.add_field(
-                    name="🔧 **Cần hỗ trợ**",
-                    value="Discord ID của bạn đã được sử dụng bởi MSSV khác. Vui lòng liên hệ admin để được hỗ trợ.",
-                    inline=False
-                )
-                error_embed.add_field(
-                    name="📋 **Thông tin người đang sử dụng Discord ID của bạn**",
-                    value=f"MSSV: {current_discord_user.get('mssv', 'Không có') if current_discord_user else 'Không tìm thấy'}\nHọ và tên: {current_discord_user.get('full_name', 'Không có tên') if current_discord_user else 'Không tìm thấy'}",
-                    inline=False
-                )
-                
-                # Add support channel information
-                if bot.config.support_channel_id:
-                    support_channel = bot.get_channel(bot.config.support_channel_id)
-                    if support_channel:
-                        error_embed.add_field(
-                            name="📞 **Liên hệ hỗ trợ**",
-                            value=f"Vui lòng đến channel {support_channel.mention} để được admin hỗ trợ giải quyết vấn đề này.",
-                            inline=False
-                        )
-                    else:
-                        error_embed.add_field(
-                            name="📞 **Liên hệ hỗ trợ**",
-                            value="Vui lòng liên hệ admin để được hỗ trợ giải quyết vấn đề này.",
-                            inline=False
-                        )
-                else:
-                    error_embed.add_field(
-                        name="📞 **Liên hệ hỗ trợ**",
-                        value="Vui lòng liên hệ admin để được hỗ trợ giải quyết vấn đề này.",
-                        inline=False
-                    )
-                
+            if result.status == "discord_already_used":
                 # Try to send DM first, fallback to public reply if DM fails
                 try:
-                    await ctx.author.send(embed=error_embed)
+                    await ctx.author.send(embed=service.conflict_embed(result))
                     await ctx.reply("📬 Đã gửi thông tin lỗi qua tin nhắn riêng (DM). Vui lòng kiểm tra DM của bạn.", mention_author=False)
                 except discord.Forbidden:
-                    # If DM fails, send public reply (ephemeral-like behavior)
                     await ctx.reply("📬 **Lỗi Discord ID Conflict** - Vui lòng mở DM để nhận thông tin chi tiết.", mention_author=False)
-                
                 return
 
             # Send DM with details (private) for other cases
             try:
-                embed = discord.Embed(
-                    title="Kết quả liên kết MSSV",
-                    description=message,
-                    color=0x2ecc71 if status in ("ok", "already_linked") else 0xe67e22,
-                )
-                if doc:
-                    embed.add_field(name="Họ và tên", value=doc.get("full_name") or "-", inline=False)
-                    embed.add_field(name="MSSV", value=doc.get("mssv") or "-", inline=True)
-                    team = doc.get("team_name") or doc.get("team_id") or "-"
-                    embed.add_field(name="Tên đội", value=str(team), inline=True)
-                
-                # Thêm thông tin chi tiết về trạng thái
-                if status == "already_assigned":
-                    embed.add_field(
-                        name="⚠️ Lưu ý", 
-                        value="MSSV này đã được liên kết với tài khoản Discord khác. Nếu bạn nghĩ đây là lỗi, vui lòng liên hệ admin.", 
-                        inline=False
-                    )
-                elif status == "already_linked":
-                    embed.add_field(
-                        name="ℹ️ Thông tin", 
-                        value="MSSV này đã được liên kết với Discord của bạn rồi.", 
-                        inline=False
-                    )
-                
-                await ctx.author.send(embed=embed)
+                await ctx.author.send(embed=service.assign_embed(result))
                 await ctx.reply("Đã gửi thông tin xác nhận qua tin nhắn riêng (DM).", mention_author=False)
             except discord.Forbidden:
-                await ctx.send(message + " (Không thể gửi DM, vui lòng mở DM)")
+                await ctx.send(result.message + " (Không thể gửi DM, vui lòng mở DM)")
 
+        except ServiceError as e:
+            await ctx.send(str(e))
         except Exception as e:
             await ctx.send(f"Lỗi: {e}")
 
@@ -157,72 +81,20 @@ def setup_admin_commands(bot):
     @bot.command(name="check")
     async def check(ctx, mssv: str = None):
         """Kiểm tra thông tin tham gia viên. Nếu không có MSSV, kiểm tra Discord ID của bạn."""
+        service = bot.directory_service
         try:
-            mongo = getattr(bot, "mongo", None)
-            if not mongo:
-                await ctx.send("Hệ thống cơ sở dữ liệu chưa được cấu hình.")
-                return
-
-            # If no MSSV provided, check by Discord ID
-            if not mssv:
-                doc = mongo.participants.find_one({"discord_id": ctx.author.id})
-                if not doc:
-                    await ctx.send("❌ **Không tìm thấy thông tin:** Bạn chưa liên kết MSSV nào với Discord của mình.\nSử dụng `!assign <mssv>` để liên kết.")
-                    return
-                mssv = doc.get("mssv")
-            else:
-                # Check by MSSV
-                doc = mongo.participants.find_one({"mssv": str(mssv).strip()})
-                if not doc:
-                    await ctx.send(f"❌ **Không tìm thấy:** MSSV {mssv} không tồn tại trong hệ thống.")
-                    return
-
-            # Create detailed embed
-            embed = discord.Embed(
-                title="📋 Thông tin tham gia viên",
-                color=0x3498db
-            )
-            
-            embed.add_field(name="👤 **Họ và tên**", value=doc.get("full_name") or "-", inline=False)
-            embed.add_field(name="🆔 **MSSV**", value=doc.get("mssv") or "-", inline=True)
-            embed.add_field(name="📧 **Email**", value=doc.get("email") or "-", inline=True)
-            embed.add_field(name="📱 **Số điện thoại**", value=doc.get("phone") or "-", inline=True)
-            embed.add_field(name="🏫 **Trường**", value=doc.get("school") or "-", inline=True)
-            embed.add_field(name="🎓 **Khoa**", value=doc.get("faculty") or "-", inline=True)
-            embed.add_field(name="📘 **Facebook**", value=doc.get("facebook") or "-", inline=True)
-            
-            # Team information
-            team = doc.get("team_name") or doc.get("team_id") or "-"
-            embed.add_field(name="👥 **Tên đội**", value=str(team), inline=True)
-            
-            # Discord link status
-            discord_id = doc.get("discord_id")
-            if discord_id:
-                if int(discord_id) == ctx.author.id:
-                    embed.add_field(name="🔗 **Trạng thái Discord**", value="✅ Đã liên kết với bạn", inline=True)
-                else:
-                    embed.add_field(name="🔗 **Trạng thái Discord**", value=f"⚠️ Liên kết với Discord ID khác: {discord_id}", inline=True)
-            else:
-                embed.add_field(name="🔗 **Trạng thái Discord**", value="❌ Chưa liên kết", inline=True)
-            
-            # Timestamp
-            if doc.get("updated_at"):
-                embed.add_field(name="🕒 **Cập nhật lần cuối**", value=doc.get("updated_at").strftime("%d/%m/%Y %H:%M:%S"), inline=False)
+            doc = await service.find(ctx.author.id, mssv)
 
             # Send DM with detailed info
             try:
-                await ctx.author.send(embed=embed)
+                await ctx.author.send(embed=service.participant_embed(doc, ctx.author.id))
                 await ctx.reply("📬 Đã gửi thông tin chi tiết qua tin nhắn riêng (DM).", mention_author=False)
             except discord.Forbidden:
                 # If DM fails, send public response (less detailed)
-                public_embed = discord.Embed(
-                    title=f"📋 Thông tin MSSV {doc.get('mssv')}",
-                    description=f"**Họ và tên:** {doc.get('full_name')}\n**Đội:** {team}",
-                    color=0x3498db
-                )
-                await ctx.send(embed=public_embed)
-                await ctx.send("💡 **Gợi ý:** Mở DM để nhận thông tin chi tiết hơn.")
+                await ctx.send("💡 **Gợi ý:** Mở DM để nhận thông tin chi tiết hơn.", embed=service.participant_summary_embed(doc))
 
+        except ServiceError as e:
+            await ctx.send(str(e))
         except Exception as e:
             await ctx.send(f"❌ **Lỗi:** {e}")
 
@@ -240,10 +112,79 @@ def setup_admin_commands(bot):
             hash_short = (mongo.get_meta("sheet_hash") or "")[:10]
 
             embed = discord.Embed(title="Trạng thái đồng bộ Google Sheet", color=0x3498db)
+            if getattr(mongo, "offline", False):
+                embed.add_field(
+                    name="⚠️ Chế độ offline",
+                    value=(
+                        f"Đọc từ snapshot lúc {mongo.snapshot_created_at}\n"
+                        f"Ghi đang chờ đồng bộ lại: {len(mongo.pending)}"
+                    ),
+                    inline=False,
+                )
             embed.add_field(name="Lần gần nhất", value=str(last_at or "Chưa có"), inline=False)
             embed.add_field(name="Kết quả gần nhất", value=f"tạo: {last_result.get('created',0)}, cập nhật: {last_result.get('updated',0)}", inline=False)
             embed.add_field(name="Hash", value=hash_short or "-", inline=True)
-            embed.add_field(name="Khoảng lặp", value=f"{bot.config.sheet_sync_interval}s", inline=True)
+            cog = bot.get_cog('SheetSyncCog')
+            interval = getattr(cog, "interval", bot.config.sheet_sync_interval)
+            embed.add_field(name="Khoảng lặp", value=f"{round(interval)}s", inline=True)
+            if cog is not None and getattr(cog, "next_run_at", None):
+                next_in = max(0, round(cog.next_run_at - datetime.now(timezone.utc).timestamp()))
+                state = "đang chạy" if cog.running else f"sau {next_in}s"
+                embed.add_field(name="Lần tới", value=state, inline=True)
+            lease = getattr(cog, "lease", None)
+            if lease is not None:
+                holder = lease.holder() or {}
+                owner = holder.get("owner") or "-"
+                me = " (instance này)" if lease.token is not None else ""
+                embed.add_field(name="Lease đồng bộ", value=f"{owner}{me}\ntoken: {holder.get('token', '-')}", inline=False)
+            history = mongo.get_meta("sheet_sync_history") or []
+            if history:
+                recent = history[-5:]
+                avg_ms = sum(h.get("duration_ms", 0) for h in recent) / len(recent)
+                lines = [
+                    f"{h.get('started_at', '')[11:19]} {h.get('reason', '')}: {h.get('status', '')} ({h.get('duration_ms', 0)}ms)"
+                    for h in reversed(recent)
+                ]
+                embed.add_field(
+                    name=f"Lịch sử ({len(history)} lần, TB {avg_ms:.0f}ms)",
+                    value="\n".join(lines),
+                    inline=False,
+                )
+            last_fetch = mongo.get_meta("sheet_last_fetch")
+            if last_fetch:
+                embed.add_field(
+                    name="Lần tải gần nhất",
+                    value=(
+                        f"{last_fetch.get('bytes', 0)} bytes / {last_fetch.get('requests', 0)} request\n"
+                        f"Bỏ qua tải toàn bộ: {'có' if last_fetch.get('full_fetch_avoided') else 'không'}\n"
+                        f"Cửa sổ thay đổi: {last_fetch.get('windows_changed', 0)}/{last_fetch.get('windows_total', 0)}"
+                    ),
+                    inline=False,
+                )
+            directory = getattr(bot, "directory", None)
+            if directory is not None:
+                ds = directory.stats()
+                embed.add_field(
+                    name="Gán Discord (ghi sau)",
+                    value=(
+                        f"Đang chờ ghi: {ds['pending']} (trễ {ds['lag_seconds']:.0f}s)\n"
+                        f"Đã ghi: {ds['replayed']}, xung đột: {ds['conflicts']}"
+                        + (f"\nLỗi gần nhất: {ds['last_error']}" if ds['last_error'] else "")
+                    ),
+                    inline=False,
+                )
+            http_client = getattr(bot, "http_client", None)
+            if http_client:
+                http_stats = http_client.stats()
+                embed.add_field(
+                    name="Kết nối HTTP",
+                    value=(
+                        f"Request: {http_stats['requests']} (retry: {http_stats['retries']})\n"
+                        f"Kết nối mới: {http_stats['connections_created']}, tái sử dụng: {http_stats['connections_reused']}"
+                        f" ({http_stats['reuse_ratio'] * 100:.0f}%)"
+                    ),
+                    inline=False,
+                )
             await ctx.send(embed=embed)
         except Exception as e:
             await ctx.send(f"Lỗi: {e}")
@@ -255,16 +196,48 @@ def setup_admin_commands(bot):
         """Ép đồng bộ Google Sheet -> MongoDB ngay lập tức (admin)."""
         try:
             cog = bot.get_cog('SheetSyncCog')
-            if cog is None or not hasattr(cog, '_sync_once'):
+            if cog is None or not hasattr(cog, 'request_sync'):
                 await ctx.send("Chức năng đồng bộ chưa sẵn sàng hoặc chưa được cấu hình.")
                 return
-            msg = await ctx.reply("Đang đồng bộ...", mention_author=False)
-            await cog._sync_once()
-            mongo = getattr(bot, "mongo", None)
-            last_result = mongo.get_meta("sheet_last_result") or {"created": 0, "updated": 0}
-            await msg.edit(content=f"Đã đồng bộ xong: tạo {last_result.get('created',0)}, cập nhật {last_result.get('updated',0)}")
+            text = "Đang chờ lần đồng bộ hiện tại xong..." if cog.running else "Đang đồng bộ..."
+            msg = await ctx.reply(text, mention_author=False)
+            # Queued behind any running sync; concurrent requests share one run
+            outcome = await cog.request_sync()
+            status = outcome.get("status")
+            if status == "changed":
+                result = outcome.get("result") or {}
+                await msg.edit(content=f"Đã đồng bộ xong: tạo {result.get('created',0)}, cập nhật {result.get('updated',0)}")
+            elif status == "unchanged":
+                await msg.edit(content="Đã đồng bộ xong: sheet không có thay đổi")
+            elif status == "timeout":
+                await msg.edit(content="Đồng bộ quá thời gian, đã huỷ. Thử lại sau.")
+            elif status == "standby":
+                await msg.edit(content="Instance khác đang giữ quyền đồng bộ, bỏ qua trên instance này.")
+            elif status == "disabled":
+                await msg.edit(content="Chức năng đồng bộ chưa được cấu hình.")
+            else:
+                await msg.edit(content=f"Lỗi đồng bộ: {outcome.get('error', 'không rõ')}")
         except Exception as e:
             await ctx.send(f"Lỗi: {e}")
+    @bot.command(name="apistats")
+    @commands.has_permissions(manage_messages=True)
+    async def apistats(ctx):
+        """Số lần gọi Discord API theo lệnh và thời gian xử lý của các service."""
+        lines = [
+            f"`{name}`: {entry['calls']} lần gọi / {entry['invocations']} lần dùng ({entry['per_invocation']}/lần)"
+            for name, entry in list(api_call_stats().items())[:15]
+        ]
+        timings = [
+            f"`{name}`: {entry['calls']} lần, TB {entry['avg_ms']} ms, tối đa {entry['max_ms']} ms, lỗi {entry['errors']}"
+            for name, entry in list(service_stats().items())[:15]
+        ]
+        if not lines and not timings:
+            await ctx.send("Chưa có lệnh nào được ghi nhận.")
+            return
+        content = "📡 **Discord API theo lệnh:**\n" + ("\n".join(lines) or "-")
+        content += "\n\n⏱️ **Service:**\n" + ("\n".join(timings) or "-")
+        await ctx.send(content[:2000])
+
     @bot.command(name="clear")
     @commands.has_permissions(manage_messages=True)
     async def clear(ctx, amount: int = 5):
@@ -333,142 +306,22 @@ def setup_admin_commands(bot):
     @commands.has_permissions(administrator=True)
     async def editassign(ctx, member: discord.Member, mssv: str):
         """Admin command: Chỉnh sửa liên kết Discord ID với MSSV."""
+        service = bot.directory_service
         try:
-            mongo = getattr(bot, "mongo", None)
-            if not mongo:
-                await ctx.send("❌ Hệ thống cơ sở dữ liệu chưa được cấu hình.")
-                return
-
-            # Kiểm tra MSSV có tồn tại không
-            participant = mongo.participants.find_one({"mssv": str(mssv).strip()})
-            if not participant:
-                await ctx.send(f"❌ **Lỗi:** MSSV {mssv} không tồn tại trong hệ thống.")
-                return
+            info = await service.relink(mssv, member)
+            # The removed links are listed in the embed
+            await ctx.send(embed=service.relink_embed(mssv, member, ctx.author, info))
 
-            # Kiểm tra xem MSSV này đã được liên kết với Discord ID nào chưa
-            current_discord_id = participant.get("discord_id")
-            current_discord_user = None
-            if current_discord_id:
-                current_discord_user = mongo.participants.find_one({"discord_id": int(current_discord_id)})
-
-            # Kiểm tra xem Discord ID mới đã được sử dụng bởi MSSV khác chưa
-            existing_user = mongo.participants.find_one({"discord_id": member.id})
-            existing_mssv = None
-            if existing_user:
-                existing_mssv = existing_user.get("mssv")
-                if existing_mssv == mssv:
-                    # Nếu đã liên kết rồi thì không cần làm gì
-                    await ctx.send(f"ℹ️ **Thông tin:** MSSV {mssv} đã được liên kết với Discord ID của {member.mention} rồi.")
-                    return
-
-            # Thực hiện cập nhật
+            # Gửi DM thông báo cho user được gán
             try:
-                # Xóa liên kết cũ của MSSV hiện tại (nếu có)
-                if current_discord_id:
-                    mongo.participants.update_one(
-                        {"mssv": str(mssv).strip()},
-                        {"$unset": {"discord_id": "", "updated_at": ""}}
-                    )
-                    await ctx.send(f"🔄 **Đã xóa liên kết cũ:** MSSV {mssv} không còn liên kết với Discord ID {current_discord_id}")
-
-                # Xóa liên kết cũ của Discord ID mới (nếu đang liên kết với MSSV khác)
-                if existing_mssv and existing_mssv != mssv:
-                    mongo.participants.update_one(
-                        {"mssv": existing_mssv},
-                        {"$unset": {"discord_id": "", "updated_at": ""}}
-                    )
-                    await ctx.send(f"🔄 **Đã xóa liên kết cũ:** Discord ID {member.mention} không còn liên kết với MSSV {existing_mssv}")
-
-                # Gán Discord ID mới cho MSSV
-                mongo.participants.update_one(
-                    {"mssv": str(mssv).strip()},
-                    {"$set": {"discord_id": member.id, "updated_at": datetime.now(timezone.utc)}}
-                )
-
-                # Tạo embed thông báo thành công
-                embed = discord.Embed(
-                    title="✅ **Đã cập nhật liên kết Discord ID**",
-                    color=0x2ecc71
-                )
-                embed.add_field(
-                    name="👤 **Thông tin tham gia viên**",
-                    value=f"**Họ và tên:** {participant.get('full_name', 'Không có tên')}\n**MSSV:** {mssv}",
-                    inline=False
-                )
-                embed.add_field(
-                    name="🔗 **Discord ID mới**",
-                    value=f"{member.mention} ({member.id})",
-                    inline=True
-                )
-                
-                # Thông tin về các liên kết đã xóa
-                removed_links = []
-                if current_discord_id and current_discord_user:
-                    removed_links.append(f"MSSV {mssv} ↔ Discord ID {current_discord_id}")
-                if existing_mssv and existing_mssv != mssv:
-                    removed_links.append(f"MSSV {existing_mssv} ↔ Discord ID {member.id}")
-                
-                if removed_links:
-                    embed.add_field(
-                        name="🔄 **Liên kết đã xóa**",
-                        value="\n".join(removed_links),
-                        inline=False
-                    )
-                
-                embed.add_field(
-                    name="👨‍💼 **Admin thực hiện**",
-                    value=ctx.author.mention,
-                    inline=False
-                )
-                embed.add_field(
-                    name="🕒 **Thời gian**",
-                    value=datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M:%S"),
-                    inline=False
-                )
-
-                await ctx.send(embed=embed)
-
-                # Gửi DM thông báo cho user được gán
-                try:
-                    user_embed = discord.Embed(
-                        title="🔗 **Bạn đã được liên kết với MSSV mới**",
-                        description=f"Admin {ctx.author.name} đã liên kết Discord của bạn với MSSV {mssv}.",
-                        color=0x3498db
-                    )
-                    user_embed.add_field(
-                        name="📋 **Thông tin MSSV**",
-                        value=f"**Họ và tên:** {participant.get('full_name', 'Không có tên')}\n**MSSV:** {mssv}",
-                        inline=False
-                    )
-                    
-                    # Thông tin về liên kết cũ (nếu có)
-                    if existing_mssv and existing_mssv != mssv:
-                        user_embed.add_field(
-                            name="🔄 **Liên kết cũ đã bị xóa**",
-                            value=f"Discord của bạn không còn liên kết với MSSV {existing_mssv}",
-                            inline=False
-                        )
-                    
-                    user_embed.add_field(
-                        name="👨‍💼 **Admin thực hiện**",
-                        value=ctx.author.name,
-                        inline=True
-                    )
-                    user_embed.add_field(
-                        name="🕒 **Thời gian**",
-                        value=datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M:%S"),
-                        inline=True
-                    )
-                    
-                    await member.send(embed=user_embed)
-                except discord.Forbidden:
-                    await ctx.send(f"⚠️ Không thể gửi DM cho {member.mention}. Họ có thể đã tắt DM.")
-
-            except Exception as e:
-                await ctx.send(f"❌ **Lỗi khi cập nhật:** {e}")
+                await member.send(embed=service.relink_notice_embed(mssv, ctx.author, info))
+            except discord.Forbidden:
+                await ctx.send(f"⚠️ Không thể gửi DM cho {member.mention}. Họ có thể đã tắt DM.")
 
+        except ServiceError as e:
+            await ctx.send(str(e))
         except Exception as e:
-            await ctx.send(f"❌ **Lỗi:** {e}")
+            await ctx.send(f"❌ **Lỗi khi cập nhật:** {e}")
 
     @editassign.error
     async def editassign_error(ctx, error):
@@ -488,211 +341,17 @@ def setup_admin_commands(bot):
     @commands.has_permissions(administrator=True)
     async def addallrole(ctx):
         """Tự động tạo role và channel cho tất cả các đội có thành viên"""
+        # Progress embed, replaced by the report (or the error) in the same message
+        responder = Responder.for_context(ctx)
+        service = bot.provisioning_service
         try:
-            # Check if category ID is configured
-            if not bot.config.team_category_id:
-                await ctx.send("❌ **Lỗi:** Chưa cấu hình `CATEGORYIDFORTEAM` trong file .env")
-                return
-
-            # Get category
-            category = bot.get_channel(bot.config.team_category_id)
-            if not category:
-                await ctx.send(f"❌ **Lỗi:** Không tìm thấy category với ID {bot.config.team_category_id}")
-                return
-
-            # Get MongoDB instance
-            mongo = getattr(bot, "mongo", None)
-            if not mongo:
-                await ctx.send("❌ **Lỗi:** Hệ thống cơ sở dữ liệu chưa được cấu hình.")
-                return
-
-            # Send initial message
-            status_embed = discord.Embed(
-                title="🔄 **Đang tạo role và channel cho các đội...**",
-                description="Vui lòng chờ trong khi bot xử lý...",
-                color=0xf39c12
-            )
-            status_msg = await ctx.send(embed=status_embed)
-
-            # Get teams with members
-            teams_with_members = mongo.get_teams_with_members()
-            
-            if not teams_with_members:
-                await status_msg.edit(embed=discord.Embed(
-                    title="❌ **Không có đội nào để xử lý**",
-                    description="Không tìm thấy đội nào có thành viên đã assign Discord ID.",
-                    color=0xe74c3c
-                ))
-                return
-
-            # Process each team
-            created_roles = 0
-            created_channels = 0
-            assigned_members = 0
-            errors = []
-
-            for team in teams_with_members:
-                try:
-                    team_id = team.get("team_id")
-                    team_name = team.get("team_name", f"Team {team_id}")
-                    members = team.get("members_with_discord", [])
-
-                    if not team_id or not team_name or not members:
-                        continue
-
-                    # Clean team name for Discord (remove special chars, limit length)
-                    clean_team_name = "".join(c for c in team_name if c.isalnum() or c in " -_").strip()
-                    if len(clean_team_name) > 32:
-                        clean_team_name = clean_team_name[:32]
-
-                    # Create role if not exists
-                    role = discord.utils.get(ctx.guild.roles, name=clean_team_name)
-                    if not role:
-                        try:
-                            role = await ctx.guild.create_role(
-                                name=clean_team_name,
-                                color=discord.Color.random(),
-                                reason=f"Auto-created for team {team_id}"
-                            )
-                            created_roles += 1
-                        except discord.Forbidden:
-                            errors.append(f"Không có quyền tạo role cho đội {team_name}")
-                            continue
-                        except Exception as e:
-                            errors.append(f"Lỗi tạo role cho đội {team_name}: {e}")
-                            continue
-
-                    # Create text channel if not exists
-                    text_channel_name = f"{clean_team_name.lower().replace(' ', '-')}"
-                    text_channel = discord.utils.get(category.text_channels, name=text_channel_name)
-                    if not text_channel:
-                        try:
-                            # Set up text channel permissions
-                            overwrites = {
-                                ctx.guild.default_role: discord.PermissionOverwrite(
-                                    read_messages=False, 
-                                    send_messages=False,
-                                    view_channel=False
-                                ),
-                                role: discord.PermissionOverwrite(
-                                    read_messages=True, 
-                                    send_messages=True, 
-                                    attach_files=True, 
-                                    embed_links=True,
-                                    view_channel=True,
-                                    add_reactions=True,
-                                    read_message_history=True
-                                )
-                            }
-                            
-                            text_channel = await category.create_text_channel(
-                                name=text_channel_name,
-                                topic=f"Kênh chat cho đội {team_name}",
-                                reason=f"Auto-created for team {team_id}",
-                                overwrites=overwrites
-                            )
-                            created_channels += 1
-                        except discord.Forbidden:
-                            errors.append(f"Không có quyền tạo text channel cho đội {team_name}")
-                        except Exception as e:
-                            errors.append(f"Lỗi tạo text channel cho đội {team_name}: {e}")
-
-                    # Create voice channel if not exists
-                    voice_channel_name = f"{clean_team_name.lower().replace(' ', '-')}"
-                    voice_channel = discord.utils.get(category.voice_channels, name=voice_channel_name)
-                    if not voice_channel:
-                        try:
-                            # Set up voice channel permissions
-                            overwrites = {
-                                ctx.guild.default_role: discord.PermissionOverwrite(
-                                    connect=False, 
-                                    view_channel=False,
-                                    speak=False,
-                                    stream=False
-                                ),
-                                role: discord.PermissionOverwrite(
-                                    connect=True, 
-                                    view_channel=True, 
-                                    speak=True, 
-                                    stream=True,
-                                    priority_speaker=False,
-                                    mute_members=False,
-                                    deafen_members=False,
-                                    move_members=False
-                                )
-                            }
-                            
-                            voice_channel = await category.create_voice_channel(
-                                name=voice_channel_name,
-                                reason=f"Auto-created for team {team_id}",
-                                overwrites=overwrites,
-                                user_limit=10  # Limit to 10 users per team
-                            )
-                            created_channels += 1
-                        except discord.Forbidden:
-                            errors.append(f"Không có quyền tạo voice channel cho đội {team_name}")
-                        except Exception as e:
-                            errors.append(f"Lỗi tạo voice channel cho đội {team_name}: {e}")
-
-                    # Assign role to team members
-                    for member_data in members:
-                        discord_id = member_data.get("discord_id")
-                        if not discord_id:
-                            continue
-
-                        member = ctx.guild.get_member(discord_id)
-                        if member and role not in member.roles:
-                            try:
-                                await member.add_roles(role, reason=f"Auto-assigned for team {team_id}")
-                                assigned_members += 1
-                            except discord.Forbidden:
-                                errors.append(f"Không có quyền assign role cho {member.display_name}")
-                            except Exception as e:
-                                errors.append(f"Lỗi assign role cho {member.display_name}: {e}")
-
-                except Exception as e:
-                    errors.append(f"Lỗi xử lý đội {team.get('team_name', 'Unknown')}: {e}")
-
-            # Create final report
-            final_embed = discord.Embed(
-                title="✅ **Hoàn thành tạo role và channel**",
-                color=0x2ecc71
-            )
-            final_embed.add_field(
-                name="📊 **Thống kê**",
-                value=f"**Đội được xử lý:** {len(teams_with_members)}\n"
-                      f"**Role đã tạo:** {created_roles}\n"
-                      f"**Channel đã tạo:** {created_channels}\n"
-                      f"**Thành viên được assign role:** {assigned_members}",
-                inline=False
-            )
-
-            if errors:
-                error_text = "\n".join(errors[:10])  # Limit to first 10 errors
-                if len(errors) > 10:
-                    error_text += f"\n... và {len(errors) - 10} lỗi khác"
-                
-                final_embed.add_field(
-                    name="⚠️ **Lỗi gặp phải**",
-                    value=f"```{error_text}```",
-                    inline=False
-                )
-
-            final_embed.add_field(
-                name="👨‍💼 **Admin thực hiện**",
-                value=ctx.author.mention,
-                inline=True
-            )
-            final_embed.add_field(
-                name="🕒 **Thời gian**",
-                value=datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M:%S"),
-                inline=True
-            )
-
-            await status_msg.edit(embed=final_embed)
-
+            await responder.update(embed=service.progress_embed())
+            report = await service.provision_teams(ctx.guild)
+            await responder.send(embed=service.report_embed(report, ctx.author))
+        except ServiceError as e:
+            await responder.send(content=str(e), embed=None)
         except Exception as e:
-            await ctx.send(f"❌ **Lỗi:** {e}")
+            await responder.send(content=f"❌ **Lỗi:** {e}", embed=None)
 
     @addallrole.error
     async def addallrole_error(ctx, error):
@@ -820,95 +479,14 @@ def setup_admin_commands(bot):
 
     @bot.command(name="checkteampermissions")
     @commands.has_permissions(administrator=True)
-    async def checkteampermissions(ctx, team_name: str = None):
+    async def checkteampermissions(ctx, *, team_name: str = None):
         """Kiểm tra permissions của role và channel của team"""
         try:
             if not team_name:
                 await ctx.send("❌ **Lỗi:** Vui lòng nhập tên team! Ví dụ: `!checkteampermissions Team Alpha`")
                 return
 
-            # Clean team name
-            clean_team_name = "".join(c for c in team_name if c.isalnum() or c in " -_").strip()
-            if len(clean_team_name) > 32:
-                clean_team_name = clean_team_name[:32]
-
-            embed = discord.Embed(
-                title=f"🔍 **Kiểm tra Permissions - {clean_team_name}**",
-                color=0x3498db
-            )
-
-            # Check role
-            role = discord.utils.get(ctx.guild.roles, name=clean_team_name)
-            if role:
-                embed.add_field(
-                    name="✅ **Role**",
-                    value=f"**Tên:** {role.name}\n**ID:** {role.id}\n**Màu:** {role.color}\n**Thành viên:** {len(role.members)}",
-                    inline=False
-                )
-            else:
-                embed.add_field(
-                    name="❌ **Role**",
-                    value=f"Không tìm thấy role `{clean_team_name}`",
-                    inline=False
-                )
-
-            # Check text channel
-            text_channel_name = f"{clean_team_name.lower().replace(' ', '-')}"
-            text_channel = discord.utils.get(ctx.guild.text_channels, name=text_channel_name)
-            if text_channel:
-                embed.add_field(
-                    name="✅ **Text Channel**",
-                    value=f"**Tên:** {text_channel.name}\n**ID:** {text_channel.id}\n**Category:** {text_channel.category.name if text_channel.category else 'None'}",
-                    inline=False
-                )
-                
-                # Check permissions
-                if role:
-                    role_perms = text_channel.permissions_for(role)
-                    embed.add_field(
-                        name="📝 **Text Channel Permissions**",
-                        value=f"**Đọc tin nhắn:** {'✅' if role_perms.read_messages else '❌'}\n"
-                              f"**Gửi tin nhắn:** {'✅' if role_perms.send_messages else '❌'}\n"
-                              f"**Gửi file:** {'✅' if role_perms.attach_files else '❌'}\n"
-                              f"**Embed links:** {'✅' if role_perms.embed_links else '❌'}\n"
-                              f"**Reactions:** {'✅' if role_perms.add_reactions else '❌'}",
-                        inline=True
-                    )
-            else:
-                embed.add_field(
-                    name="❌ **Text Channel**",
-                    value=f"Không tìm thấy text channel `{text_channel_name}`",
-                    inline=False
-                )
-
-            # Check voice channel
-            voice_channel = discord.utils.get(ctx.guild.voice_channels, name=text_channel_name)
-            if voice_channel:
-                embed.add_field(
-                    name="✅ **Voice Channel**",
-                    value=f"**Tên:** {voice_channel.name}\n**ID:** {voice_channel.id}\n**Category:** {voice_channel.category.name if voice_channel.category else 'None'}\n**User limit:** {voice_channel.user_limit}",
-                    inline=False
-                )
-                
-                # Check permissions
-                if role:
-                    role_perms = voice_channel.permissions_for(role)
-                    embed.add_field(
-                        name="🎤 **Voice Channel Permissions**",
-                        value=f"**Kết nối:** {'✅' if role_perms.connect else '❌'}\n"
-                              f"**Xem channel:** {'✅' if role_perms.view_channel else '❌'}\n"
-                              f"**Nói chuyện:** {'✅' if role_perms.speak else '❌'}\n"
-                              f"**Stream:** {'✅' if role_perms.stream else '❌'}",
-                        inline=True
-                    )
-            else:
-                embed.add_field(
-                    name="❌ **Voice Channel**",
-                    value=f"Không tìm thấy voice channel `{text_channel_name}`",
-                    inline=False
-                )
-
-            await ctx.send(embed=embed)
+            await ctx.send(embed=bot.provisioning_service.team_permissions_embed(ctx.guild, team_name))
 
         except Exception as e:
             await ctx.send(f"❌ **Lỗi:** {e}")
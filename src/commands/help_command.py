@@ -46,12 +46,15 @@ def setup_help_command(bot):
         embed.add_field(
             name="Lệnh âm nhạc",
             value=(
-                "`!play <tên/URL>` hoặc `/play <tên/URL>` - Phát nhạc\n"
+                "`!play <tên/URL>` hoặc `/play <tên/URL>` - Phát nhạc (URL playlist: thêm cả playlist)\n"
                 "`!skip` hoặc `/skip` - Bỏ qua bài hiện tại\n"
-                "`!queue` hoặc `/queue` - Hiển thị queue\n"
+                "`!queue [trang]` hoặc `/queue` - Hiển thị queue\n"
+                "`!remove <vị trí>` / `!move <từ> <đến>` - Xóa / chuyển bài trong queue\n"
+                "`!shuffle` / `!dedupe` - Trộn queue / xóa bài trùng\n"
                 "`!stop` hoặc `/stop` - Dừng phát nhạc\n"
                 "`!volume <0-200>` hoặc `/volume <0-200>` - Điều chỉnh âm lượng\n"
-                "`!exit` - Thoát voice channel"
+                "`!exit` - Thoát voice channel\n"
+                "`!audiocache` - Thống kê cache nhạc"
             ),
             inline=False,
         )
@@ -89,12 +92,13 @@ def setup_help_command(bot):
             value=(
                 "`!ping` hoặc `/ping` - Kiểm tra độ trễ\n"
                 "`!info` hoặc `/info` - Thông tin bot\n"
+                "`!apistats` - Số lần gọi Discord API theo lệnh\n"
                 "`!clear <số>` hoặc `/clear <số>` - Xóa tin nhắn\n"
                 "`!kick <@user> <lý do>` - Kick\n"
                 "`!ban <@user> <lý do>` - Ban\n"
                 "`!addallrole` hoặc `/addallrole` - Tự động tạo role và channel cho tất cả đội có thành viên\n"
                 "`!checkteamconfig` - Kiểm tra cấu hình team setup\n"
-                "`!checkteampermissions <tên team>` - Kiểm tra permissions của role và channel"
+                "`!checkteampermissions <tên team>` hoặc `/checkteampermissions` - Kiểm tra permissions của role và channel"
             ),
             inline=False,
         )
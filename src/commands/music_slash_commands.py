@@ -0,0 +1,61 @@
+"""
+Music slash commands
+"""
+import discord
+from discord import app_commands
+from ..music.player import get_player
+from ..music.queue_view import QueueView
+from ..utils.responder import Responder
+
+
+def setup_music_slash_commands(bot):
+    """Setup music slash commands"""
+    
+    # Music Commands Group
+    @bot.tree.command(name="play", description="Phát nhạc từ YouTube")
+    @app_commands.describe(query="Tên bài hát hoặc URL YouTube")
+    async def play_slash(interaction: discord.Interaction, query: str):
+        """Phát nhạc từ YouTube"""
+        # The searching message is the interaction response (no defer), later edited in place
+        await bot.music_service.play(interaction, query, Responder.for_interaction(interaction))
+    
+    @bot.tree.command(name="skip", description="Bỏ qua bài hát hiện tại")
+    async def skip_slash(interaction: discord.Interaction):
+        """Bỏ qua bài hát hiện tại"""
+        responder = Responder.for_interaction(interaction)
+        try:
+            await responder.send(await bot.music_service.skip(interaction.guild))
+        except Exception as e:
+            await responder.send(f"❌ **Lỗi:** {str(e)}")
+    
+    @bot.tree.command(name="queue", description="Hiển thị queue nhạc")
+    @app_commands.describe(page="Trang (mặc định 1)")
+    async def queue_slash(interaction: discord.Interaction, page: int = 1):
+        """Hiển thị queue nhạc"""
+        responder = Responder.for_interaction(interaction)
+        try:
+            player = get_player(interaction.guild.id)
+            view = QueueView(player, page - 1)
+            view.message = await responder.send(view.render(), view=view)
+            
+        except Exception as e:
+            await responder.send(f"❌ **Lỗi:** {str(e)}")
+    
+    @bot.tree.command(name="stop", description="Dừng phát nhạc và rời voice channel")
+    async def stop_slash(interaction: discord.Interaction):
+        """Dừng phát nhạc và rời voice channel"""
+        responder = Responder.for_interaction(interaction)
+        try:
+            await responder.send(await bot.music_service.stop(interaction.guild))
+        except Exception as e:
+            await responder.send(f"❌ **Lỗi:** {str(e)}")
+    
+    @bot.tree.command(name="volume", description="Điều chỉnh âm lượng (0-200%)")
+    @app_commands.describe(level="Mức âm lượng từ 0 đến 200 (%)")
+    async def volume_slash(interaction: discord.Interaction, level: int):
+        """Điều chỉnh âm lượng (0-200%)"""
+        responder = Responder.for_interaction(interaction)
+        try:
+            await responder.send(await bot.music_service.set_volume(interaction.guild, level))
+        except Exception as e:
+            await responder.send(f"❌ **Lỗi:** {str(e)}")
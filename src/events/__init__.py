@@ -8,10 +8,9 @@ from .reaction_events import setup_reaction_events
 
 
 def setup_events(bot):
-    """Setup all event handlers"""
+    """Setup event handlers every feature relies on (reaction controls come with music)"""
     setup_member_events(bot)
     setup_message_events(bot)
-    setup_reaction_events(bot)
 
 
 __all__ = ['setup_events', 'setup_member_events', 'setup_message_events', 'setup_reaction_events']
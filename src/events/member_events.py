@@ -11,6 +11,7 @@ def setup_member_events(bot):
     async def on_member_join(member: discord.Member):
         """Called when a member joins the guild"""
         await bot.logger.log_member_join(member)
+        bot.member_resolver.remember(member)
         
         # Welcome message
         if bot.config.welcome_channel_id:
@@ -29,6 +30,7 @@ def setup_member_events(bot):
     @bot.event
     async def on_member_remove(member: discord.Member):
         """Called when a member leaves the guild"""
+        bot.member_resolver.forget(member.guild.id, member.id)
         await bot.logger.log_member_leave(member)
     
     @bot.event
@@ -41,10 +41,9 @@ async def handle_music_reactions(bot, payload: discord.RawReactionActionEvent, a
         return
     
     # Check if controller is in same voice channel as bot
+    # (payload.member is only sent for reaction adds; misses are batched over the gateway)
     try:
-        member = guild.get_member(payload.user_id) or await guild.fetch_member(payload.user_id)
-    except discord.NotFound:
-        return
+        member = payload.member or await bot.member_resolver.resolve(guild, payload.user_id)
     except Exception:
         return
     
@@ -0,0 +1,6 @@
+"""
+Bot features packaged as discord.py extensions
+
+Each module registers one feature's commands and events in `setup(bot)`.
+VnuTourBot loads the ones listed in BOT_FEATURES (BotConfig.features).
+"""
@@ -0,0 +1,14 @@
+"""
+Admin and participant feature: moderation, assign/check, team setup
+"""
+from ..commands.admin_commands import setup_admin_commands
+from ..commands.slash_commands import setup_slash_commands
+from ..services import DirectoryService, ProvisioningService
+
+
+async def setup(bot):
+    if bot.directory_service is None:
+        bot.directory_service = DirectoryService(bot)
+        bot.provisioning_service = ProvisioningService(bot, bot.directory_service)
+    setup_admin_commands(bot)
+    setup_slash_commands(bot)
@@ -0,0 +1,47 @@
+"""
+Music feature: !play / /play and friends, reaction controls
+"""
+from ..commands.music_commands import setup_music_commands
+from ..commands.music_slash_commands import setup_music_slash_commands
+from ..events.reaction_events import setup_reaction_events
+from ..music.audio_cache import AudioCache
+from ..music.loudness import LoudnessAnalyzer
+from ..music.player import set_audio_cache, set_audio_pool, set_loudness, set_queue_limit
+from ..music.state import PlayerStateStore
+from ..music.worker_pool import AudioWorkerPool
+from ..services import MusicService
+
+
+async def setup(bot):
+    if bot.music_service is None:
+        bot.music_service = MusicService(bot)
+    set_queue_limit(bot.config.music_max_per_user)
+    if bot.config.audio_workers and bot.audio_pool is None:
+        bot.audio_pool = AudioWorkerPool(bot.config.audio_workers, bot.config.ffmpeg_exe)
+        bot.audio_pool.start()
+        set_audio_pool(bot.audio_pool)
+    if bot.config.audio_cache_dir and bot.audio_cache is None:
+        try:
+            bot.audio_cache = AudioCache(
+                bot.config.audio_cache_dir, bot.config.audio_cache_max_mb * 2**20, bot.config.ffmpeg_exe,
+            )
+            set_audio_cache(bot.audio_cache)
+        except OSError as e:
+            print(f"[AUDIO CACHE] Không thể mở thư mục cache: {e}")
+    if bot.config.loudness_path and bot.loudness is None:
+        bot.loudness = LoudnessAnalyzer(bot.config.loudness_path, bot.config.loudness_target, bot.config.ffmpeg_exe)
+        set_loudness(bot.loudness)
+    if bot.config.player_state_path and bot.player_state is None:
+        bot.player_state = PlayerStateStore(bot, bot.config.player_state_path, bot.config.player_state_interval)
+
+        async def resume_saved_players():
+            # on_ready also fires after reconnects; resume only once
+            if bot.player_state.pending is None:
+                return
+            await bot.music_service.resume(bot.player_state.take_pending())
+            bot.player_state.start()
+
+        bot.add_listener(resume_saved_players, "on_ready")
+    setup_music_commands(bot)
+    setup_music_slash_commands(bot)
+    setup_reaction_events(bot)
@@ -0,0 +1,8 @@
+"""
+Tour feature: station check-in commands
+"""
+from ..commands.tour_commands import setup_tour_commands
+
+
+async def setup(bot):
+    setup_tour_commands(bot)
@@ -0,0 +1,145 @@
+"""
+On-disk cache of pre-encoded Opus (Ogg) files keyed by video ID
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from .track import Track
+
+
+class AudioCache:
+    """Size-bounded LRU of transcoded tracks.
+
+    A miss is served from the stream as before while FFmpeg transcodes the
+    same stream to `<video_id>.ogg` in the background; the next play of that
+    video reads the file (see CachedOpusSource) instead of re-streaming and
+    re-encoding. File mtimes carry the LRU order across restarts.
+    """
+
+    SUFFIX = ".ogg"
+    # Live streams and very long videos are not worth the disk
+    MAX_TRACK_SECONDS = 20 * 60
+
+    def __init__(self, directory: Path, max_bytes: int, ffmpeg_exe: str = "ffmpeg", concurrency: int = 1):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ffmpeg_exe = ffmpeg_exe
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # video_id -> bytes, oldest first
+        self._in_flight: Set[str] = set()
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "bytes_saved": 0, "stored": 0, "evicted": 0, "failed": 0}
+        self._load()
+
+    def _load(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".part":
+                path.unlink(missing_ok=True)  # transcode interrupted by a restart
+            elif path.suffix == self.SUFFIX:
+                stat = path.stat()
+                files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, video_id, size in sorted(files):
+            self._entries[video_id] = size
+        self._evict()
+        print(f"[AUDIO CACHE] {len(self._entries)} bài, {self.total_bytes / 2**20:.1f}/{self.max_bytes / 2**20:.0f} MiB")
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._entries.values())
+
+    def _path(self, video_id: str) -> Path:
+        return self.directory / f"{video_id}{self.SUFFIX}"
+
+    def _evict(self) -> None:
+        total = self.total_bytes
+        while total > self.max_bytes and self._entries:
+            video_id, size = self._entries.popitem(last=False)
+            total -= size
+            self._stats["evicted"] += 1
+            try:
+                self._path(video_id).unlink(missing_ok=True)
+            except OSError as e:  # file still open on Windows; retried on next start
+                print(f"[AUDIO CACHE] Không thể xóa {video_id}: {e}")
+
+    # ----- Lookup -----
+    def contains(self, video_id: Optional[str]) -> bool:
+        """Whether a video is cached (no hit/miss accounting)."""
+        return bool(video_id) and video_id in self._entries
+
+    def peek(self, video_id: Optional[str]) -> Optional[Path]:
+        """Path of a cached video without touching the LRU order or the stats."""
+        return self._path(video_id) if self.contains(video_id) else None
+
+    def lookup(self, track: Track) -> Optional[Path]:
+        """Path of the cached file for a track (counts a hit or a miss)."""
+        video_id = track.video_id
+        if not video_id:
+            return None
+        if video_id in self._entries:
+            path = self._path(video_id)
+            if path.exists():
+                self._entries.move_to_end(video_id)
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                self._stats["hits"] += 1
+                self._stats["bytes_saved"] += self._entries[video_id]
+                return path
+            del self._entries[video_id]
+        self._stats["misses"] += 1
+        return None
+
+    # ----- Population -----
+    def schedule(self, track: Track) -> None:
+        """Transcode a track in the background after its first (streamed) play."""
+        video_id = track.video_id
+        if not video_id or video_id in self._entries or video_id in self._in_flight:
+            return
+        if not track.stream_url or not track.duration or track.duration > self.MAX_TRACK_SECONDS:
+            return
+        self._in_flight.add(video_id)
+        asyncio.create_task(self._populate(video_id, track.stream_url))
+
+    async def _populate(self, video_id: str, stream_url: str) -> None:
+        path = self._path(video_id)
+        part = path.with_name(path.name + ".part")
+        try:
+            async with self._semaphore:
+                process = await asyncio.create_subprocess_exec(
+                    self.ffmpeg_exe,
+                    "-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5", "-nostdin",
+                    "-i", stream_url,
+                    "-vn", "-map_metadata", "-1",
+                    # Same packet format discord.py streams: 48 kHz stereo, 20 ms Opus frames
+                    "-c:a", "libopus", "-b:a", "128k", "-ar", "48000", "-ac", "2", "-frame_duration", "20",
+                    "-f", "opus", "-loglevel", "error", "-y", str(part),
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+                )
+                _, stderr = await process.communicate()
+            if process.returncode != 0 or not part.exists() or part.stat().st_size == 0:
+                raise RuntimeError((stderr or b"").decode(errors="replace").strip()[-200:] or f"exit {process.returncode}")
+            os.replace(part, path)
+            self._entries[video_id] = path.stat().st_size
+            self._stats["stored"] += 1
+            self._evict()
+        except Exception as e:
+            self._stats["failed"] += 1
+            part.unlink(missing_ok=True)
+            print(f"[AUDIO CACHE] Không thể lưu {video_id}: {e}")
+        finally:
+            self._in_flight.discard(video_id)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return dict(
+            self._stats,
+            hit_ratio=round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            tracks=len(self._entries),
+            bytes=self.total_bytes,
+            max_bytes=self.max_bytes,
+        )
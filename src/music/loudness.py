@@ -0,0 +1,103 @@
+"""
+Integrated loudness per video ID, measured once and turned into a playback gain
+"""
+import asyncio
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from .track import Track
+
+# Summary line of FFmpeg's ebur128 filter (the per-frame log lines come first)
+INTEGRATED_RE = re.compile(r"I:\s+(-?\d+(?:\.\d+)?) LUFS")
+
+
+class LoudnessAnalyzer:
+    """Caches each video's integrated loudness (LUFS) in a JSON file.
+
+    The first play of a video is measured in the background with one FFmpeg
+    ebur128 pass (the cached Opus file when there is one, otherwise the
+    first ANALYZE_SECONDS of the stream). Every later play gets a fixed
+    gain towards `target` that the sources apply with the volume, so
+    playback never analyses anything.
+    """
+
+    ANALYZE_SECONDS = 90
+    # Gain limits: quiet tracks get at most +6 dB so they do not clip
+    MIN_GAIN = 0.25
+    MAX_GAIN = 2.0
+
+    def __init__(self, path: Path, target: float = -16.0, ffmpeg_exe: str = "ffmpeg"):
+        self.path = Path(path)
+        self.target = target
+        self.ffmpeg_exe = ffmpeg_exe
+        self._lufs: Dict[str, float] = self._read()
+        self._in_flight: Set[str] = set()
+        self._semaphore = asyncio.Semaphore(1)
+        self._stats: Dict[str, int] = {"measured": 0, "failed": 0}
+
+    def _read(self) -> Dict[str, float]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                return {str(k): float(v) for k, v in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"[LOUDNESS] Không đọc được {self.path}: {e}")
+            return {}
+
+    def _write(self, lufs: Dict[str, float]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(lufs, f)
+        os.replace(tmp, self.path)
+
+    # ----- Gain -----
+    def gain_for(self, track: Track) -> Optional[float]:
+        """Linear gain for a measured video, None if not measured yet."""
+        lufs = self._lufs.get(track.video_id) if track.video_id else None
+        if lufs is None:
+            return None
+        gain = 10 ** ((self.target - lufs) / 20)
+        return max(self.MIN_GAIN, min(self.MAX_GAIN, gain))
+
+    # ----- Measurement -----
+    def schedule(self, track: Track, local_path: Optional[Path] = None) -> None:
+        """Measure a video in the background (no-op if known or already running)."""
+        video_id = track.video_id
+        if not video_id or video_id in self._lufs or video_id in self._in_flight:
+            return
+        source = str(local_path) if local_path else track.stream_url
+        if not source:
+            return
+        self._in_flight.add(video_id)
+        asyncio.create_task(self._measure(video_id, source, local=local_path is not None))
+
+    async def _measure(self, video_id: str, source: str, local: bool) -> None:
+        args = [self.ffmpeg_exe, "-hide_banner", "-nostats", "-nostdin"]
+        if not local:
+            args += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5", "-t", str(self.ANALYZE_SECONDS)]
+        args += ["-i", source, "-vn", "-af", "ebur128", "-f", "null", "-"]
+        try:
+            async with self._semaphore:
+                process = await asyncio.create_subprocess_exec(
+                    *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+                )
+                _, stderr = await process.communicate()
+            matches = INTEGRATED_RE.findall((stderr or b"").decode(errors="replace"))
+            if process.returncode != 0 or not matches:
+                raise RuntimeError(f"không đo được (exit {process.returncode})")
+            self._lufs[video_id] = float(matches[-1])
+            self._stats["measured"] += 1
+            await asyncio.to_thread(self._write, dict(self._lufs))
+        except Exception as e:
+            self._stats["failed"] += 1
+            print(f"[LOUDNESS] {video_id}: {e}")
+        finally:
+            self._in_flight.discard(video_id)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, known=len(self._lufs))
@@ -3,11 +3,13 @@ Music player management
 """
 import asyncio
 import discord
-from collections import deque
 from dataclasses import dataclass, field
-from typing import Optional, Deque
+from typing import ClassVar, Dict, List, Optional
 from datetime import datetime, timezone
 from .track import Track
+from .track_queue import TrackQueue
+from .sources import CachedOpusSource, VolumeControlledAudioSource
+from ..utils.responder import Responder
 
 
 def force_cleanup_ffmpeg_source(source):
@@ -50,7 +52,7 @@ def force_cleanup_ffmpeg_source(source):
 class GuildPlayer:
     """Manages music playback for a specific guild"""
     guild_id: int
-    queue: Deque[Track] = field(default_factory=deque)
+    queue: TrackQueue = field(default_factory=lambda: TrackQueue(max_per_user=queue_max_per_user))
     now_playing: Optional[Track] = None
     text_channel_id: Optional[int] = None
     volume: float = 1.0
@@ -64,8 +66,14 @@ class GuildPlayer:
     control_msg_id: Optional[int] = None
     control_channel_id: Optional[int] = None
     
-    # Now playing message for auto-update
-    now_playing_msg: Optional[discord.Message] = None
+    # Now playing message, edited in place from track to track while it is the channel's newest
+    now_playing_status: Optional[Responder] = None
+    announced_track: Optional[Track] = None
+    
+    # Playlist placeholders being resolved ahead of the queue head (id(track) -> task)
+    resolving: Dict[int, asyncio.Task] = field(default_factory=dict)
+    # Queued placeholders resolved ahead of time (stream URLs expire, so not all)
+    LOOKAHEAD: ClassVar[int] = 2
     
     def __post_init__(self):
         """Initialize events"""
@@ -76,16 +84,57 @@ class GuildPlayer:
         """Add a track to the queue"""
         self.queue.append(track)
         self.item_added.set()
+        self.prefetch()
+    
+    def add_tracks(self, tracks: List[Track]) -> List[Track]:
+        """Add several tracks (e.g. a playlist) to the queue; returns those
+        accepted under the per-user cap"""
+        added = self.queue.extend(tracks)
+        if added:
+            self.item_added.set()
+            self.prefetch()
+        return added
     
     def get_next_track(self) -> Optional[Track]:
         """Get the next track from queue"""
         if not self.queue:
             return None
-        return self.queue.popleft()
+        track = self.queue.popleft()
+        self.prefetch()
+        return track
     
     def clear_queue(self):
         """Clear the music queue"""
         self.queue.clear()
+        for task in self.resolving.values():
+            task.cancel()
+        self.resolving.clear()
+    
+    def _needs_resolve(self, track: Track) -> bool:
+        if track.resolved:
+            return False
+        # A cached file plays without a stream URL
+        return audio_cache is None or not audio_cache.contains(track.video_id)
+    
+    def prefetch(self):
+        """Start resolving the placeholders within LOOKAHEAD of the queue head"""
+        # Finished tasks resolved their track in place (or failed: retried on play)
+        for key in [k for k, task in self.resolving.items() if task.done()]:
+            del self.resolving[key]
+        for i, track in enumerate(self.queue):
+            if i >= self.LOOKAHEAD:
+                break
+            if self._needs_resolve(track) and id(track) not in self.resolving:
+                self.resolving[id(track)] = asyncio.create_task(_resolve_quietly(track))
+    
+    async def ensure_resolved(self, track: Track) -> bool:
+        """Make a track playable; False if its entry could not be resolved"""
+        task = self.resolving.pop(id(track), None)
+        if not self._needs_resolve(track):
+            return True
+        if task is None:
+            task = asyncio.create_task(_resolve_quietly(track))
+        return await task
     
     def skip_current(self):
         """Skip the currently playing track"""
@@ -95,17 +144,61 @@ class GuildPlayer:
         """Set player volume (0.0 to 2.0)"""
         self.volume = max(0.0, min(2.0, volume))
     
-    def get_queue_info(self) -> str:
-        """Get formatted queue information"""
-        if not self.queue:
-            return "Queue trống"
-        
-        info = f"**Queue ({len(self.queue)} tracks):**\n"
-        for i, track in enumerate(self.queue, 1):
-            duration = track.get_duration_str()
-            info += f"{i}. **{track.title}** - {duration}\n"
-        
-        return info
+    def get_queue_info(self, page: int = 0) -> str:
+        """Get formatted queue information (one page, see TrackQueue.pages)"""
+        pages = self.queue.pages()
+        return pages[max(0, min(page, len(pages) - 1))]
+    
+    def create_source(self, track: Track, before_options: str) -> discord.AudioSource:
+        """Audio source for a track: the cached Opus file when there is one,
+        else streamed by an audio worker when the pool is running, otherwise
+        decoded in the bot process (fallback). A restored track starts at
+        its saved position (track.resume_at); a measured track plays with
+        its loudness gain. A cached file that needs scaling (volume x gain
+        != 1.0) is decoded by a worker rather than re-encoded in the bot"""
+        start, track.resume_at = track.resume_at, 0.0
+        seek = f"-ss {start:.1f}" if start else ""
+        if seek:
+            before_options = f"{before_options} {seek}"
+        gain = self._loudness_gain(track)
+        if audio_cache is not None:
+            path = audio_cache.lookup(track)
+            if path is not None:
+                if self.volume * gain != 1.0 and audio_pool is not None and audio_pool.alive():
+                    try:
+                        # Local file: no stream reconnect options
+                        return audio_pool.open_source(self.guild_id, track, self.volume, seek, gain, url=str(path))
+                    except Exception as e:
+                        print(f"[AUDIO WORKER] {e}, phát file cache trong bot")
+                try:
+                    return CachedOpusSource(path, volume=self.volume, start=start, gain=gain)
+                except OSError as e:
+                    print(f"[AUDIO CACHE] {e}")
+            else:
+                audio_cache.schedule(track)
+        if audio_pool is not None and audio_pool.alive():
+            try:
+                return audio_pool.open_source(self.guild_id, track, self.volume, before_options, gain)
+            except Exception as e:
+                print(f"[AUDIO WORKER] {e}, phát trong bot")
+        return VolumeControlledAudioSource(
+            track.stream_url,
+            volume=self.volume,
+            gain=gain,
+            before_options=before_options,
+            options="-vn"  # No volume filter needed, handled by our class
+        )
+
+    @staticmethod
+    def _loudness_gain(track: Track) -> float:
+        """Loudness gain for a track; 1.0 (and a background measurement) if unknown"""
+        if loudness is None:
+            return 1.0
+        gain = loudness.gain_for(track)
+        if gain is None:
+            loudness.schedule(track, audio_cache.peek(track.video_id) if audio_cache is not None else None)
+            return 1.0
+        return gain
     
     def update_started_at(self, timestamp: float):
         """Update the started_at timestamp"""
@@ -122,9 +215,72 @@ class GuildPlayer:
         return max(0.0, position)
 
 
+async def _resolve_quietly(track: Track) -> bool:
+    from .ytdlp_handler import resolve_track  # ytdlp_handler imports this module
+
+    try:
+        await resolve_track(track)
+        return True
+    except Exception as e:
+        print(f"[PLAYLIST] Không thể lấy {track.page_url}: {e}")
+        return False
+
+
 # Global player storage
 players: dict[int, GuildPlayer] = {}
 
+# Tracks one member may have queued at once (MUSIC_MAX_PER_USER, 0 = unlimited)
+queue_max_per_user = 0
+
+
+def set_queue_limit(max_per_user: int):
+    """Per-user queue cap for players created from now on (and existing ones)"""
+    global queue_max_per_user
+    queue_max_per_user = max_per_user
+    for player in players.values():
+        player.queue.max_per_user = max_per_user
+
+
+# Audio worker pool (AUDIO_WORKERS > 0); None = everything runs in the bot process
+audio_pool = None
+# On-disk Opus cache (AUDIO_CACHE_DIR); None = always stream
+audio_cache = None
+# Per-video loudness gains (LOUDNESS_PATH); None = no normalisation
+loudness = None
+
+
+def set_audio_pool(pool):
+    """Install (or remove with None) the audio worker pool used by all players"""
+    global audio_pool
+    audio_pool = pool
+
+
+def get_audio_pool():
+    """The running audio worker pool, if any"""
+    return audio_pool
+
+
+def set_audio_cache(cache):
+    """Install (or remove with None) the Opus file cache used by all players"""
+    global audio_cache
+    audio_cache = cache
+
+
+def get_audio_cache():
+    """The audio cache, if enabled"""
+    return audio_cache
+
+
+def set_loudness(analyzer):
+    """Install (or remove with None) the loudness analyzer used by all players"""
+    global loudness
+    loudness = analyzer
+
+
+def get_loudness():
+    """The loudness analyzer, if enabled"""
+    return loudness
+
 
 def get_player(guild_id: int) -> GuildPlayer:
     """Get or create a player for a guild"""
@@ -139,21 +295,48 @@ def remove_player(guild_id: int):
         del players[guild_id]
 
 
-async def ensure_voice(message: discord.Message) -> discord.VoiceClient:
-    """Ensure bot is connected to a voice channel"""
-    if message.author is None or message.author.voice is None or message.author.voice.channel is None:
+async def ensure_voice(message) -> discord.VoiceClient:
+    """Ensure bot is connected to a voice channel (message or slash interaction)"""
+    author = message.user if isinstance(message, discord.Interaction) else message.author
+    if author is None or getattr(author, "voice", None) is None or author.voice.channel is None:
         raise RuntimeError("Bạn phải vào voice channel trước.")
     
     if message.guild is None:
         raise RuntimeError("Lệnh chỉ dùng trong server.")
     
     if message.guild.voice_client is None or not message.guild.voice_client.is_connected():
-        vc = await message.author.voice.channel.connect()
+        vc = await author.voice.channel.connect()
         return vc
     
     return message.guild.voice_client
 
 
+async def announce_now_playing(player: GuildPlayer, channel, track: Track, embed: discord.Embed):
+    """Show the now-playing embed: edit the current one in place when it is still
+    the newest message in the channel (one call instead of send + edit), else
+    close it out and post a new one. Rapid skips are coalesced by the Responder."""
+    status = player.now_playing_status
+    if status is not None and (status.channel != channel or not status.is_latest()):
+        await announce_finished(player)
+        status = None
+    if status is None:
+        status = player.now_playing_status = Responder.for_channel(channel, "now_playing")
+    player.announced_track = track
+    await status.update(content=None, embed=embed)
+
+
+async def announce_finished(player: GuildPlayer):
+    """Turn the now-playing message into a short "finished" line."""
+    status, track = player.now_playing_status, player.announced_track
+    player.now_playing_status = player.announced_track = None
+    if status is None or track is None:
+        return
+    try:
+        await status.send(content=f"✅ **Đã phát xong:** {track.title}", embed=None)
+    except discord.HTTPException:
+        pass
+
+
 async def after_play_callback(err: Optional[Exception], player: GuildPlayer):
     """Callback after music playback ends"""
     try:
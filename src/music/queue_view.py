@@ -0,0 +1,61 @@
+"""
+Button-driven pages for !queue / /queue
+"""
+from typing import Optional
+
+import discord
+from discord.utils import escape_markdown
+
+
+class QueueView(discord.ui.View):
+    """◀️ / ▶️ / 🔄 through a player's queue pages.
+
+    Pages come from TrackQueue.pages(), which is only re-rendered when the
+    queue changed, so paging a long queue does not rebuild it on every click.
+    """
+
+    def __init__(self, player, page: int = 0, timeout: float = 180):
+        super().__init__(timeout=timeout)
+        self.player = player
+        self.page = page
+        self.message: Optional[discord.Message] = None
+
+    def render(self) -> str:
+        pages = self.player.queue.pages()
+        self.page = max(0, min(self.page, len(pages) - 1))
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= len(pages) - 1
+
+        content = ""
+        if self.player.now_playing:
+            content = f"🎵 **Đang phát:** {escape_markdown(self.player.now_playing.title)}\n\n"
+        content += pages[self.page]
+        if len(pages) > 1:
+            content += f"\n\n📄 Trang {self.page + 1}/{len(pages)}"
+        return content
+
+    async def _show(self, interaction: discord.Interaction) -> None:
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page -= 1
+        await self._show(interaction)
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self._show(interaction)
+
+    @discord.ui.button(emoji="🔄", style=discord.ButtonStyle.secondary)
+    async def refresh(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction)
+
+    async def on_timeout(self) -> None:
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
@@ -0,0 +1,218 @@
+"""
+Audio sources handed to discord.py's voice client
+"""
+import queue
+import array
+import struct
+import warnings
+from typing import Dict, Optional
+
+import discord
+from discord.oggparse import OggError, OggStream
+
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop  # C gain stage; removed from the stdlib in Python 3.13
+except ImportError:
+    audioop = None
+
+# Fallback gain stage: one clipped lookup table per gain (65536 samples each)
+_GAIN_TABLES: Dict[float, array.array] = {}
+_GAIN_TABLES_MAX = 16
+
+
+def _gain_table(gain: float) -> array.array:
+    table = _GAIN_TABLES.get(gain)
+    if table is None:
+        if len(_GAIN_TABLES) >= _GAIN_TABLES_MAX:
+            _GAIN_TABLES.pop(next(iter(_GAIN_TABLES)))
+        # Indexed by the unsigned view of each sample
+        table = array.array('h', (
+            max(-32768, min(32767, int((u - 65536 if u >= 32768 else u) * gain))) for u in range(65536)
+        ))
+        _GAIN_TABLES[gain] = table
+    return table
+
+
+def scale_pcm(data: bytes, volume: float) -> bytes:
+    """Scale 16-bit PCM samples by volume (clipped to the sample range)"""
+    if audioop is not None:
+        return audioop.mul(data, 2, volume)
+    table = _gain_table(round(volume, 3))
+    return array.array('h', map(table.__getitem__, memoryview(data).cast('H'))).tobytes()
+
+
+class VolumeControlledAudioSource(discord.FFmpegPCMAudio):
+    """Custom audio source with volume control"""
+
+    def __init__(self, source, volume=1.0, gain=1.0, **kwargs):
+        super().__init__(source, **kwargs)
+        self._volume = volume
+        # Loudness normalisation for this track, applied together with the volume
+        self.gain = gain
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = max(0.0, min(2.0, value))
+
+    def read(self):
+        """Read audio data with volume applied"""
+        data = super().read()
+        level = self._volume * self.gain
+        if data and level != 1.0:
+            data = scale_pcm(data, level)
+        return data
+
+
+class CachedOpusSource(discord.AudioSource):
+    """Plays a cached Ogg Opus file without FFmpeg.
+
+    At an overall level of 1.0 (volume x loudness gain) the stored packets
+    go to Discord untouched (no decode, no encode). Any other level decodes,
+    scales and re-encodes from the packet being played, so a volume change
+    applies immediately. Plays that start at another level go to an audio
+    worker instead when the pool runs (see GuildPlayer.create_source).
+    """
+
+    HEADER_PACKETS = (b"OpusHead", b"OpusTags")
+
+    FRAME_SECONDS = 0.02  # cached files are written with 20 ms frames
+    FRAME_SAMPLES = 960  # granule positions count 48 kHz samples
+    # capture pattern, version, flags, granule position, serial, page number, CRC, segments
+    _PAGE_HEADER = struct.Struct("<4sBBqIIIB")
+
+    def __init__(self, path, volume=1.0, start: float = 0.0, gain=1.0):
+        self._file = open(path, "rb")
+        # Restored position: jump to its page, then drop the packets before it
+        skip = self._seek_page(start) if start > 0 else 0
+        self._packets = OggStream(self._file).iter_packets()
+        self._volume = volume
+        self.gain = gain
+        self._decoder = None
+        self._encoder = None
+        for _ in range(skip):
+            if not self._next_packet():
+                break
+
+    def _seek_page(self, start: float) -> int:
+        """Position the file on the page holding `start`, reading page headers only.
+
+        Returns how many packets of that page precede `start`.
+        """
+        target = int(start * 48000)
+        granule, continued = 0, 0
+        offset = self._file.tell()
+        while True:
+            header = self._file.read(self._PAGE_HEADER.size)
+            if len(header) < self._PAGE_HEADER.size or not header.startswith(b"OggS"):
+                break
+            _, _, flags, page_granule, _, _, _, segments = self._PAGE_HEADER.unpack(header)
+            table = self._file.read(segments)
+            if page_granule >= target:  # -1 means no packet ends on the page
+                continued = flags & 1
+                break
+            if page_granule >= 0:
+                granule = page_granule
+            self._file.seek(sum(table), 1)
+            offset = self._file.tell()
+        self._file.seek(offset)
+        # A page may open with the tail of a packet begun on the previous one
+        return max((target - granule) // self.FRAME_SAMPLES, continued)
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = max(0.0, min(2.0, value))
+
+    def _next_packet(self) -> bytes:
+        for packet in self._packets:
+            if not packet.startswith(self.HEADER_PACKETS):
+                return packet
+        return b""
+
+    def read(self) -> bytes:
+        try:
+            packet = self._next_packet()
+        except OggError as e:
+            print(f"[AUDIO CACHE] File cache lỗi: {e}")
+            return b""
+        level = self._volume * self.gain
+        if not packet or level == 1.0:
+            return packet
+        try:
+            if self._decoder is None:
+                self._decoder = discord.opus.Decoder()
+                self._encoder = discord.opus.Encoder()
+            pcm = self._decoder.decode(packet, fec=False)
+            return self._encoder.encode(scale_pcm(pcm, level), self._encoder.SAMPLES_PER_FRAME)
+        except discord.opus.OpusError as e:
+            print(f"[AUDIO CACHE] Không thể đổi âm lượng: {e}")
+            return packet
+        except discord.opus.OpusNotLoaded:
+            self._volume, self.gain = 1.0, 1.0  # no libopus: keep passing packets through
+            return packet
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self) -> None:
+        self._file.close()
+
+
+class WorkerAudioSource(discord.AudioSource):
+    """Opus packets streamed from an audio worker process.
+
+    Decoding, volume scaling and Opus encoding happen in the worker; the
+    voice client's player thread only forwards ready packets. Ends (returns
+    b'') when the worker finishes the track, fails or dies.
+    """
+
+    # Longest wait for a packet (FFmpeg start-up, slow streams) before giving up
+    READ_TIMEOUT = 15.0
+
+    def __init__(self, pool, worker, session_id: int, volume: float = 1.0):
+        self._pool = pool
+        self._worker = worker
+        self.session_id = session_id
+        self.guild_id: Optional[int] = None
+        self._volume = volume
+        self._packets: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._closed = False
+
+    def push(self, packet: Optional[bytes]) -> None:
+        """Called by the pool's reader thread; None marks the end of the track."""
+        self._packets.put(packet)
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = max(0.0, min(2.0, value))
+        self._pool.send(self._worker, ("volume", self.session_id, self._volume))
+
+    def read(self) -> bytes:
+        try:
+            packet = self._packets.get(timeout=self.READ_TIMEOUT)
+        except queue.Empty:
+            print(f"[AUDIO WORKER] Phiên {self.session_id} không nhận được âm thanh, dừng bài")
+            return b""
+        return packet or b""
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._pool.close_session(self)
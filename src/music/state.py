@@ -0,0 +1,117 @@
+"""
+Player state saved across restarts (queue, position, volume, channels)
+"""
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .player import players
+
+STATE_VERSION = 1
+
+
+class PlayerStateStore:
+    """Snapshots every playing guild's player to a JSON file.
+
+    Saved every `interval` seconds (only when something changed) and on
+    shutdown. The file read at startup is kept aside until the players are
+    restored (`take_pending`), so nothing overwrites it before then. Tracks
+    are stored as references without stream URLs; restored tracks are
+    playlist-style placeholders resolved just before they play.
+    """
+
+    # A snapshot older than this is not resumed (the event has moved on)
+    MAX_AGE = 6 * 3600
+
+    def __init__(self, bot, path: Path, interval: int = 30):
+        self.bot = bot
+        self.path = Path(path)
+        self.interval = interval
+        self._last: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self.pending: Optional[List[Dict[str, Any]]] = self._read()
+
+    def _read(self) -> List[Dict[str, Any]]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            print(f"[MUSIC STATE] Không đọc được {self.path}: {e}")
+            return []
+        if data.get("version") != STATE_VERSION:
+            return []
+        age = time.time() - data.get("saved_at", 0)
+        if age > self.MAX_AGE:
+            print(f"[MUSIC STATE] Bỏ qua trạng thái cũ ({age / 3600:.1f} giờ)")
+            return []
+        return data.get("guilds", [])
+
+    def take_pending(self) -> List[Dict[str, Any]]:
+        """The guild states read at startup (once); saving is enabled afterwards."""
+        pending, self.pending = self.pending or [], None
+        return pending
+
+    # ----- Snapshot -----
+    def snapshot(self) -> List[Dict[str, Any]]:
+        guilds = []
+        for guild_id, player in list(players.items()):
+            guild = self.bot.get_guild(guild_id)
+            vc = guild.voice_client if guild else None
+            if vc is None or not vc.is_connected():
+                continue
+            if player.now_playing is None and not player.queue:
+                continue
+            guilds.append({
+                "guild_id": guild_id,
+                "voice_channel_id": vc.channel.id,
+                "text_channel_id": player.text_channel_id,
+                "volume": player.volume,
+                "now_playing": player.now_playing.to_ref() if player.now_playing else None,
+                "position": round(player.get_current_position(), 1) if player.now_playing else 0.0,
+                "queue": [track.to_ref() for track in player.queue],
+            })
+        return guilds
+
+    def save(self) -> bool:
+        """Write the snapshot if it changed; False when skipped."""
+        if self.pending is not None:
+            return False  # startup state not restored yet
+        guilds = self.snapshot()
+        key = json.dumps(guilds, sort_keys=True)  # idle guilds write nothing
+        if key == self._last:
+            return False
+        data = {"version": STATE_VERSION, "saved_at": time.time(), "guilds": guilds}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._last = key
+        return True
+
+    # ----- Lifecycle -----
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.save()
+            except Exception as e:
+                print(f"[MUSIC STATE] Lỗi lưu trạng thái: {e}")
+
+    def stop(self) -> None:
+        """Final save on shutdown (voice clients still connected)."""
+        if self._task is not None:
+            self._task.cancel()
+        try:
+            self.save()
+        except Exception as e:
+            print(f"[MUSIC STATE] Lỗi lưu trạng thái: {e}")
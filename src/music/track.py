@@ -2,7 +2,7 @@
 Track class for music tracks
 """
 from dataclasses import dataclass, field
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
 
 
 @dataclass
@@ -20,6 +20,28 @@ class Track:
     uploader: Optional[str] = None
     thumbnail: Optional[str] = None
     view_count: Optional[int] = None
+    # yt-dlp video ID (audio cache key)
+    video_id: Optional[str] = None
+    # Seconds to seek into the track on its next play (restored position)
+    resume_at: float = 0.0
+    
+    # Fields kept in the saved player state; stream URLs expire, so a
+    # restored track is a placeholder resolved again before it plays
+    REF_FIELDS = ("title", "page_url", "duration", "requested_by", "artist", "uploader", "thumbnail", "video_id")
+    
+    @property
+    def resolved(self) -> bool:
+        """False for playlist placeholders whose stream URL is not fetched yet"""
+        return bool(self.stream_url)
+    
+    def to_ref(self) -> Dict[str, Any]:
+        """Serializable reference to this track (no stream URL)"""
+        return {name: getattr(self, name) for name in self.REF_FIELDS}
+    
+    @classmethod
+    def from_ref(cls, ref: Dict[str, Any]) -> "Track":
+        """Placeholder track from a saved reference"""
+        return cls(stream_url="", **{name: ref.get(name) for name in cls.REF_FIELDS})
     
     def __str__(self):
         return f"{self.title} (requested by <@{self.requested_by}>)"
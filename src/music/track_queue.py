@@ -0,0 +1,181 @@
+"""
+Guild music queue with positional edits and cached page rendering
+"""
+import random
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from discord.utils import escape_markdown
+
+from .track import Track
+
+
+class QueueFullError(RuntimeError):
+    """The requester already has the maximum number of tracks queued."""
+
+
+def _format_duration(seconds: int) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+class TrackQueue:
+    """Tracks waiting to play, in order.
+
+    List-backed with a moving head, so popping the next track is O(1) and
+    remove/move by position are a single C-level memmove (microseconds even
+    for thousands of tracks). Per-requester counts keep the per-user cap
+    check O(1). Every change bumps `version`, which keys the cached pages.
+    """
+
+    PER_PAGE = 10
+    TITLE_LIMIT = 80
+    COMPACT_AFTER = 64  # popped slots kept before the list is compacted
+
+    def __init__(self, max_per_user: int = 0):
+        self.max_per_user = max_per_user  # 0 = unlimited
+        self.version = 0
+        self._items: List[Optional[Track]] = []
+        self._head = 0
+        self._per_user: Counter = Counter()
+        self._pages: Dict[int, Tuple[int, List[str]]] = {}
+
+    # ----- Sequence protocol -----
+    def __len__(self) -> int:
+        return len(self._items) - self._head
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[Track]:
+        return islice(self._items, self._head, None)
+
+    def __getitem__(self, index: int) -> Track:
+        return self._items[self._head + self._index(index)]
+
+    def _index(self, index: int) -> int:
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("Vị trí không có trong queue")
+        return index
+
+    def _changed(self) -> None:
+        self.version += 1
+
+    # ----- Adding -----
+    def remaining_for(self, user_id: int) -> Optional[int]:
+        """Tracks the user may still queue (None = unlimited)"""
+        if not self.max_per_user:
+            return None
+        return max(0, self.max_per_user - self._per_user[user_id])
+
+    def count_for(self, user_id: int) -> int:
+        return self._per_user[user_id]
+
+    def append(self, track: Track) -> None:
+        if self.remaining_for(track.requested_by) == 0:
+            raise QueueFullError(f"Bạn đã có {self.max_per_user} bài trong queue (tối đa)")
+        self._items.append(track)
+        self._per_user[track.requested_by] += 1
+        self._changed()
+
+    def extend(self, tracks: Iterable[Track]) -> List[Track]:
+        """Append as many tracks as each requester's cap allows; returns those added"""
+        added = []
+        for track in tracks:
+            if self.remaining_for(track.requested_by) == 0:
+                continue
+            self._items.append(track)
+            self._per_user[track.requested_by] += 1
+            added.append(track)
+        if added:
+            self._changed()
+        return added
+
+    # ----- Removing / reordering -----
+    def popleft(self) -> Track:
+        if not self:
+            raise IndexError("Queue trống")
+        track = self._items[self._head]
+        self._items[self._head] = None
+        self._head += 1
+        if self._head >= self.COMPACT_AFTER and self._head * 2 >= len(self._items):
+            del self._items[:self._head]
+            self._head = 0
+        self._per_user[track.requested_by] -= 1
+        self._changed()
+        return track
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._head = 0
+        self._per_user.clear()
+        self._changed()
+
+    def remove_at(self, index: int) -> Track:
+        """Remove the track at a 0-based position"""
+        track = self._items.pop(self._head + self._index(index))
+        self._per_user[track.requested_by] -= 1
+        self._changed()
+        return track
+
+    def move(self, source: int, target: int) -> Track:
+        """Move the track at 0-based `source` so it ends up at `target`"""
+        source = self._index(source)
+        target = self._index(target)
+        track = self._items.pop(self._head + source)
+        self._items.insert(self._head + target, track)
+        self._changed()
+        return track
+
+    def shuffle(self, rng: Optional[random.Random] = None) -> None:
+        items = self._items[self._head:]
+        (rng or random).shuffle(items)
+        self._items = items
+        self._head = 0
+        self._changed()
+
+    def dedupe(self) -> int:
+        """Drop repeated videos, keeping each one's first position; returns the number removed"""
+        seen = set()
+        kept = []
+        for track in self:
+            key = track.video_id or track.page_url or track.stream_url
+            if key in seen:
+                self._per_user[track.requested_by] -= 1
+                continue
+            seen.add(key)
+            kept.append(track)
+        removed = len(self) - len(kept)
+        if removed:
+            self._items = kept
+            self._head = 0
+            self._changed()
+        return removed
+
+    # ----- Rendering -----
+    def total_duration(self) -> int:
+        return sum(t.duration or 0 for t in self)
+
+    def pages(self, per_page: int = PER_PAGE) -> List[str]:
+        """Rendered queue pages (each well under Discord's 2000 characters),
+        rebuilt only when the queue changed since the last call"""
+        cached = self._pages.get(per_page)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        if not self:
+            pages = ["Queue trống"]
+        else:
+            header = f"**Queue ({len(self)} bài, {_format_duration(self.total_duration())}):**\n"
+            lines = []
+            for i, track in enumerate(self, 1):
+                title = track.title if len(track.title) <= self.TITLE_LIMIT else track.title[:self.TITLE_LIMIT - 1] + "…"
+                lines.append(f"{i}. **{escape_markdown(title)}** - {track.get_duration_str()}")
+            pages = [header + "\n".join(lines[i:i + per_page]) for i in range(0, len(lines), per_page)]
+        self._pages[per_page] = (self.version, pages)
+        return pages
@@ -0,0 +1,173 @@
+"""
+Audio worker process: yt-dlp extraction, FFmpeg decoding, volume and Opus encoding
+
+Started by AudioWorkerPool. One duplex pipe carries tuples in both directions:
+
+  bot -> worker                                  worker -> bot
+  ("queue", request_id, query)                   ("reply", request_id, ok, payload)
+  ("playlist", request_id, url)                  ("reply", request_id, ok, payload)
+  ("play", session_id, url, before_options,      ("frame", session_id, opus_packet) ...
+   volume, gain)
+                                                 ("ended", session_id, error_or_None)
+  ("skip", session_id)
+  ("volume", session_id, volume)
+  ("status", request_id)                         ("reply", request_id, True, {...})
+  ("shutdown",)
+
+"queue" resolves a query to Track fields, "playlist" lists a playlist
+flat (placeholder fields per entry); "play" streams a track as 20 ms
+Opus packets, paced to stay about LEAD_FRAMES ahead of real time; gain is
+the track's fixed loudness correction, applied together with the volume.
+"""
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+# Packets sent ahead of real time (absorbs IPC and scheduling jitter)
+LEAD_FRAMES = 50
+FRAME_SECONDS = 0.02
+
+
+class _Session(threading.Thread):
+    """Streams one track for one guild."""
+
+    def __init__(self, worker, session_id, url, before_options, volume, gain=1.0):
+        super().__init__(name=f"audio-session-{session_id}", daemon=True)
+        self.worker = worker
+        self.session_id = session_id
+        self.url = url
+        self.before_options = before_options
+        self.volume = volume
+        self.gain = gain
+        self.frames = 0
+        self.stopped = threading.Event()
+        self.source = None
+
+    def set_volume(self, volume):
+        self.volume = volume
+        if self.source is not None:
+            self.source.volume = volume
+
+    def run(self):
+        import discord
+        from .sources import VolumeControlledAudioSource
+
+        error = None
+        try:
+            encoder = discord.opus.Encoder()
+            self.source = VolumeControlledAudioSource(
+                self.url,
+                volume=self.volume,
+                gain=self.gain,
+                executable=self.worker.ffmpeg_exe,
+                before_options=self.before_options,
+                options="-vn",
+            )
+            started = time.perf_counter()
+            while not self.stopped.is_set():
+                pcm = self.source.read()
+                if len(pcm) != encoder.FRAME_SIZE:
+                    break
+                self.worker.send(("frame", self.session_id, encoder.encode(pcm, encoder.SAMPLES_PER_FRAME)))
+                self.frames += 1
+                delay = started + (self.frames - LEAD_FRAMES) * FRAME_SECONDS - time.perf_counter()
+                if delay > 0:
+                    self.stopped.wait(delay)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            if self.source is not None:
+                self.source.cleanup()
+            self.worker.finish(self)
+            self.worker.send(("ended", self.session_id, error))
+
+
+class AudioWorker:
+    """Command loop of one worker process."""
+
+    def __init__(self, conn, ffmpeg_exe: str):
+        self.conn = conn
+        self.ffmpeg_exe = ffmpeg_exe
+        self.sessions: Dict[int, _Session] = {}
+        self.extractor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="audio-extract")
+        self._send_lock = threading.Lock()
+        self._sessions_lock = threading.Lock()
+        self.started = time.time()
+        self.tracks_played = 0
+
+    def send(self, message) -> None:
+        try:
+            with self._send_lock:
+                self.conn.send(message)
+        except (OSError, EOFError):
+            pass  # bot side is gone; the command loop exits on its own
+
+    def finish(self, session: _Session) -> None:
+        with self._sessions_lock:
+            if self.sessions.get(session.session_id) is session:
+                del self.sessions[session.session_id]
+            self.tracks_played += 1
+
+    def _extract(self, request_id, op, query) -> None:
+        from .ytdlp_handler import extract_playlist_info, extract_track_info
+
+        extract = extract_playlist_info if op == "playlist" else extract_track_info
+        try:
+            self.send(("reply", request_id, True, extract(query)))
+        except Exception as e:
+            self.send(("reply", request_id, False, str(e)))
+
+    def status(self) -> dict:
+        with self._sessions_lock:
+            sessions = {sid: s.frames for sid, s in self.sessions.items()}
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "cpu_seconds": round(time.process_time(), 2),
+            "sessions": sessions,
+            "tracks_played": self.tracks_played,
+        }
+
+    def run(self) -> None:
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break  # bot process closed the pipe
+            op = message[0]
+            if op in ("queue", "playlist"):
+                self.extractor.submit(self._extract, message[1], op, message[2])
+            elif op == "play":
+                _, session_id, url, before_options, volume, gain = message
+                session = _Session(self, session_id, url, before_options, volume, gain)
+                with self._sessions_lock:
+                    self.sessions[session_id] = session
+                session.start()
+            elif op == "skip":
+                session = self.sessions.get(message[1])
+                if session is not None:
+                    session.stopped.set()
+            elif op == "volume":
+                session = self.sessions.get(message[1])
+                if session is not None:
+                    session.set_volume(message[2])
+            elif op == "status":
+                self.send(("reply", message[1], True, self.status()))
+            elif op == "shutdown":
+                break
+
+        for session in list(self.sessions.values()):
+            session.stopped.set()
+        for session in list(self.sessions.values()):
+            session.join(timeout=2)
+        self.extractor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_worker(conn, ffmpeg_exe: str = "ffmpeg") -> None:
+    """Process entry point (multiprocessing target)."""
+    # Ctrl+C reaches the whole process group; the bot shuts workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    AudioWorker(conn, ffmpeg_exe).run()
@@ -0,0 +1,244 @@
+"""
+Pool of audio worker processes driven by GuildPlayer
+"""
+import asyncio
+import itertools
+import multiprocessing
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .sources import WorkerAudioSource
+
+
+class AudioWorkerUnavailable(RuntimeError):
+    """No live worker could take the request; callers fall back to in-process."""
+
+
+class _WorkerHandle:
+    """Bot-side end of one worker process."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn = None
+        self.reader: Optional[threading.Thread] = None
+        self.send_lock = threading.Lock()
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.sessions: Dict[int, WorkerAudioSource] = {}
+        self.started_at = 0.0
+        self.restarts = 0
+        self.alive = False
+
+    @property
+    def load(self) -> int:
+        return len(self.sessions) + len(self.pending)
+
+
+class AudioWorkerPool:
+    """Spreads guild playback over local worker processes.
+
+    Every track (a guild plays at most one at a time) and every extraction
+    goes to the least loaded live worker, so busy guilds spread across
+    processes. A worker that exits is restarted with backoff; the track it
+    was streaming ends and the guild's queue carries on with the next one.
+    """
+
+    RESTART_DELAYS = (1, 2, 5, 10, 30)  # seconds, by consecutive crash count
+    STABLE_AFTER = 60  # a worker alive this long resets its crash count
+    REQUEST_TIMEOUT = 60.0
+
+    def __init__(self, size: int, ffmpeg_exe: str = "ffmpeg"):
+        self.size = max(1, size)
+        self.ffmpeg_exe = ffmpeg_exe
+        self._ctx = multiprocessing.get_context("spawn")  # never fork the running bot
+        self._workers: List[_WorkerHandle] = [_WorkerHandle(i) for i in range(self.size)]
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+
+    # ----- Lifecycle -----
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            self._spawn(worker)
+        print(f"[AUDIO WORKER] Đã khởi động {sum(w.alive for w in self._workers)}/{self.size} tiến trình âm thanh")
+
+    def _spawn(self, worker: _WorkerHandle) -> None:
+        if self._closing:
+            return
+        from .worker import run_worker
+
+        parent, child = self._ctx.Pipe(duplex=True)
+        process = self._ctx.Process(
+            target=run_worker, args=(child, self.ffmpeg_exe),
+            name=f"audio-worker-{worker.index}", daemon=True,
+        )
+        try:
+            process.start()
+        except Exception as e:
+            print(f"[AUDIO WORKER] Không thể khởi động tiến trình {worker.index}: {e}")
+            parent.close()
+            self._schedule_restart(worker)
+            return
+        finally:
+            child.close()
+        worker.process, worker.conn = process, parent
+        worker.started_at = time.monotonic()
+        worker.alive = True
+        worker.reader = threading.Thread(
+            target=self._read_loop, args=(worker, parent), name=f"audio-reader-{worker.index}", daemon=True,
+        )
+        worker.reader.start()
+
+    def _schedule_restart(self, worker: _WorkerHandle) -> None:
+        if self._closing or self._loop is None:
+            return
+        delay = self.RESTART_DELAYS[min(worker.restarts, len(self.RESTART_DELAYS) - 1)]
+        worker.restarts += 1
+        self._loop.call_later(delay, self._spawn, worker)
+
+    def _worker_exited(self, worker: _WorkerHandle) -> None:
+        """Runs on the event loop once the reader sees the pipe close."""
+        worker.alive = False
+        for fut in worker.pending.values():
+            if not fut.done():
+                fut.set_exception(AudioWorkerUnavailable(f"Tiến trình âm thanh {worker.index} đã dừng"))
+        worker.pending.clear()
+        for source in list(worker.sessions.values()):
+            source.push(None)
+        worker.sessions.clear()
+        if worker.conn is not None:
+            worker.conn.close()
+        if self._closing:
+            return
+        exitcode = worker.process.exitcode if worker.process else None
+        print(f"[AUDIO WORKER] Tiến trình {worker.index} đã dừng (exit {exitcode}), đang khởi động lại")
+        if time.monotonic() - worker.started_at > self.STABLE_AFTER:
+            worker.restarts = 0
+        self._schedule_restart(worker)
+
+    async def close(self) -> None:
+        self._closing = True
+        for worker in self._workers:
+            if worker.alive:
+                self.send(worker, ("shutdown",))
+        for worker in self._workers:
+            if worker.process is not None:
+                await asyncio.to_thread(worker.process.join, 3)
+                if worker.process.is_alive():
+                    worker.process.kill()
+            if worker.conn is not None and not worker.conn.closed:
+                worker.conn.close()
+
+    def alive(self) -> bool:
+        return not self._closing and any(w.alive for w in self._workers)
+
+    # ----- IPC -----
+    def send(self, worker: _WorkerHandle, message: tuple) -> bool:
+        """Thread-safe send; False when the worker is gone."""
+        if not worker.alive:
+            return False
+        try:
+            with worker.send_lock:
+                worker.conn.send(message)
+            return True
+        except (OSError, EOFError, ValueError):
+            return False
+
+    def _read_loop(self, worker: _WorkerHandle, conn) -> None:
+        """Reader thread: packets go straight to their source, replies to the loop."""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            op = message[0]
+            if op == "frame":
+                source = worker.sessions.get(message[1])
+                if source is not None:
+                    source.push(message[2])
+            elif op == "ended":
+                if message[2]:
+                    print(f"[AUDIO WORKER] Phiên {message[1]} lỗi: {message[2]}")
+                source = worker.sessions.get(message[1])
+                if source is not None:
+                    source.push(None)
+            elif op == "reply":
+                self._loop.call_soon_threadsafe(self._resolve, worker, message[1], message[2], message[3])
+        if worker.process is not None:
+            worker.process.join(1)  # reap it so the exit code can be logged
+        try:
+            self._loop.call_soon_threadsafe(self._worker_exited, worker)
+        except RuntimeError:
+            pass  # event loop already closed (bot shutting down)
+
+    @staticmethod
+    def _resolve(worker: _WorkerHandle, request_id: int, ok: bool, payload: Any) -> None:
+        fut = worker.pending.pop(request_id, None)
+        if fut is None or fut.done():
+            return
+        if ok:
+            fut.set_result(payload)
+        else:
+            fut.set_exception(RuntimeError(payload))
+
+    async def _request(self, worker: _WorkerHandle, op: str, *args) -> Any:
+        request_id = next(self._ids)
+        fut = self._loop.create_future()
+        worker.pending[request_id] = fut
+        if not self.send(worker, (op, request_id, *args)):
+            worker.pending.pop(request_id, None)
+            raise AudioWorkerUnavailable(f"Tiến trình âm thanh {worker.index} không phản hồi")
+        try:
+            return await asyncio.wait_for(fut, self.REQUEST_TIMEOUT)
+        finally:
+            worker.pending.pop(request_id, None)
+
+    def _least_loaded(self) -> _WorkerHandle:
+        live = [w for w in self._workers if w.alive]
+        if not live:
+            raise AudioWorkerUnavailable("Không có tiến trình âm thanh nào đang chạy")
+        return min(live, key=lambda w: w.load)
+
+    # ----- Operations -----
+    async def extract(self, query: str, op: str = "queue") -> dict:
+        """"queue": resolve a query to Track fields in a worker (yt-dlp);
+        "playlist": flat listing of a playlist URL."""
+        return await self._request(self._least_loaded(), op, query)
+
+    def open_source(
+        self, guild_id: int, track, volume: float, before_options: str, gain: float = 1.0, url: Optional[str] = None
+    ) -> WorkerAudioSource:
+        """"play": start streaming a track (or `url`, e.g. its cached file); the returned source feeds vc.play()."""
+        worker = self._least_loaded()
+        session_id = next(self._ids)
+        source = WorkerAudioSource(self, worker, session_id, volume)
+        source.guild_id = guild_id
+        worker.sessions[session_id] = source
+        if not self.send(worker, ("play", session_id, url or track.stream_url, before_options, volume, gain)):
+            worker.sessions.pop(session_id, None)
+            raise AudioWorkerUnavailable(f"Tiến trình âm thanh {worker.index} không phản hồi")
+        return source
+
+    def close_session(self, source: WorkerAudioSource) -> None:
+        """"skip": stop a session (voice client stopped or track finished)."""
+        worker = source._worker
+        if worker.sessions.pop(source.session_id, None) is not None:
+            self.send(worker, ("skip", source.session_id))
+
+    async def status(self) -> List[Dict[str, Any]]:
+        """"status" of every worker (pid, CPU time, active sessions)."""
+        result = []
+        for worker in self._workers:
+            entry: Dict[str, Any] = {
+                "index": worker.index, "alive": worker.alive, "restarts": worker.restarts,
+                "guilds": [s.guild_id for s in list(worker.sessions.values())],
+            }
+            if worker.alive:
+                try:
+                    entry.update(await self._request(worker, "status"))
+                except (AudioWorkerUnavailable, asyncio.TimeoutError) as e:
+                    entry["error"] = str(e)
+            result.append(entry)
+        return result
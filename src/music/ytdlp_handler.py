@@ -2,14 +2,19 @@
 YouTube-DL handler for music extraction
 """
 import re
-import yt_dlp
-from typing import Optional
+from dataclasses import fields
+from typing import List, Optional, Tuple
 from .track import Track
+from .player import get_audio_pool
+from .worker_pool import AudioWorkerUnavailable
 import asyncio
 
 
 # URL regex pattern
 URL_RE = re.compile(r"^(https?://)")
+# Playlist pages (a watch?v=...&list=... link still means that one video)
+PLAYLIST_RE = re.compile(r"/playlist\?|[?&]list=")
+VIDEO_PARAM_RE = re.compile(r"[?&]v=")
 
 
 def is_url(s: str) -> bool:
@@ -17,6 +22,12 @@ def is_url(s: str) -> bool:
     return bool(URL_RE.match(s.strip()))
 
 
+def is_playlist_url(s: str) -> bool:
+    """Check if string is a playlist URL (queued entry by entry)"""
+    s = s.strip()
+    return is_url(s) and bool(PLAYLIST_RE.search(s)) and not VIDEO_PARAM_RE.search(s)
+
+
 # YouTube-DL options
 YTDLP_OPTS = {
     "format": "bestaudio/best",
@@ -27,61 +38,133 @@ YTDLP_OPTS = {
     "source_address": "0.0.0.0",
 }
 
+# Entries queued from one playlist
+PLAYLIST_LIMIT = 200
+
+# Flat listing: one request for the whole playlist, no per-entry extraction
+PLAYLIST_OPTS = {
+    **YTDLP_OPTS,
+    "noplaylist": False,
+    "extract_flat": "in_playlist",
+    "playlistend": PLAYLIST_LIMIT,
+}
+
+UNAVAILABLE_TITLES = ("[Private video]", "[Deleted video]")
+
+
+def extract_track_info(query: str) -> dict:
+    """Blocking yt-dlp extraction; returns the Track fields except requested_by.
+
+    Runs in an executor thread, or inside an audio worker process.
+    """
+    # Prepare query
+    q = query if is_url(query) else f"ytsearch1:{query}"
+
+    # yt-dlp is imported on the first extraction (off the event loop):
+    # it costs hundreds of ms and tens of MB that bots without music never pay
+    import yt_dlp
+    info = yt_dlp.YoutubeDL(YTDLP_OPTS).extract_info(q, download=False)
+
+    if not info:
+        raise RuntimeError("Không thể lấy thông tin video")
+
+    # Handle search results
+    if "entries" in info:
+        if not info["entries"]:
+            raise RuntimeError("Không tìm thấy video nào")
+        info = info["entries"][0]
+
+    return {
+        "title": info.get("title", "Unknown Title"),
+        "stream_url": info.get("url") or info.get("webpage_url", ""),
+        "page_url": info.get("webpage_url", ""),
+        "duration": info.get("duration"),
+        # Headers for streaming
+        "headers": info.get("http_headers") or {},
+        # Additional info for rich embed
+        "artist": info.get("artist") or info.get("creator") or info.get("uploader"),
+        "uploader": info.get("uploader") or info.get("channel"),
+        "thumbnail": info.get("thumbnail"),
+        "view_count": info.get("view_count"),
+        "video_id": info.get("id"),
+    }
+
+
+def extract_playlist_info(url: str) -> dict:
+    """Blocking flat playlist listing: title plus placeholder fields per entry"""
+    import yt_dlp
+    info = yt_dlp.YoutubeDL(PLAYLIST_OPTS).extract_info(url, download=False)
+
+    if not info or not info.get("entries"):
+        raise RuntimeError("Playlist trống hoặc không truy cập được")
+
+    entries = []
+    for entry in info["entries"]:
+        if not entry or entry.get("title") in UNAVAILABLE_TITLES:
+            continue
+        video_id = entry.get("id")
+        page_url = entry.get("url") or (f"https://www.youtube.com/watch?v={video_id}" if video_id else None)
+        if not page_url:
+            continue
+        duration = entry.get("duration")
+        entries.append({
+            "title": entry.get("title") or "Unknown Title",
+            "page_url": page_url,
+            "duration": int(duration) if duration else None,
+            "uploader": entry.get("uploader") or entry.get("channel"),
+            "video_id": video_id,
+        })
+    return {"title": info.get("title") or "Playlist", "entries": entries}
+
+
+async def _run_extraction(op: str, query: str, extract):
+    """Run a yt-dlp call in an audio worker, or in an executor thread (fallback)"""
+    pool = get_audio_pool()
+    if pool is not None and pool.alive():
+        try:
+            return await pool.extract(query, op=op)
+        except AudioWorkerUnavailable as e:
+            print(f"[AUDIO WORKER] {e}, trích xuất trong bot")
+
+    # Run extraction in executor to avoid blocking
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, extract, query)
+
 
 async def ytdlp_extract(query: str, requested_by: int) -> Track:
     """Extract track information using yt-dlp"""
     try:
-        # Prepare query
-        q = query if is_url(query) else f"ytsearch1:{query}"
-        ytdl = yt_dlp.YoutubeDL(YTDLP_OPTS)
-        
-        # Run extraction in executor to avoid blocking
-        loop = asyncio.get_running_loop()
-        info = await loop.run_in_executor(None, lambda: ytdl.extract_info(q, download=False))
-        
-        if not info:
-            raise RuntimeError("Không thể lấy thông tin video")
-        
-        # Handle search results
-        if "entries" in info:
-            if not info["entries"]:
-                raise RuntimeError("Không tìm thấy video nào")
-            info = info["entries"][0]
-        
-        # Extract track information
-        title = info.get("title", "Unknown Title")
-        stream_url = info.get("url") or info.get("webpage_url", "")
-        page_url = info.get("webpage_url", "")
-        duration = info.get("duration")
-        
-        # Get additional info for rich embed
-        artist = info.get("artist") or info.get("creator") or info.get("uploader")
-        uploader = info.get("uploader") or info.get("channel")
-        thumbnail = info.get("thumbnail")
-        view_count = info.get("view_count")
-        
-        # Get headers for streaming
-        headers = {}
-        if "http_headers" in info:
-            headers = info["http_headers"]
-        
-        return Track(
-            title=title,
-            stream_url=stream_url,
-            page_url=page_url,
-            duration=duration,
-            requested_by=requested_by,
-            headers=headers,
-            artist=artist,
-            uploader=uploader,
-            thumbnail=thumbnail,
-            view_count=view_count
-        )
-        
+        info = await _run_extraction("queue", query, extract_track_info)
+        return Track(requested_by=requested_by, **info)
+
     except Exception as e:
         raise RuntimeError(f"Lỗi khi xử lý video: {str(e)}")
 
 
+async def ytdlp_extract_playlist(url: str, requested_by: int) -> Tuple[str, List[Track]]:
+    """List a playlist as placeholder tracks (stream URLs resolved later, see resolve_track)"""
+    try:
+        info = await _run_extraction("playlist", url, extract_playlist_info)
+    except Exception as e:
+        raise RuntimeError(f"Lỗi khi xử lý playlist: {str(e)}")
+
+    tracks = [
+        Track(stream_url="", requested_by=requested_by, **entry)
+        for entry in info["entries"]
+    ]
+    if not tracks:
+        raise RuntimeError("Không có video nào phát được trong playlist")
+    return info["title"], tracks
+
+
+async def resolve_track(track: Track) -> None:
+    """Fill in a placeholder track (stream URL, headers, metadata) in place"""
+    resolved = await ytdlp_extract(track.page_url, track.requested_by)
+    for f in fields(Track):
+        if f.name not in ("requested_by", "resume_at"):
+            setattr(track, f.name, getattr(resolved, f.name))
+
+
 def build_ffmpeg_options(track: Track) -> str:
     """Build FFmpeg command line options for audio streaming"""
     # Base options - simplified to avoid issues
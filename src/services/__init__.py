@@ -0,0 +1,16 @@
+"""
+Service layer shared by the prefix and slash command front ends
+
+Commands parse input and choose where replies go; the work itself (and its
+caching and instrumentation) lives here once.
+"""
+
+from .base import ServiceError, add_hook, remove_hook, service_stats
+from .directory import DirectoryService
+from .music import MusicService
+from .provisioning import ProvisioningService
+
+__all__ = [
+    'ServiceError', 'add_hook', 'remove_hook', 'service_stats',
+    'DirectoryService', 'MusicService', 'ProvisioningService',
+]
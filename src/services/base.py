@@ -0,0 +1,76 @@
+"""
+Instrumentation shared by the service layer
+"""
+import functools
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+# (operation, seconds, error or None) -> None; called after every instrumented call
+Hook = Callable[[str, float, Optional[BaseException]], None]
+
+_hooks: List[Hook] = []
+# operation -> [calls, errors, total seconds, slowest seconds]
+_timings: Dict[str, List[float]] = defaultdict(lambda: [0, 0, 0.0, 0.0])
+
+
+class ServiceError(RuntimeError):
+    """A request the service refuses, with a message meant for the user."""
+
+
+def add_hook(hook: Hook) -> None:
+    """Observe every service call (benchmarks, logging, external metrics)."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def service_stats() -> Dict[str, Dict[str, float]]:
+    """Calls, errors and latency per service operation (slowest total first)."""
+    stats = {
+        name: {
+            "calls": int(calls),
+            "errors": int(errors),
+            "avg_ms": round(total / calls * 1000, 1) if calls else 0.0,
+            "max_ms": round(slowest * 1000, 1),
+        }
+        for name, (calls, errors, total, slowest) in _timings.items()
+    }
+    return dict(sorted(stats.items(), key=lambda item: item[1]["avg_ms"] * item[1]["calls"], reverse=True))
+
+
+def _record(name: str, seconds: float, error: Optional[BaseException]) -> None:
+    entry = _timings[name]
+    entry[0] += 1
+    entry[1] += error is not None
+    entry[2] += seconds
+    entry[3] = max(entry[3], seconds)
+    for hook in list(_hooks):
+        try:
+            hook(name, seconds, error)
+        except Exception as e:
+            print(f"[SERVICES] Hook lỗi ({name}): {e}")
+
+
+def instrumented(func):
+    """Time an async service method as `<Class>.<method>`; ServiceError counts as a normal outcome."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        error = None
+        try:
+            return await func(*args, **kwargs)
+        except ServiceError:
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _record(name, time.perf_counter() - started, error)
+
+    return wrapper
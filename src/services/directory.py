@@ -0,0 +1,262 @@
+"""
+Participant directory service behind assign / check / editassign
+"""
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional
+
+import discord
+
+from ..utils.participant_index import format_suggestions
+from .base import ServiceError, instrumented
+
+_SUPPORT_DEFAULT = "Vui lòng liên hệ admin để được hỗ trợ giải quyết vấn đề này."
+
+
+@dataclass
+class AssignResult:
+    status: str  # ok, not_found, already_assigned, already_linked, discord_already_used, error
+    message: str
+    participant: Optional[Mapping[str, Any]] = None
+    # Participant already holding the caller's Discord ID (discord_already_used)
+    holder: Optional[Mapping[str, Any]] = None
+
+
+class DirectoryService:
+    """MSSV <-> Discord lookups and links for both command front ends.
+
+    Reads come from the in-memory ParticipantDirectory once it is loaded;
+    until then they fall back to MongoDB in a worker thread, so neither path
+    blocks the event loop. Front ends only choose where the embeds go (DM,
+    reply or ephemeral).
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @property
+    def directory(self):
+        directory = getattr(self.bot, "directory", None)
+        return directory if directory is not None and directory.loaded else None
+
+    @property
+    def index(self):
+        """The participant index when loaded (autocomplete, suggestions), else None."""
+        directory = self.directory
+        return directory.index if directory is not None else None
+
+    def _mongo(self):
+        mongo = getattr(self.bot, "mongo", None)
+        if not mongo:
+            raise ServiceError("Hệ thống cơ sở dữ liệu chưa được cấu hình.")
+        return mongo
+
+    async def _find_one(self, query: Dict[str, Any]) -> Optional[Mapping[str, Any]]:
+        return await asyncio.to_thread(self._mongo().participants.find_one, query)
+
+    # ----- Operations -----
+    @instrumented
+    async def assign(self, mssv: str, user_id: int) -> AssignResult:
+        """Link the caller's Discord ID to an MSSV (journaled write-behind when cached)."""
+        mongo = self._mongo()
+        directory = self.directory
+        if directory is not None:
+            status, message = await directory.assign(mssv, user_id)
+            doc = directory.get(mssv)
+        else:
+            status, message = await asyncio.to_thread(mongo.assign_discord_by_mssv, mssv, user_id)
+            try:
+                doc = await self._find_one({"mssv": str(mssv).strip()})
+            except Exception:
+                doc = None
+
+        result = AssignResult(status, message, doc)
+        if status == "discord_already_used":
+            if directory is not None:
+                result.holder = directory.by_discord(user_id)
+            else:
+                result.holder = await self._find_one({"discord_id": user_id})
+        return result
+
+    @instrumented
+    async def find(self, user_id: int, mssv: Optional[str] = None, assign_usage: str = "!assign <mssv>") -> Mapping[str, Any]:
+        """Participant by MSSV, or the caller's own record without one."""
+        self._mongo()
+        index = self.index
+        if not mssv:
+            doc = index.by_discord(user_id) if index is not None else await self._find_one({"discord_id": user_id})
+            if not doc:
+                raise ServiceError(
+                    "❌ **Không tìm thấy thông tin:** Bạn chưa liên kết MSSV nào với Discord của mình.\n"
+                    f"Sử dụng `{assign_usage}` để liên kết."
+                )
+            return doc
+
+        doc = index.get(mssv) if index is not None else await self._find_one({"mssv": str(mssv).strip()})
+        if not doc:
+            hint = format_suggestions(index.lookup(mssv)) if index is not None else ""
+            raise ServiceError(f"❌ **Không tìm thấy:** MSSV {mssv} không tồn tại trong hệ thống.{hint}")
+        return doc
+
+    @instrumented
+    async def relink(self, mssv: str, member: discord.abc.User) -> Dict[str, Any]:
+        """Admin relink of an MSSV to a member; returns MongoManager.relink_discord_by_mssv's info."""
+        mongo = self._mongo()
+        # One conditional update; a transaction only when links are swapped
+        status, info = await asyncio.to_thread(mongo.relink_discord_by_mssv, mssv, member.id)
+        if status == "not_found":
+            raise ServiceError(f"❌ **Lỗi:** MSSV {mssv} không tồn tại trong hệ thống.")
+        if status == "already_linked":
+            raise ServiceError(f"ℹ️ **Thông tin:** MSSV {mssv} đã được liên kết với Discord ID của {member.mention} rồi.")
+
+        # Keep the cached directory in step with the database
+        directory = getattr(self.bot, "directory", None)
+        if directory is not None:
+            existing_mssv = info["previous_mssv"]
+            if existing_mssv and existing_mssv != mssv:
+                directory.clear_link(existing_mssv)
+            directory.set_link(str(mssv).strip(), member.id)
+        return info
+
+    # ----- Embeds -----
+    def conflict_embed(self, result: AssignResult) -> discord.Embed:
+        """The caller's Discord ID is already linked to another MSSV."""
+        holder = result.holder
+        embed = discord.Embed(
+            title="❌ **Lỗi: Discord ID đã được sử dụng**",
+            description=result.message,
+            color=0xe74c3c
+        )
+        embed.add_field(
+            name="🔧 **Cần hỗ trợ**",
+            value="Discord ID của bạn đã được sử dụng bởi MSSV khác. Vui lòng liên hệ admin để được hỗ trợ.",
+            inline=False
+        )
+        embed.add_field(
+            name="📋 **Thông tin người đang sử dụng Discord ID của bạn**",
+            value=f"MSSV: {holder.get('mssv', 'Không có') if holder else 'Không tìm thấy'}\n"
+                  f"Họ và tên: {holder.get('full_name', 'Không có tên') if holder else 'Không tìm thấy'}",
+            inline=False
+        )
+
+        support_channel = self.bot.get_channel(self.bot.config.support_channel_id) if self.bot.config.support_channel_id else None
+        embed.add_field(
+            name="📞 **Liên hệ hỗ trợ**",
+            value=f"Vui lòng đến channel {support_channel.mention} để được admin hỗ trợ giải quyết vấn đề này." if support_channel else _SUPPORT_DEFAULT,
+            inline=False
+        )
+        return embed
+
+    @staticmethod
+    def assign_embed(result: AssignResult) -> discord.Embed:
+        embed = discord.Embed(
+            title="Kết quả liên kết MSSV",
+            description=result.message,
+            color=0x2ecc71 if result.status in ("ok", "already_linked") else 0xe67e22,
+        )
+        doc = result.participant
+        if doc:
+            embed.add_field(name="Họ và tên", value=doc.get("full_name") or "-", inline=False)
+            embed.add_field(name="MSSV", value=doc.get("mssv") or "-", inline=True)
+            team = doc.get("team_name") or doc.get("team_id") or "-"
+            embed.add_field(name="Tên đội", value=str(team), inline=True)
+
+        if result.status == "already_assigned":
+            embed.add_field(
+                name="⚠️ Lưu ý",
+                value="MSSV này đã được liên kết với tài khoản Discord khác. Nếu bạn nghĩ đây là lỗi, vui lòng liên hệ admin.",
+                inline=False
+            )
+        elif result.status == "already_linked":
+            embed.add_field(name="ℹ️ Thông tin", value="MSSV này đã được liên kết với Discord của bạn rồi.", inline=False)
+        return embed
+
+    @staticmethod
+    def participant_embed(doc: Mapping[str, Any], viewer_id: int) -> discord.Embed:
+        """Full /check record (sent privately)."""
+        embed = discord.Embed(title="📋 Thông tin tham gia viên", color=0x3498db)
+
+        embed.add_field(name="👤 **Họ và tên**", value=doc.get("full_name") or "-", inline=False)
+        embed.add_field(name="🆔 **MSSV**", value=doc.get("mssv") or "-", inline=True)
+        embed.add_field(name="📧 **Email**", value=doc.get("email") or "-", inline=True)
+        embed.add_field(name="📱 **Số điện thoại**", value=doc.get("phone") or "-", inline=True)
+        embed.add_field(name="🏫 **Trường**", value=doc.get("school") or "-", inline=True)
+        embed.add_field(name="🎓 **Khoa**", value=doc.get("faculty") or "-", inline=True)
+        embed.add_field(name="📘 **Facebook**", value=doc.get("facebook") or "-", inline=True)
+        embed.add_field(name="👥 **Tên đội**", value=str(doc.get("team_name") or doc.get("team_id") or "-"), inline=True)
+
+        discord_id = doc.get("discord_id")
+        if not discord_id:
+            link = "❌ Chưa liên kết"
+        elif int(discord_id) == viewer_id:
+            link = "✅ Đã liên kết với bạn"
+        else:
+            link = f"⚠️ Liên kết với Discord ID khác: {discord_id}"
+        embed.add_field(name="🔗 **Trạng thái Discord**", value=link, inline=True)
+
+        if doc.get("updated_at"):
+            embed.add_field(name="🕒 **Cập nhật lần cuối**", value=doc.get("updated_at").strftime("%d/%m/%Y %H:%M:%S"), inline=False)
+        return embed
+
+    @staticmethod
+    def participant_summary_embed(doc: Mapping[str, Any]) -> discord.Embed:
+        """Name and team only, for public channels."""
+        return discord.Embed(
+            title=f"📋 Thông tin MSSV {doc.get('mssv')}",
+            description=f"**Họ và tên:** {doc.get('full_name')}\n**Đội:** {doc.get('team_name') or doc.get('team_id') or '-'}",
+            color=0x3498db
+        )
+
+    @staticmethod
+    def relink_embed(mssv: str, member: discord.abc.User, admin: discord.abc.User, info: Dict[str, Any]) -> discord.Embed:
+        """Admin confirmation, listing the links the relink removed."""
+        participant = info["participant"]
+        previous_discord_id = info["previous_discord_id"]
+        existing_mssv = info["previous_mssv"]
+
+        embed = discord.Embed(title="✅ **Đã cập nhật liên kết Discord ID**", color=0x2ecc71)
+        embed.add_field(
+            name="👤 **Thông tin tham gia viên**",
+            value=f"**Họ và tên:** {participant.get('full_name', 'Không có tên')}\n**MSSV:** {mssv}",
+            inline=False
+        )
+        embed.add_field(name="🔗 **Discord ID mới**", value=f"{member.mention} ({member.id})", inline=True)
+
+        removed_links = []
+        if previous_discord_id:
+            removed_links.append(f"MSSV {mssv} ↔ Discord ID {previous_discord_id}")
+        if existing_mssv and existing_mssv != mssv:
+            removed_links.append(f"MSSV {existing_mssv} ↔ Discord ID {member.id}")
+        if removed_links:
+            embed.add_field(name="🔄 **Liên kết đã xóa**", value="\n".join(removed_links), inline=False)
+
+        embed.add_field(name="👨‍💼 **Admin thực hiện**", value=admin.mention, inline=False)
+        embed.add_field(name="🕒 **Thời gian**", value=datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M:%S"), inline=False)
+        return embed
+
+    @staticmethod
+    def relink_notice_embed(mssv: str, admin: discord.abc.User, info: Dict[str, Any]) -> discord.Embed:
+        """DM to the member who was linked."""
+        participant = info["participant"]
+        existing_mssv = info["previous_mssv"]
+
+        embed = discord.Embed(
+            title="🔗 **Bạn đã được liên kết với MSSV mới**",
+            description=f"Admin {admin.name} đã liên kết Discord của bạn với MSSV {mssv}.",
+            color=0x3498db
+        )
+        embed.add_field(
+            name="📋 **Thông tin MSSV**",
+            value=f"**Họ và tên:** {participant.get('full_name', 'Không có tên')}\n**MSSV:** {mssv}",
+            inline=False
+        )
+        if existing_mssv and existing_mssv != mssv:
+            embed.add_field(
+                name="🔄 **Liên kết cũ đã bị xóa**",
+                value=f"Discord của bạn không còn liên kết với MSSV {existing_mssv}",
+                inline=False
+            )
+        embed.add_field(name="👨‍💼 **Admin thực hiện**", value=admin.name, inline=True)
+        embed.add_field(name="🕒 **Thời gian**", value=datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M:%S"), inline=True)
+        return embed
@@ -0,0 +1,263 @@
+"""
+Music playback service behind !play / /play and the other music commands
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+import discord
+
+from ..music.player import (
+    get_player, ensure_voice, after_play_callback, force_cleanup_ffmpeg_source,
+    announce_now_playing, announce_finished,
+)
+from ..music.track import Track
+from ..music.ytdlp_handler import ytdlp_extract, ytdlp_extract_playlist, is_playlist_url, build_ffmpeg_options
+from ..utils.responder import Responder
+from .base import instrumented
+
+
+def now_playing_embed(track: Track) -> discord.Embed:
+    """Create a beautiful now playing embed"""
+    embed = discord.Embed(
+        title="🎵 **Đang phát**",
+        description=f"**{track.title}**",
+        color=0x00ff00
+    )
+
+    if track.artist:
+        embed.add_field(name="👤 **Nghệ sĩ**", value=track.artist, inline=True)
+    if track.duration:
+        embed.add_field(name="⏱️ **Thời lượng**", value=track.get_duration_str(), inline=True)
+    if track.uploader:
+        embed.add_field(name="📺 **Kênh**", value=track.uploader, inline=True)
+    if track.thumbnail:
+        embed.set_thumbnail(url=track.thumbnail)
+
+    embed.set_footer(text="🎶 VnuTourBot Music Player")
+    return embed
+
+
+class MusicService:
+    """Playback for both command front ends (prefix and slash).
+
+    Commands hand over the guild, the invoking message or interaction and a
+    Responder; everything else (voice, queue, sources, now-playing) happens
+    here once. Single-track searches are cached for SEARCH_TTL seconds, so
+    the same song requested again during a session skips yt-dlp.
+    """
+
+    # yt-dlp stream URLs stay valid for hours; 10 minutes keeps well clear of that
+    SEARCH_TTL = 600
+    SEARCH_CACHE_SIZE = 256
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._searches: "OrderedDict[str, Tuple[float, Track]]" = OrderedDict()
+        self._search_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    # ----- Search -----
+    async def search(self, query: str, requested_by: int) -> Track:
+        """ytdlp_extract with a short-lived cache keyed by the query text."""
+        key = query.strip()
+        cached = self._searches.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.SEARCH_TTL:
+            self._searches.move_to_end(key)
+            self._search_stats["hits"] += 1
+            return replace(cached[1], requested_by=requested_by, headers=dict(cached[1].headers))
+        self._search_stats["misses"] += 1
+        track = await ytdlp_extract(query, requested_by)
+        self._searches[key] = (time.monotonic(), replace(track, headers=dict(track.headers)))
+        self._searches.move_to_end(key)
+        while len(self._searches) > self.SEARCH_CACHE_SIZE:
+            self._searches.popitem(last=False)
+        return track
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._search_stats, cached=len(self._searches))
+
+    # ----- Commands -----
+    @instrumented
+    async def play(self, origin, query: str, responder: Responder) -> None:
+        """Queue a query or playlist URL and start playback; `origin` is the
+        command message or the slash interaction."""
+        try:
+            await responder.update(f"🔍 **Đang tìm kiếm:** {query}")
+            vc = await ensure_voice(origin)
+
+            player = get_player(origin.guild.id)
+            player.text_channel_id = origin.channel.id
+            requester = origin.user if isinstance(origin, discord.Interaction) else origin.author
+
+            if is_playlist_url(query):
+                # One flat listing; entries are resolved as they near the head
+                title, tracks = await ytdlp_extract_playlist(query, requester.id)
+                added = player.add_tracks(tracks)
+                note = f" (giới hạn {player.queue.max_per_user} bài/người)" if len(added) < len(tracks) else ""
+                await responder.send(f"✅ **Đã thêm {len(added)}/{len(tracks)} bài từ playlist:** {title}{note}")
+            else:
+                track = await self.search(query, requester.id)
+                player.add_track(track)
+                await responder.send(f"✅ **Đã thêm vào queue:** {track.title}")
+
+            # Start playing if not already playing (non-blocking)
+            if not vc.is_playing():
+                asyncio.create_task(self.play_next(origin.guild, vc, player))
+
+        except Exception as e:
+            await responder.send(f"❌ **Lỗi:** {str(e)}")
+
+    @instrumented
+    async def skip(self, guild: discord.Guild) -> str:
+        vc = guild.voice_client
+        if not vc or not vc.is_connected():
+            return "❌ Bot không ở trong voice channel"
+        if not vc.is_playing():
+            return "❌ Không có gì đang phát"
+
+        # Stopping finishes the track; its completion task starts the next one
+        vc.stop()
+        if get_player(guild.id).queue:
+            return "⏭️ **Đã bỏ qua bài hát hiện tại**, đang chuyển sang bài tiếp theo..."
+        return "⏭️ **Đã bỏ qua bài hát hiện tại**\n📭 Queue đã hết, không còn bài nào để phát"
+
+    @instrumented
+    async def stop(self, guild: discord.Guild, farewell: str = "⏹️ **Đã dừng phát nhạc và rời voice channel**") -> str:
+        """Clear the queue, stop and leave the voice channel"""
+        vc = guild.voice_client
+        if not vc or not vc.is_connected():
+            return "❌ Bot không ở trong voice channel"
+
+        player = get_player(guild.id)
+        player.clear_queue()
+        player.skip_current()
+        force_cleanup_ffmpeg_source(player.current_source)
+
+        await vc.disconnect()
+        return farewell
+
+    @instrumented
+    async def set_volume(self, guild: discord.Guild, level: int) -> str:
+        """Set the volume (0-200%) and apply it to the playing track"""
+        if not 0 <= level <= 200:
+            return "❌ Âm lượng phải từ 0% đến 200%"
+
+        player = get_player(guild.id)
+        volume = level / 100.0
+        player.set_volume(volume)
+
+        vc = guild.voice_client
+        if not (vc and vc.is_playing() and player.now_playing):
+            return f"🔊 **Âm lượng đã được đặt thành:** {level}%"
+        if hasattr(vc.source, 'volume'):
+            # Applied by the source itself, no process restart
+            vc.source.volume = volume
+            return f"🔊 **Âm lượng đã được đặt thành:** {level}% (áp dụng ngay lập tức)"
+        await self._restart_at_position(vc, player)
+        return f"🔊 **Âm lượng đã được đặt thành:** {level}% (đang áp dụng...)"
+
+    # ----- Playback -----
+    async def _restart_at_position(self, vc: discord.VoiceClient, player) -> None:
+        """Re-open the current track at the playback position (source without volume control)"""
+        try:
+            track = player.now_playing
+            position = player.get_current_position()
+            track.resume_at = position
+            source = player.create_source(track, build_ffmpeg_options(track))
+            if source.is_opus() != vc.source.is_opus():
+                # The voice client only encodes if it started with PCM; apply on the next track
+                force_cleanup_ffmpeg_source(source)
+                return
+
+            old_source, player.current_source = player.current_source, source
+            player.started_at = datetime.now(timezone.utc).timestamp() - position
+
+            # The new source must not trigger the old track's completion
+            vc.source = source
+            force_cleanup_ffmpeg_source(old_source)
+        except Exception as e:
+            print(f"[VOLUME POSITION ERROR] {e}")
+
+    @instrumented
+    async def play_next(self, guild: discord.Guild, vc: discord.VoiceClient, player) -> None:
+        """Play the next track in queue"""
+        try:
+            track = player.get_next_track()
+            if not track:
+                return
+
+            # Playlist entries get their stream URL just before they play
+            if not await player.ensure_resolved(track):
+                channel = guild.get_channel(player.text_channel_id)
+                if channel:
+                    await channel.send(f"⚠️ **Bỏ qua:** {track.title} (không thể phát)")
+                if player.queue:
+                    await self.play_next(guild, vc, player)
+                return
+
+            # Set as now playing (a restored track resumes at its saved position)
+            player.now_playing = track
+            player.started_at = datetime.now(timezone.utc).timestamp() - track.resume_at
+
+            # Audio cache, audio worker or in-process source, at the current volume
+            source = player.create_source(track, build_ffmpeg_options(track))
+            player.current_source = source
+            vc.play(source, after=lambda err: threading.Thread(target=lambda: asyncio.run(after_play_callback(err, player))).start())
+
+            # Now playing embed (edits the previous track's message when it is still the newest)
+            channel = guild.get_channel(player.text_channel_id)
+            if channel:
+                await announce_now_playing(player, channel, track, now_playing_embed(track))
+
+            async def handle_track_completion():
+                await player.finished.wait()
+                player.finished.clear()
+
+                # Play next track if available (it takes over the now-playing message)
+                if player.queue:
+                    await self.play_next(guild, vc, player)
+                else:
+                    await announce_finished(player)
+                    player.now_playing = None
+                    player.started_at = None
+
+            asyncio.create_task(handle_track_completion())
+
+        except Exception as e:
+            print(f"[PLAY NEXT ERROR] {e}")
+            if player.queue:
+                await self.play_next(guild, vc, player)
+
+    async def resume(self, states: List[Dict[str, Any]]) -> None:
+        """Reconnect and resume the players saved before a restart (see PlayerStateStore)"""
+        for state in states:
+            guild = self.bot.get_guild(state["guild_id"])
+            channel = guild.get_channel(state["voice_channel_id"]) if guild else None
+            if not isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+                continue
+            try:
+                vc = guild.voice_client
+                if vc is None or not vc.is_connected():
+                    vc = await channel.connect()
+
+                player = get_player(guild.id)
+                player.set_volume(state.get("volume", 1.0))
+                player.text_channel_id = state.get("text_channel_id")
+
+                # Stream URLs expired with the old process: queue placeholders, resolved before playing
+                tracks = [Track.from_ref(ref) for ref in state.get("queue", [])]
+                if state.get("now_playing"):
+                    current = Track.from_ref(state["now_playing"])
+                    current.resume_at = state.get("position") or 0.0
+                    tracks.insert(0, current)
+                player.add_tracks(tracks)
+
+                if player.queue and not vc.is_playing():
+                    asyncio.create_task(self.play_next(guild, vc, player))
+                print(f"[MUSIC STATE] Đã khôi phục {guild.name}: {len(player.queue)} bài")
+            except Exception as e:
+                print(f"[MUSIC STATE] Không thể khôi phục nhạc cho {guild.name}: {e}")
@@ -0,0 +1,362 @@
+"""
+Team provisioning service behind addallrole / checkteampermissions
+"""
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import discord
+
+from ..utils.participant_index import team_channel_name, team_role_name
+from .base import ServiceError, instrumented
+
+
+@dataclass
+class ProvisionReport:
+    teams: int = 0
+    created_roles: int = 0
+    created_channels: int = 0
+    assigned_members: int = 0
+    not_in_guild: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+class ProvisioningService:
+    """Creates and checks each team's role and text/voice channels.
+
+    A run looks roles and channels up in name maps built once (instead of
+    scanning the guild's lists for every team) and resolves every linked
+    member with one bulk MemberResolver call up front.
+    """
+
+    def __init__(self, bot, directory_service=None):
+        self.bot = bot
+        self.directory_service = directory_service
+
+    def _category(self) -> discord.CategoryChannel:
+        if not self.bot.config.team_category_id:
+            raise ServiceError("❌ **Lỗi:** Chưa cấu hình `CATEGORYIDFORTEAM` trong file .env")
+        category = self.bot.get_channel(self.bot.config.team_category_id)
+        if not category:
+            raise ServiceError(f"❌ **Lỗi:** Không tìm thấy category với ID {self.bot.config.team_category_id}")
+        return category
+
+    # ----- Provisioning -----
+    @instrumented
+    async def provision_teams(self, guild: discord.Guild) -> ProvisionReport:
+        """Role, text and voice channel for every team with linked members; roles assigned."""
+        category = self._category()
+        mongo = getattr(self.bot, "mongo", None)
+        if not mongo:
+            raise ServiceError("❌ **Lỗi:** Hệ thống cơ sở dữ liệu chưa được cấu hình.")
+
+        teams_with_members = await asyncio.to_thread(mongo.get_teams_with_members)
+        report = ProvisionReport(teams=len(teams_with_members))
+        if not teams_with_members:
+            return report
+
+        # Resolve every linked member up front: cache first, then bulk gateway queries
+        discord_ids = [
+            int(m["discord_id"])
+            for team in teams_with_members
+            for m in team.get("members_with_discord", [])
+            if m.get("discord_id")
+        ]
+        resolved = await self.bot.member_resolver.resolve_many(guild, discord_ids)
+
+        roles = {role.name: role for role in guild.roles}
+        text_channels = {channel.name: channel for channel in category.text_channels}
+        voice_channels = {channel.name: channel for channel in category.voice_channels}
+
+        for team in teams_with_members:
+            try:
+                team_id = team.get("team_id")
+                team_name = team.get("team_name", f"Team {team_id}")
+                members = team.get("members_with_discord", [])
+                if not team_id or not team_name or not members:
+                    continue
+
+                role = roles.get(team_role_name(team_name))
+                if role is None:
+                    role = await self._create_role(guild, team_id, team_name, report)
+                    if role is None:
+                        continue
+                    roles[role.name] = role
+
+                channel_name = team_channel_name(team_name)
+                if channel_name not in text_channels:
+                    channel = await self._create_text_channel(guild, category, role, channel_name, team_id, team_name, report)
+                    if channel is not None:
+                        text_channels[channel_name] = channel
+                if channel_name not in voice_channels:
+                    channel = await self._create_voice_channel(guild, category, role, channel_name, team_id, team_name, report)
+                    if channel is not None:
+                        voice_channels[channel_name] = channel
+
+                for member_data in members:
+                    discord_id = member_data.get("discord_id")
+                    if not discord_id:
+                        continue
+                    member = resolved.get(int(discord_id))
+                    if member is None:
+                        report.not_in_guild.append(member_data.get("mssv") or str(discord_id))
+                        continue
+                    if role in member.roles:
+                        continue
+                    try:
+                        await member.add_roles(role, reason=f"Auto-assigned for team {team_id}")
+                        report.assigned_members += 1
+                    except discord.Forbidden:
+                        report.errors.append(f"Không có quyền assign role cho {member.display_name}")
+                    except Exception as e:
+                        report.errors.append(f"Lỗi assign role cho {member.display_name}: {e}")
+
+            except Exception as e:
+                report.errors.append(f"Lỗi xử lý đội {team.get('team_name', 'Unknown')}: {e}")
+
+        return report
+
+    async def _create_role(self, guild, team_id, team_name, report: ProvisionReport) -> Optional[discord.Role]:
+        try:
+            role = await guild.create_role(
+                name=team_role_name(team_name),
+                color=discord.Color.random(),
+                reason=f"Auto-created for team {team_id}"
+            )
+            report.created_roles += 1
+            return role
+        except discord.Forbidden:
+            report.errors.append(f"Không có quyền tạo role cho đội {team_name}")
+        except Exception as e:
+            report.errors.append(f"Lỗi tạo role cho đội {team_name}: {e}")
+        return None
+
+    async def _create_text_channel(self, guild, category, role, name, team_id, team_name, report: ProvisionReport):
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False, send_messages=False, view_channel=False),
+            role: discord.PermissionOverwrite(
+                read_messages=True,
+                send_messages=True,
+                attach_files=True,
+                embed_links=True,
+                view_channel=True,
+                add_reactions=True,
+                read_message_history=True
+            )
+        }
+        try:
+            channel = await category.create_text_channel(
+                name=name,
+                topic=f"Kênh chat cho đội {team_name}",
+                reason=f"Auto-created for team {team_id}",
+                overwrites=overwrites
+            )
+            report.created_channels += 1
+            return channel
+        except discord.Forbidden:
+            report.errors.append(f"Không có quyền tạo text channel cho đội {team_name}")
+        except Exception as e:
+            report.errors.append(f"Lỗi tạo text channel cho đội {team_name}: {e}")
+        return None
+
+    async def _create_voice_channel(self, guild, category, role, name, team_id, team_name, report: ProvisionReport):
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(connect=False, view_channel=False, speak=False, stream=False),
+            role: discord.PermissionOverwrite(
+                connect=True,
+                view_channel=True,
+                speak=True,
+                stream=True,
+                priority_speaker=False,
+                mute_members=False,
+                deafen_members=False,
+                move_members=False
+            )
+        }
+        try:
+            channel = await category.create_voice_channel(
+                name=name,
+                reason=f"Auto-created for team {team_id}",
+                overwrites=overwrites,
+                user_limit=10  # Limit to 10 users per team
+            )
+            report.created_channels += 1
+            return channel
+        except discord.Forbidden:
+            report.errors.append(f"Không có quyền tạo voice channel cho đội {team_name}")
+        except Exception as e:
+            report.errors.append(f"Lỗi tạo voice channel cho đội {team_name}: {e}")
+        return None
+
+    # ----- Embeds -----
+    @staticmethod
+    def progress_embed() -> discord.Embed:
+        return discord.Embed(
+            title="🔄 **Đang tạo role và channel cho các đội...**",
+            description="Vui lòng chờ trong khi bot xử lý...",
+            color=0xf39c12
+        )
+
+    @staticmethod
+    def report_embed(report: ProvisionReport, admin: discord.abc.User) -> discord.Embed:
+        if not report.teams:
+            return discord.Embed(
+                title="❌ **Không có đội nào để xử lý**",
+                description="Không tìm thấy đội nào có thành viên đã assign Discord ID.",
+                color=0xe74c3c
+            )
+
+        embed = discord.Embed(title="✅ **Hoàn thành tạo role và channel**", color=0x2ecc71)
+        embed.add_field(
+            name="📊 **Thống kê**",
+            value=f"**Đội được xử lý:** {report.teams}\n"
+                  f"**Role đã tạo:** {report.created_roles}\n"
+                  f"**Channel đã tạo:** {report.created_channels}\n"
+                  f"**Thành viên được assign role:** {report.assigned_members}\n"
+                  f"**Không có trong server:** {len(report.not_in_guild)}",
+            inline=False
+        )
+
+        if report.not_in_guild:
+            listed = ", ".join(report.not_in_guild[:20])
+            if len(report.not_in_guild) > 20:
+                listed += f" ... và {len(report.not_in_guild) - 20} MSSV khác"
+            embed.add_field(name="👻 **MSSV đã liên kết nhưng không có trong server**", value=listed, inline=False)
+
+        if report.errors:
+            error_text = "\n".join(report.errors[:10])  # Limit to first 10 errors
+            if len(report.errors) > 10:
+                error_text += f"\n... và {len(report.errors) - 10} lỗi khác"
+            embed.add_field(name="⚠️ **Lỗi gặp phải**", value=f"```{error_text}```", inline=False)
+
+        embed.add_field(name="👨‍💼 **Admin thực hiện**", value=admin.mention, inline=True)
+        embed.add_field(name="🕒 **Thời gian**", value=datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M:%S"), inline=True)
+        return embed
+
+    # ----- Checks -----
+    def _role_holders(self, guild: discord.Guild, role: discord.Role, index, team) -> str:
+        """Member count of a team role.
+
+        `role.members` only sees the member cache, which the "event" cache
+        profile keeps nearly empty; there the team's linked participants are
+        looked up through MemberResolver instead (its map, no gateway query).
+        """
+        if self.bot.config.cache_profile == "full":
+            return str(len(role.members))
+        if team is None:
+            return f"{len(role.members)} (chỉ tính thành viên trong cache)"
+        ids = [r.discord_id for r in index.team_records(team) if r.discord_id is not None]
+        members = [self.bot.member_resolver.get(guild, i) for i in ids]
+        holders = sum(1 for m in members if m is not None and role in m.roles)
+        text = f"{holders}/{len(ids)} thành viên đã liên kết"
+        missing = sum(1 for m in members if m is None)
+        if missing:
+            text += f" ({missing} chưa nạp/không có trong server)"
+        return text
+
+    def team_permissions_embed(self, guild: discord.Guild, team_name: str) -> discord.Embed:
+        """Role/channel/permission report for a team.
+
+        Names come precomputed from the participant index when the team is known;
+        channels are looked up in the team category that provisioning creates them in.
+        """
+        index = self.directory_service.index if self.directory_service is not None else None
+        team = index.team(team_name) if index is not None else None
+        role_name = team.role_name if team else team_role_name(team_name)
+        channel_name = team.channel_name if team else team_channel_name(team_name)
+
+        embed = discord.Embed(
+            title=f"🔍 **Kiểm tra Permissions - {role_name}**",
+            color=0x3498db
+        )
+        if team:
+            embed.add_field(
+                name="👥 **Đội**",
+                value=f"**Tên:** {team.team_name}\n**ID:** {team.team_id or '-'}\n**Thành viên (dữ liệu):** {team.members}",
+                inline=False
+            )
+        elif index is not None:
+            similar = index.search_teams(team_name, 5)
+            if similar:
+                embed.add_field(
+                    name="💡 **Có phải bạn muốn tìm**",
+                    value="\n".join(f"• {t.team_name}" for t in similar),
+                    inline=False
+                )
+
+        category = self.bot.get_channel(self.bot.config.team_category_id) if self.bot.config.team_category_id else None
+        text_channels = category.text_channels if category else guild.text_channels
+        voice_channels = category.voice_channels if category else guild.voice_channels
+
+        # Check role
+        role = discord.utils.get(guild.roles, name=role_name)
+        if role:
+            embed.add_field(
+                name="✅ **Role**",
+                value=f"**Tên:** {role.name}\n**ID:** {role.id}\n**Màu:** {role.color}\n**Thành viên:** {self._role_holders(guild, role, index, team)}",
+                inline=False
+            )
+        else:
+            embed.add_field(
+                name="❌ **Role**",
+                value=f"Không tìm thấy role `{role_name}`",
+                inline=False
+            )
+
+        # Check text channel
+        text_channel = discord.utils.get(text_channels, name=channel_name)
+        if text_channel:
+            embed.add_field(
+                name="✅ **Text Channel**",
+                value=f"**Tên:** {text_channel.name}\n**ID:** {text_channel.id}\n**Category:** {text_channel.category.name if text_channel.category else 'None'}",
+                inline=False
+            )
+
+            # Check permissions
+            if role:
+                role_perms = text_channel.permissions_for(role)
+                embed.add_field(
+                    name="📝 **Text Channel Permissions**",
+                    value=f"**Đọc tin nhắn:** {'✅' if role_perms.read_messages else '❌'}\n"
+                          f"**Gửi tin nhắn:** {'✅' if role_perms.send_messages else '❌'}\n"
+                          f"**Gửi file:** {'✅' if role_perms.attach_files else '❌'}\n"
+                          f"**Embed links:** {'✅' if role_perms.embed_links else '❌'}\n"
+                          f"**Reactions:** {'✅' if role_perms.add_reactions else '❌'}",
+                    inline=True
+                )
+        else:
+            embed.add_field(
+                name="❌ **Text Channel**",
+                value=f"Không tìm thấy text channel `{channel_name}`",
+                inline=False
+            )
+
+        # Check voice channel
+        voice_channel = discord.utils.get(voice_channels, name=channel_name)
+        if voice_channel:
+            embed.add_field(
+                name="✅ **Voice Channel**",
+                value=f"**Tên:** {voice_channel.name}\n**ID:** {voice_channel.id}\n**Category:** {voice_channel.category.name if voice_channel.category else 'None'}\n**User limit:** {voice_channel.user_limit}",
+                inline=False
+            )
+
+            # Check permissions
+            if role:
+                role_perms = voice_channel.permissions_for(role)
+                embed.add_field(
+                    name="🎤 **Voice Channel Permissions**",
+                    value=f"**Kết nối:** {'✅' if role_perms.connect else '❌'}\n"
+                          f"**Xem channel:** {'✅' if role_perms.view_channel else '❌'}\n"
+                          f"**Nói chuyện:** {'✅' if role_perms.speak else '❌'}\n"
+                          f"**Stream:** {'✅' if role_perms.stream else '❌'}",
+                    inline=True
+                )
+        else:
+            embed.add_field(
+                name="❌ **Voice Channel**",
+                value=f"Không tìm thấy voice channel `{channel_name}`",
+                inline=False
+            )
+
+        return embed
@@ -4,8 +4,9 @@ Utility functions and helpers
 
 from .role_manager import RoleManager
 from .mongo import MongoManager
+from .http_client import HttpClient
 
-__all__ = ['RoleManager', 'MongoManager']
+__all__ = ['RoleManager', 'MongoManager', 'HttpClient']
 
 
 
@@ -0,0 +1,209 @@
+"""
+In-memory participant directory with write-behind Discord ID assignments
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .journal import AssignmentJournal
+from .participant_index import RECORD_FIELDS, ParticipantIndex, ParticipantRecord
+
+try:
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+except Exception:  # pragma: no cover
+    UpdateOne = None  # type: ignore
+    BulkWriteError = Exception  # type: ignore
+
+
+class ParticipantDirectory:
+    """Cached MSSV <-> Discord ID directory answering `/assign` without the database.
+
+    `assign()` validates against the cache, journals the link durably and
+    returns immediately; `run_replay()` drains the journal into MongoDB in
+    batches. The cache is loaded once at startup and reloaded after each
+    sheet sync, with still-pending assignments re-applied on top. It holds
+    the full /check record of every participant in a `ParticipantIndex`.
+    """
+
+    def __init__(self, journal: AssignmentJournal, batch_size: int = 100):
+        self.journal = journal
+        self.batch_size = batch_size
+        self.index = ParticipantIndex()
+        self.loaded = False
+        # Own thread for the fsync'ed appends: the default executor also runs
+        # yt-dlp searches, and /assign must not queue behind them
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assign-journal")
+        self._wake = asyncio.Event()
+        self._stats: Dict[str, Any] = {
+            "replayed": 0,
+            "conflicts": 0,
+            "batches": 0,
+            "last_replay_at": None,
+            "last_error": None,
+        }
+
+    # ----- Cache -----
+    @staticmethod
+    def _read(mongo: Any) -> ParticipantIndex:
+        projection = {f: 1 for f in RECORD_FIELDS}
+        projection["_id"] = 0
+        return ParticipantIndex(mongo.participants.find({}, projection))
+
+    async def refresh(self, mongo: Any) -> int:
+        """Reload from the database (one query, off the loop) and swap the cache in."""
+        index = await asyncio.to_thread(self._read, mongo)
+        # Assignments not yet in the database still count
+        for entry in self.journal.pending():
+            if entry.get("op") == "assign":
+                index.link(entry["mssv"], int(entry["discord_id"]))
+        self.index = index
+        self.loaded = True
+        return len(index)
+
+    def get(self, mssv: str) -> Optional[ParticipantRecord]:
+        return self.index.get(mssv)
+
+    def by_discord(self, discord_id: int) -> Optional[ParticipantRecord]:
+        return self.index.by_discord(discord_id)
+
+    def set_link(self, mssv: str, discord_id: int) -> None:
+        """Record a link already written elsewhere (e.g. by editassign)."""
+        self.index.link(mssv, discord_id)
+
+    def clear_link(self, mssv: str) -> None:
+        self.index.unlink(mssv)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    # ----- Assignment -----
+    async def assign(self, mssv: str, discord_id: int) -> Tuple[str, str]:
+        """Same statuses as MongoManager.assign_discord_by_mssv, answered from the cache."""
+        mssv = str(mssv).strip()
+        discord_id = int(discord_id)
+        user = self.index.get(mssv)
+        if not user:
+            return ("not_found", f"Không tìm thấy MSSV {mssv} trong hệ thống.")
+
+        other = self.by_discord(discord_id)
+        if other and other.get("mssv") != mssv:
+            return (
+                "discord_already_used",
+                f"Discord ID của bạn đã được sử dụng bởi MSSV {other.get('mssv')} ({other.get('full_name') or 'Không có tên'}).",
+            )
+
+        current = user.get("discord_id")
+        if current is not None:
+            if int(current) == discord_id:
+                return ("already_linked", f"MSSV {mssv} đã liên kết với Discord của bạn.")
+            return ("already_assigned", f"MSSV {mssv} đã được liên kết với tài khoản Discord khác.")
+
+        # Reserve in the cache before yielding to the loop so concurrent
+        # assigns for the same MSSV/Discord ID see it
+        self.set_link(mssv, discord_id)
+        entry = AssignmentJournal.new_entry("assign", mssv=mssv, discord_id=discord_id)
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._writer, self.journal.append, entry)
+        except Exception as e:
+            self.clear_link(mssv)
+            return ("error", f"Lỗi khi gán Discord ID: {e}")
+        self._wake.set()
+        return ("ok", f"Đã gán Discord cho MSSV {mssv}.")
+
+    # ----- Replay -----
+    def replay_batch(self, mongo: Any) -> Dict[str, Any]:
+        """Blocking: write up to `batch_size` journal entries with one bulk_write, then ack them.
+
+        The filter only matches a free slot or the same link, so replaying an
+        entry twice is harmless. Entries that did not land (slot taken or the
+        Discord ID used by another MSSV in the meantime) are conflicts: the
+        entry is dropped and returned with the stored value so the caller can
+        correct the cache.
+        """
+        entries = self.journal.pending(self.batch_size)
+        if not entries:
+            return {"replayed": 0, "conflicts": []}
+
+        ops = [
+            UpdateOne(
+                {"mssv": e["mssv"], "discord_id": {"$in": [None, int(e["discord_id"])]}},
+                {"$set": {
+                    "discord_id": int(e["discord_id"]),
+                    "assign_key": e["id"],
+                    "updated_at": datetime.fromisoformat(e["at"]),
+                }},
+            )
+            for e in entries
+        ]
+        try:
+            mongo.participants.bulk_write(ops, ordered=False)
+        except BulkWriteError:
+            pass  # duplicate discord_id etc.; classified below
+
+        stored = {
+            d["mssv"]: d
+            for d in mongo.participants.find(
+                {"mssv": {"$in": [e["mssv"] for e in entries]}},
+                {"_id": 0, "mssv": 1, "discord_id": 1, "full_name": 1},
+            )
+        }
+        conflicts: List[Tuple[Dict[str, Any], Optional[int]]] = []
+        for e in entries:
+            doc = stored.get(e["mssv"])
+            if doc and doc.get("discord_id") == int(e["discord_id"]):
+                continue
+            conflicts.append((e, doc.get("discord_id") if doc else None))
+
+        self.journal.ack(len(entries))
+        return {"replayed": len(entries) - len(conflicts), "conflicts": conflicts}
+
+    def _resolve_conflict(self, entry: Dict[str, Any], stored_id: Optional[int]) -> None:
+        print(
+            f"[ASSIGN] Xung đột khi ghi MSSV {entry['mssv']} -> {entry['discord_id']}: "
+            f"trong DB là {stored_id if stored_id is not None else 'chưa gán'}"
+        )
+        holder = self.index.by_discord(int(entry["discord_id"]))
+        if holder is not None and holder.mssv == entry["mssv"]:
+            self.clear_link(entry["mssv"])
+        if stored_id is not None:
+            self.set_link(entry["mssv"], int(stored_id))
+
+    async def run_replay(self, get_mongo: Callable[[], Any], interval: float = 2.0) -> None:
+        """Drain the journal forever; backs off while MongoDB is missing, offline or failing."""
+        backoff = interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            mongo = get_mongo()
+            if not len(self.journal) or mongo is None or getattr(mongo, "offline", False):
+                backoff = interval
+                continue
+            try:
+                while len(self.journal):
+                    result = await asyncio.to_thread(self.replay_batch, mongo)
+                    # Cache corrections happen on the loop, never in the worker thread
+                    for entry, stored_id in result["conflicts"]:
+                        self._resolve_conflict(entry, stored_id)
+                    self._stats["replayed"] += result["replayed"]
+                    self._stats["conflicts"] += len(result["conflicts"])
+                    self._stats["batches"] += 1
+                    self._stats["last_replay_at"] = datetime.now(timezone.utc).isoformat()
+                self._stats["last_error"] = None
+                backoff = interval
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+                print(f"[ASSIGN] Lỗi ghi journal vào MongoDB, thử lại sau: {e}")
+                backoff = min(60.0, backoff * 2) + random.uniform(0, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = self.journal.oldest_at()
+        lag = (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0.0
+        return dict(self._stats, pending=len(self.journal), lag_seconds=round(lag, 1), cached=len(self))
@@ -0,0 +1,170 @@
+"""
+Shared pooled HTTP client for outbound integrations (Google Sheets, Drive, ...)
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class HttpClient:
+    """Bot-scoped aiohttp session with connection pooling and retries.
+
+    One instance is created in `VnuTourBot.setup_hook` and shared, so repeated
+    calls to the same host reuse DNS lookups and keep-alive TLS connections.
+    Idempotent requests are retried on 429/5xx and connection errors with
+    jittered exponential backoff (honouring `Retry-After`).
+    """
+
+    def __init__(
+        self,
+        limit: int = 50,
+        limit_per_host: int = 10,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 60.0,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._stats: Dict[str, int] = {
+            "requests": 0,
+            "retries": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+
+    # ----- Lifecycle -----
+    async def start(self) -> "HttpClient":
+        if self._session and not self._session.closed:
+            return self
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[self._trace_config()],
+        )
+        return self
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self.closed:
+            raise RuntimeError("HttpClient chưa được khởi động")
+        return self._session
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+        stats = self._stats
+
+        def counter(key: str):
+            async def hook(session, ctx, params):
+                stats[key] += 1
+            return hook
+
+        trace.on_request_start.append(counter("requests"))
+        trace.on_connection_create_end.append(counter("connections_created"))
+        trace.on_connection_reuseconn.append(counter("connections_reused"))
+        trace.on_dns_cache_hit.append(counter("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(counter("dns_cache_misses"))
+        return trace
+
+    # ----- Requests -----
+    def _backoff(self, attempt: int, resp: Optional[aiohttp.ClientResponse] = None) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        # Full jitter: uniform(0, base * 2^attempt), capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, retry: Optional[bool] = None, **kwargs: Any) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Send a request, retrying transient failures; yields the final response.
+
+        The caller decides what to do with non-2xx statuses (e.g. `raise_for_status`).
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = self.max_retries + 1 if retry else 1
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                resp = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last:
+                    raise
+                self._stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if resp.status in RETRY_STATUSES and not last:
+                delay = self._backoff(attempt, resp)
+                resp.release()
+                self._stats["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                yield resp
+            finally:
+                resp.release()
+            return
+
+    def get(self, url: str, **kwargs: Any):
+        return self.request("GET", url, **kwargs)
+
+    # ----- Stats -----
+    def stats(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = dict(self._stats)
+        opened = data["connections_created"] + data["connections_reused"]
+        data["reuse_ratio"] = round(data["connections_reused"] / opened, 3) if opened else 0.0
+        return data
+
+
+@asynccontextmanager
+async def using_client(http: Optional[HttpClient]) -> AsyncIterator[HttpClient]:
+    """Yield the shared client if given, otherwise a short-lived one (scripts, benchmarks)."""
+    if http is not None and not http.closed:
+        yield http
+        return
+    temp = await HttpClient().start()
+    try:
+        yield temp
+    finally:
+        await temp.close()
@@ -0,0 +1,111 @@
+"""
+Durable append-only journal for write-behind operations
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class AssignmentJournal:
+    """Append-only JSON lines file plus a replay offset.
+
+    `append()` fsyncs before returning, so an acknowledged entry survives a
+    crash. Replayed entries are acknowledged by advancing the byte offset kept
+    in `<path>.offset`; once everything is replayed the file is truncated.
+    Every entry carries an idempotency key (`id`) so a replay that is
+    interrupted between the database write and `ack()` can be recognised.
+    """
+
+    def __init__(self, path: os.PathLike | str):
+        self.path = Path(path)
+        self.offset_path = self.path.with_name(self.path.name + ".offset")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._offset = self._read_offset()
+        tail = self._read_from(self._offset)
+        self._pending: List[Dict[str, Any]] = [entry for _, entry in tail]
+        # End byte offset of each pending entry, so ack() never re-reads the file
+        self._ends: List[int] = [end for end, _ in tail]
+
+    @staticmethod
+    def new_entry(op: str, **fields: Any) -> Dict[str, Any]:
+        return {"id": uuid.uuid4().hex, "op": op, "at": datetime.now(timezone.utc).isoformat(), **fields}
+
+    # ----- Files -----
+    def _read_offset(self) -> int:
+        try:
+            offset = int(self.offset_path.read_text(encoding="utf-8").strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+        size = self.path.stat().st_size if self.path.exists() else 0
+        return offset if offset <= size else 0
+
+    def _write_offset(self, offset: int) -> None:
+        tmp = self.offset_path.with_name(self.offset_path.name + ".tmp")
+        tmp.write_text(str(offset), encoding="utf-8")
+        os.replace(tmp, self.offset_path)
+
+    def _read_from(self, offset: int) -> List[Tuple[int, Dict[str, Any]]]:
+        if not self.path.exists():
+            return []
+        out: List[Tuple[int, Dict[str, Any]]] = []
+        with self.path.open("rb") as f:
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                if not line.endswith(b"\n"):
+                    break  # torn write from a crash mid-append
+                if line.strip():
+                    out.append((offset, json.loads(line)))
+        return out
+
+    # ----- API -----
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            with self.path.open("ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                end = f.tell()
+            self._pending.append(entry)
+            self._ends.append(end)
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._pending[:limit] if limit else self._pending)
+
+    def ack(self, count: int) -> None:
+        """Mark the oldest `count` pending entries as replayed."""
+        if count <= 0:
+            return
+        with self._lock:
+            count = min(count, len(self._pending))
+            if not count:
+                return
+            self._offset = self._ends[count - 1]
+            del self._pending[:count]
+            del self._ends[:count]
+            if not self._pending:
+                # Fully replayed: compact instead of growing forever. The offset
+                # goes first; a crash in between only replays idempotent entries
+                self._offset = 0
+                self._write_offset(0)
+                self.path.write_bytes(b"")
+            else:
+                self._write_offset(self._offset)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def oldest_at(self) -> Optional[datetime]:
+        with self._lock:
+            if not self._pending:
+                return None
+            return datetime.fromisoformat(self._pending[0]["at"])
@@ -0,0 +1,110 @@
+"""
+Lease-based distributed lock stored in the MongoDB `meta` collection
+"""
+from __future__ import annotations
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+try:
+    from pymongo import ReturnDocument
+    from pymongo.errors import DuplicateKeyError
+except Exception:  # pragma: no cover
+    ReturnDocument = None  # type: ignore
+    DuplicateKeyError = Exception  # type: ignore
+
+
+def default_owner() -> str:
+    """Identify this process: host, pid and a random suffix (pids repeat across containers)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class MongoLease:
+    """Expiring lock held by one owner at a time, with a fencing token.
+
+    The lease is one document in `meta` (`key` is unique):
+    `{key, owner, expires_at, token, acquired_at}`. Taking over a free or
+    expired lease increments `token`, so writes guarded by `renew()` (which
+    only matches our owner *and* token) fail once another instance took over,
+    even if this process stalled past its expiry.
+
+    Methods are blocking pymongo calls; run them with `asyncio.to_thread`.
+    """
+
+    def __init__(self, collection: Any, name: str, ttl: float = 90.0, owner: Optional[str] = None):
+        self.collection = collection
+        self.key = f"lease:{name}"
+        self.ttl = ttl
+        self.owner = owner or default_owner()
+        self.token: Optional[int] = None
+        self.expires_at: Optional[datetime] = None
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    @property
+    def held(self) -> bool:
+        """Locally known to be held and not yet expired (no round trip)."""
+        return self.token is not None and self.expires_at is not None and self.expires_at > self._now()
+
+    def acquire(self) -> bool:
+        """Take the lease if free or expired, or renew it if we already hold it."""
+        if self.token is not None and self.renew():
+            return True
+        now = self._now()
+        expires = now + timedelta(seconds=self.ttl)
+        try:
+            doc = self.collection.find_one_and_update(
+                {"key": self.key, "$or": [{"owner": None}, {"expires_at": {"$lte": now}}]},
+                {
+                    "$set": {"owner": self.owner, "expires_at": expires, "acquired_at": now},
+                    "$inc": {"token": 1},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Lease document exists and is held by someone else
+            return False
+        if not doc or doc.get("owner") != self.owner:
+            return False
+        self.token = doc.get("token")
+        self.expires_at = expires
+        return True
+
+    def renew(self) -> bool:
+        """Extend the lease; False (and forget it) if another owner took over."""
+        if self.token is None:
+            return False
+        expires = self._now() + timedelta(seconds=self.ttl)
+        res = self.collection.update_one(
+            {"key": self.key, "owner": self.owner, "token": self.token},
+            {"$set": {"expires_at": expires}},
+        )
+        if res.matched_count == 0:
+            self.token = None
+            self.expires_at = None
+            return False
+        self.expires_at = expires
+        return True
+
+    def release(self) -> None:
+        """Give the lease up so a standby instance can take over immediately."""
+        if self.token is None:
+            return
+        try:
+            self.collection.update_one(
+                {"key": self.key, "owner": self.owner, "token": self.token},
+                {"$set": {"owner": None, "expires_at": self._now()}},
+            )
+        finally:
+            self.token = None
+            self.expires_at = None
+
+    def holder(self) -> Optional[Dict[str, Any]]:
+        """Current lease document (owner, expires_at, token) if any."""
+        return self.collection.find_one({"key": self.key}, {"_id": 0, "owner": 1, "expires_at": 1, "token": 1})
@@ -0,0 +1,146 @@
+"""
+Batch resolution of guild members for participants
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import discord
+
+
+class MemberResolver:
+    """discord_id -> Member map for participants, filled in bulk over the gateway.
+
+    `guild.get_member` only sees the member cache, which is incomplete when
+    startup chunking is off or limited by cache flags; `fetch_member` costs one
+    REST call per user. Misses are instead resolved with
+    `guild.query_members(user_ids=...)`, up to 100 IDs per gateway request, and
+    concurrent single lookups (`resolve`) are coalesced into one request.
+    Only participants' members are kept in the map.
+    """
+
+    QUERY_LIMIT = 100  # user_ids per query_members request (gateway limit)
+
+    def __init__(self, bot, batch_delay: float = 0.05):
+        self.bot = bot
+        self.batch_delay = batch_delay
+        self._members: Dict[int, Dict[int, discord.Member]] = {}
+        self._participants: Set[int] = set()
+        self._pending: Dict[int, Dict[int, asyncio.Future]] = {}
+        self._flushers: Dict[int, asyncio.Task] = {}
+        self._warmed: Set[int] = set()
+        self._stats: Dict[str, Any] = {"cache_hits": 0, "queried": 0, "queries": 0, "not_found": 0}
+
+    # ----- Participants -----
+    def _is_participant(self, user_id: int) -> bool:
+        directory = getattr(self.bot, "directory", None)
+        if directory is not None and directory.loaded:
+            return directory.index.by_discord(user_id) is not None
+        return user_id in self._participants
+
+    async def participant_ids(self) -> List[int]:
+        """Discord IDs linked to an MSSV: from the directory, else one projected query."""
+        directory = getattr(self.bot, "directory", None)
+        if directory is not None and directory.loaded:
+            return directory.index.discord_ids()
+        mongo = getattr(self.bot, "mongo", None)
+        if mongo is None:
+            return []
+
+        def read() -> List[int]:
+            cursor = mongo.participants.find({"discord_id": {"$ne": None}}, {"_id": 0, "discord_id": 1})
+            return [int(d["discord_id"]) for d in cursor if d.get("discord_id") is not None]
+
+        ids = await asyncio.to_thread(read)
+        self._participants = set(ids)
+        return ids
+
+    # ----- Map -----
+    def remember(self, member: discord.Member) -> None:
+        if self._is_participant(member.id):
+            self._members.setdefault(member.guild.id, {})[member.id] = member
+
+    def forget(self, guild_id: int, user_id: int) -> None:
+        self._members.get(guild_id, {}).pop(user_id, None)
+
+    def get(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """Cached lookup only (resolver map, then the guild member cache)."""
+        member = self._members.get(guild.id, {}).get(user_id) or guild.get_member(user_id)
+        if member is not None:
+            self._stats["cache_hits"] += 1
+            self.remember(member)
+        return member
+
+    # ----- Resolution -----
+    async def resolve_many(self, guild: discord.Guild, user_ids: Iterable[int]) -> Dict[int, discord.Member]:
+        """Members for the given IDs; IDs missing from the result are not in the guild."""
+        found: Dict[int, discord.Member] = {}
+        missing: List[int] = []
+        for user_id in dict.fromkeys(int(u) for u in user_ids):
+            member = self.get(guild, user_id)
+            if member is not None:
+                found[user_id] = member
+            else:
+                missing.append(user_id)
+
+        for i in range(0, len(missing), self.QUERY_LIMIT):
+            chunk = missing[i:i + self.QUERY_LIMIT]
+            try:
+                members = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=True)
+            except (asyncio.TimeoutError, discord.ClientException) as e:
+                print(f"[MEMBERS] Không thể truy vấn {len(chunk)} thành viên: {e}")
+                continue
+            self._stats["queries"] += 1
+            self._stats["queried"] += len(chunk)
+            for member in members:
+                found[member.id] = member
+                self.remember(member)
+            self._stats["not_found"] += len(chunk) - len(members)
+        return found
+
+    async def resolve(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """Single lookup; misses arriving within `batch_delay` share one gateway query."""
+        member = self.get(guild, user_id)
+        if member is not None:
+            return member
+        pending = self._pending.setdefault(guild.id, {})
+        fut = pending.get(user_id)
+        if fut is None:
+            fut = pending[user_id] = asyncio.get_running_loop().create_future()
+            flusher = self._flushers.get(guild.id)
+            if flusher is None or flusher.done():
+                self._flushers[guild.id] = asyncio.create_task(self._flush(guild))
+        return await asyncio.shield(fut)
+
+    async def _flush(self, guild: discord.Guild) -> None:
+        await asyncio.sleep(self.batch_delay)
+        pending = self._pending.pop(guild.id, {})
+        # Misses arriving during the query below start a batch of their own
+        self._flushers[guild.id] = None
+        try:
+            found = await self.resolve_many(guild, list(pending))
+        except Exception as e:
+            print(f"[MEMBERS] Lỗi truy vấn thành viên: {e}")
+            found = {}
+        for user_id, fut in pending.items():
+            if not fut.done():
+                fut.set_result(found.get(user_id))
+
+    async def warm(self, guild: discord.Guild) -> Dict[str, int]:
+        """Resolve every participant of the guild once (after startup / chunking)."""
+        ids = await self.participant_ids()
+        found = await self.resolve_many(guild, ids)
+        self._warmed.add(guild.id)
+        result = {"participants": len(ids), "resolved": len(found), "missing": len(ids) - len(found)}
+        print(
+            f"[MEMBERS] {guild.name}: {result['resolved']}/{result['participants']} thành viên có MSSV "
+            f"đã nạp ({result['missing']} không có trong server)"
+        )
+        return result
+
+    def warmed(self, guild_id: int) -> bool:
+        return guild_id in self._warmed
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats, cached=sum(len(m) for m in self._members.values()))
@@ -6,20 +6,28 @@ from __future__ import annotations
 import os
 import re
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
 
 from dotenv import load_dotenv
 
 try:
-    from pymongo import MongoClient, UpdateOne
+    from pymongo import MongoClient, ReturnDocument, UpdateOne
     from pymongo.collection import Collection
-    from pymongo.errors import DuplicateKeyError
+    from pymongo.errors import BulkWriteError, ConfigurationError, DuplicateKeyError, OperationFailure
 except Exception:  # pragma: no cover
     # Allow import of this file even if pymongo not installed yet
     MongoClient = None  # type: ignore
+    ReturnDocument = None  # type: ignore
     UpdateOne = None  # type: ignore
     Collection = None  # type: ignore
     DuplicateKeyError = Exception  # type: ignore
+    BulkWriteError = Exception  # type: ignore
+    ConfigurationError = Exception  # type: ignore
+    OperationFailure = Exception  # type: ignore
+
+
+# Server codes meaning "transactions are not available on this deployment"
+_NO_TRANSACTION_CODES = {20, 263}
 
 
 class MongoManager:
@@ -30,11 +38,32 @@ class MongoManager:
     - teams: team info aggregated by team_id
     """
 
-    def __init__(self, uri: Optional[str] = None, db_name: Optional[str] = None):
+    def __init__(self, uri: Optional[str] = None, db_name: Optional[str] = None, client: Any = None):
         # Use provided URI or get from environment (already loaded by config.py)
         self.uri = uri or os.getenv("MongoDB")
         self.db_name = db_name or os.getenv("MONGODB_DB_NAME", "vnutour")
 
+        if client is not None:
+            # Pre-built client (e.g. a local stand-in used by benchmarks)
+            self.client = client
+        else:
+            self.client = self._create_client()
+        self.db = self.client[self.db_name]
+        self.participants: Collection = self.db["participants"]
+        self.teams: Collection = self.db["teams"]
+        self.meta: Collection = self.db["meta"]
+
+        # Test connection
+        try:
+            self.client.admin.command('ping')
+            print("[DB] Kết nối MongoDB thành công")
+        except Exception as e:
+            print(f"[DB] Lỗi kết nối MongoDB: {e}")
+            raise
+
+        self._ensure_indexes()
+
+    def _create_client(self):
         if not self.uri:
             raise RuntimeError("Thiếu biến môi trường MongoDB (URI) trong .env")
 
@@ -42,7 +71,7 @@ class MongoManager:
             raise RuntimeError("Thiếu thư viện pymongo. Vui lòng `pip install -r requirements.txt`.")
 
         # Add connection timeout and server selection timeout
-        self.client = MongoClient(
+        return MongoClient(
             self.uri,
             serverSelectionTimeoutMS=10000,  # 10 seconds timeout
             connectTimeoutMS=10000,          # 10 seconds connection timeout
@@ -54,20 +83,6 @@ class MongoManager:
             retryWrites=True,                # Enable retry for writes
             retryReads=True                  # Enable retry for reads
         )
-        self.db = self.client[self.db_name]
-        self.participants: Collection = self.db["participants"]
-        self.teams: Collection = self.db["teams"]
-        self.meta: Collection = self.db["meta"]
-
-        # Test connection
-        try:
-            self.client.admin.command('ping')
-            print("[DB] Kết nối MongoDB thành công")
-        except Exception as e:
-            print(f"[DB] Lỗi kết nối MongoDB: {e}")
-            raise
-
-        self._ensure_indexes()
 
     def is_healthy(self) -> bool:
         """Check if MongoDB connection is healthy"""
@@ -142,7 +157,18 @@ class MongoManager:
         if not mssv:
             raise ValueError("Thiếu MSSV")
 
-        doc = {
+        doc = self._participant_doc(mssv, data)
+
+        # Preserve existing discord_id if present
+        existing = self.participants.find_one({"mssv": mssv}, {"discord_id": 1})
+        if existing and existing.get("discord_id"):
+            doc["discord_id"] = existing["discord_id"]
+
+        self.participants.update_one({"mssv": mssv}, {"$set": doc}, upsert=True)
+        return self.participants.find_one({"mssv": mssv}) or doc
+
+    def _participant_doc(self, mssv: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "mssv": mssv,
             "full_name": (data.get("full_name") or "").strip(),
             "email": (data.get("email") or "").strip() or None,
@@ -155,70 +181,226 @@ class MongoManager:
             "updated_at": datetime.now(timezone.utc),
         }
 
-        # Preserve existing discord_id if present
-        existing = self.participants.find_one({"mssv": mssv}, {"discord_id": 1})
-        if existing and existing.get("discord_id"):
-            doc["discord_id"] = existing["discord_id"]
-
-        self.participants.update_one({"mssv": mssv}, {"$set": doc}, upsert=True)
-        return self.participants.find_one({"mssv": mssv}) or doc
-
     def assign_discord_by_mssv(self, mssv: str, discord_id: int) -> Tuple[str, str]:
         """Assign discord_id to a participant by MSSV.
 
         Returns (status, message) where status in {ok, not_found, already_assigned, already_linked, discord_already_used}.
+
+        One conditional find_one_and_update claims the MSSV only if it is free
+        (or already ours); the unique discord_id index rejects a Discord ID
+        linked elsewhere. Extra reads only happen on the failure paths.
         """
         mssv = self._norm_mssv(mssv)
-        user = self.participants.find_one({"mssv": mssv})
-        if not user:
-            return ("not_found", f"Không tìm thấy MSSV {mssv} trong hệ thống.")
-
-        # Check if this Discord ID is already used by another MSSV
-        existing_discord_user = self.participants.find_one({"discord_id": int(discord_id)})
-        if existing_discord_user and existing_discord_user.get("mssv") != mssv:
+        discord_id = int(discord_id)
+        try:
+            before = self.participants.find_one_and_update(
+                {"mssv": mssv, "discord_id": {"$in": [None, discord_id]}},
+                {"$set": {"discord_id": discord_id, "updated_at": datetime.now(timezone.utc)}},
+                projection={"discord_id": 1},
+                return_document=ReturnDocument.BEFORE,
+            )
+        except DuplicateKeyError:
+            return self._discord_already_used(discord_id)
+        except Exception as e:
+            return ("error", f"Lỗi khi gán Discord ID: {e}")
+
+        if before is None:
+            # Either the MSSV does not exist or it belongs to another Discord account
+            if not self.participants.find_one({"mssv": mssv}, {"_id": 1}):
+                return ("not_found", f"Không tìm thấy MSSV {mssv} trong hệ thống.")
+            # A caller already linked elsewhere hears about their own link first
+            other = self.participants.find_one({"discord_id": discord_id}, {"mssv": 1, "full_name": 1})
+            if other:
+                return self._discord_already_used(discord_id, other)
             return (
-                "discord_already_used", 
-                f"Discord ID của bạn đã được sử dụng bởi MSSV {existing_discord_user.get('mssv')} ({existing_discord_user.get('full_name', 'Không có tên')})."
+                "already_assigned",
+                f"MSSV {mssv} đã được liên kết với tài khoản Discord khác.",
             )
 
-        current = user.get("discord_id")
-        if current is None:
-            try:
-                self.participants.update_one(
-                    {"mssv": mssv},
-                    {"$set": {"discord_id": int(discord_id), "updated_at": datetime.now(timezone.utc)}},
-                )
-                return ("ok", f"Đã gán Discord cho MSSV {mssv}.")
-            except Exception as e:
-                if "E11000" in str(e):  # Duplicate key error
-                    return (
-                        "discord_already_used", 
-                        f"Discord ID của bạn đã được sử dụng bởi MSSV khác. Vui lòng liên hệ admin để được hỗ trợ."
-                    )
-                return ("error", f"Lỗi khi gán Discord ID: {e}")
-
-        if int(current) == int(discord_id):
+        if before.get("discord_id") is not None:
             return ("already_linked", f"MSSV {mssv} đã liên kết với Discord của bạn.")
+        return ("ok", f"Đã gán Discord cho MSSV {mssv}.")
 
+    def _discord_already_used(self, discord_id: int, other: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        other = other or self.participants.find_one({"discord_id": discord_id}, {"mssv": 1, "full_name": 1})
+        if other:
+            return (
+                "discord_already_used",
+                f"Discord ID của bạn đã được sử dụng bởi MSSV {other.get('mssv')} ({other.get('full_name', 'Không có tên')}).",
+            )
         return (
-            "already_assigned",
-            f"MSSV {mssv} đã được liên kết với tài khoản Discord khác.",
+            "discord_already_used",
+            "Discord ID của bạn đã được sử dụng bởi MSSV khác. Vui lòng liên hệ admin để được hỗ trợ.",
         )
 
+    def _in_transaction(self, fn):
+        """Run fn(session) in a transaction, or fn(None) where transactions are unavailable."""
+        if self.client is None:
+            # Offline snapshot: no server to hold a transaction
+            return fn(None)
+        try:
+            session = self.client.start_session()
+        except (ConfigurationError, NotImplementedError):
+            return fn(None)
+        try:
+            with session:
+                return session.with_transaction(fn)
+        except OperationFailure as e:
+            if e.code not in _NO_TRANSACTION_CODES:
+                raise
+        # Standalone server: no rollback, but each step is still conditional
+        return fn(None)
+
+    def relink_discord_by_mssv(self, mssv: str, discord_id: int) -> Tuple[str, Dict[str, Any]]:
+        """Admin relink: point `mssv` at `discord_id`, taking the ID away from any other MSSV.
+
+        Returns (status, info) where status in {ok, not_found, already_linked}
+        and info has `participant` (document before the change),
+        `previous_discord_id` (unlinked from this MSSV) and `previous_mssv`
+        (the MSSV that lost this Discord ID). A plain relink is one round trip;
+        a swap between two participants runs in a transaction.
+        """
+        mssv = self._norm_mssv(mssv)
+        discord_id = int(discord_id)
+        info: Dict[str, Any] = {"participant": None, "previous_discord_id": None, "previous_mssv": None}
+        update = {"$set": {"discord_id": discord_id, "updated_at": datetime.now(timezone.utc)}}
+
+        try:
+            before = self.participants.find_one_and_update(
+                {"mssv": mssv}, update, return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # The Discord ID belongs to another MSSV: move it in one transaction
+            def swap(session):
+                other = self.participants.find_one_and_update(
+                    {"discord_id": discord_id, "mssv": {"$ne": mssv}},
+                    {"$unset": {"discord_id": "", "updated_at": ""}},
+                    projection={"mssv": 1},
+                    session=session,
+                )
+                target = self.participants.find_one_and_update(
+                    {"mssv": mssv}, update, return_document=ReturnDocument.BEFORE, session=session
+                )
+                if target is None and session is not None:
+                    session.abort_transaction()
+                return other, target
+
+            other, before = self._in_transaction(swap)
+            if before is None:
+                return ("not_found", info)
+            info["previous_mssv"] = other.get("mssv") if other else None
+
+        if before is None:
+            return ("not_found", info)
+        info["participant"] = before
+        current = before.get("discord_id")
+        if current is not None and int(current) == discord_id:
+            return ("already_linked", info)
+        info["previous_discord_id"] = current
+        return ("ok", info)
+
     # ----- Teams -----
     def upsert_team(self, team_id: Optional[str], team_name: Optional[str]) -> Optional[Dict[str, Any]]:
         if not team_id and not team_name:
             return None
+        key, payload = self._team_key_payload(team_id, team_name)
+        self.teams.update_one(key, {"$set": payload}, upsert=True)
+        return self.teams.find_one(key)
+
+    @staticmethod
+    def _team_key_payload(team_id: Optional[str], team_name: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         payload = {
             "team_id": (str(team_id).strip() if team_id not in (None, "") else None),
             "team_name": (team_name or "").strip() or None,
             "updated_at": datetime.now(timezone.utc),
         }
         key = {"team_id": payload["team_id"]} if payload["team_id"] else {"team_name": payload["team_name"]}
-        self.teams.update_one(key, {"$set": payload}, upsert=True)
-        return self.teams.find_one(key)
+        return key, payload
 
     # ----- Bulk sync from rows -----
+    def bulk_sync_rows(self, rows: list[Dict[str, Any]], ordered: bool = False) -> Dict[str, Any]:
+        """Upsert one batch of sheet rows with one bulk_write per collection.
+
+        `$set` never touches `discord_id`, so existing links are preserved
+        without reading the participant first.
+        """
+        docs: Dict[str, Dict[str, Any]] = {}
+        teams: Dict[Tuple, Tuple[Dict[str, Any], Dict[str, Any], list]] = {}
+        errors = 0
+        for r in rows:
+            try:
+                mssv = self._norm_mssv(r.get("mssv") or "")
+                if not mssv:
+                    continue
+                docs[mssv] = self._participant_doc(mssv, r)
+                team_id, team_name = r.get("team_id"), r.get("team_name")
+                if team_id or team_name:
+                    key, payload = self._team_key_payload(team_id, team_name)
+                    entry = teams.setdefault(tuple(key.items()), (key, payload, []))
+                    entry[2].append(mssv)
+            except Exception as e:
+                errors += 1
+                print(f"[SYNC ERROR] MSSV {r.get('mssv')}: {e}")
+
+        if not docs:
+            return {"created": 0, "updated": 0, "errors": errors}
+
+        created = updated = 0
+        ops = [UpdateOne({"mssv": m}, {"$set": d}, upsert=True) for m, d in docs.items()]
+        try:
+            res = self.participants.bulk_write(ops, ordered=ordered)
+            created, updated = res.upserted_count, res.matched_count
+        except BulkWriteError as e:
+            details = e.details or {}
+            created, updated = details.get("nUpserted", 0), details.get("nMatched", 0)
+            errors += len(details.get("writeErrors", []))
+            print(f"[SYNC ERROR] bulk participants: {len(details.get('writeErrors', []))} lỗi")
+
+        team_ops = [
+            UpdateOne(key, {"$set": payload, "$addToSet": {"members_mssv": {"$each": members}}}, upsert=True)
+            for key, payload, members in teams.values()
+        ]
+        if team_ops:
+            try:
+                self.teams.bulk_write(team_ops, ordered=ordered)
+            except BulkWriteError as e:
+                errors += len((e.details or {}).get("writeErrors", []))
+                print(f"[SYNC ERROR] bulk teams: {e}")
+
+        return {"created": created, "updated": updated, "errors": errors}
+
+    async def sync_from_row_stream(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        batch_size: int = 500,
+        before_batch: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """Sync an iterable of rows in `batch_size` bulk writes off the event loop.
+
+        Only one batch is materialized at a time. `before_batch` is awaited
+        before every write; raising from it aborts the sync (e.g. a lost lease).
+        """
+        import asyncio
+
+        totals = {"created": 0, "updated": 0, "errors": 0}
+        batch: list[Dict[str, Any]] = []
+
+        async def flush():
+            if before_batch is not None:
+                await before_batch()
+            result = await asyncio.to_thread(self.bulk_sync_rows, batch)
+            for k in totals:
+                totals[k] += result.get(k, 0)
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await flush()
+                batch = []
+        if batch:
+            await flush()
+        return totals
+
     async def sync_from_rows_async(self, rows: list[Dict[str, Any]]) -> Dict[str, Any]:
         """Sync many rows from a sheet-exported dataset asynchronously.
 
@@ -340,3 +522,22 @@ class MongoManager:
 
     def set_meta(self, key: str, value: Any) -> None:
         self.meta.update_one({"key": key}, {"$set": {"key": key, "value": value}}, upsert=True)
+
+    def get_meta_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Read several meta keys in one round trip; missing keys are omitted."""
+        return {doc["key"]: doc.get("value") for doc in self.meta.find({"key": {"$in": list(keys)}})}
+
+    def update_meta(self, values: Dict[str, Any]) -> None:
+        """Set several meta keys in one bulk write."""
+        if not values:
+            return
+        ops = [UpdateOne({"key": k}, {"$set": {"key": k, "value": v}}, upsert=True) for k, v in values.items()]
+        self.meta.bulk_write(ops, ordered=False)
+
+    def push_meta_history(self, key: str, entry: Dict[str, Any], limit: int = 50) -> None:
+        """Append to a capped list stored under a meta key (keeps the newest `limit`)."""
+        self.meta.update_one(
+            {"key": key},
+            {"$push": {"value": {"$each": [entry], "$slice": -limit}}},
+            upsert=True,
+        )
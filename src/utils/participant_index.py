@@ -0,0 +1,329 @@
+"""
+Compact in-memory index of participants for lookups without MongoDB
+"""
+from __future__ import annotations
+
+import sys
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional
+
+# Fields kept per participant (everything /check displays)
+RECORD_FIELDS = (
+    "mssv", "full_name", "email", "phone", "school", "faculty", "facebook",
+    "team_id", "team_name", "discord_id", "updated_at",
+)
+# Low-cardinality fields shared by many participants: one string object each
+_INTERNED = frozenset({"school", "faculty", "team_id", "team_name"})
+
+
+def fold_text(text: Optional[str]) -> str:
+    """Lowercase, strip Vietnamese accents (đ -> d) and collapse whitespace."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def team_role_name(team_name: str) -> str:
+    """Role name `!addallrole` creates for a team: alphanumerics, space, '-' and '_', max 32 chars."""
+    return "".join(c for c in team_name if c.isalnum() or c in " -_").strip()[:32]
+
+
+def team_channel_name(team_name: str) -> str:
+    """Text/voice channel name `!addallrole` creates for a team."""
+    return team_role_name(team_name).lower().replace(" ", "-")
+
+
+def format_suggestions(records: List["ParticipantRecord"]) -> str:
+    """'Có phải bạn muốn tìm' block appended to not-found replies (empty when nothing is close)."""
+    if not records:
+        return ""
+    lines = [f"• `{r.mssv}` {r.full_name or ''}".rstrip() for r in records]
+    return "\n💡 **Có phải bạn muốn tìm:**\n" + "\n".join(lines)
+
+
+class ParticipantRecord:
+    """One participant; `__slots__` keeps it to a fixed-size object (no per-instance dict).
+
+    `get()` mirrors `dict.get` so records can stand in for Mongo documents.
+    """
+
+    __slots__ = RECORD_FIELDS + ("name_key",)
+
+    def __init__(self, doc: Dict[str, Any]):
+        for field in RECORD_FIELDS:
+            value = doc.get(field)
+            if field == "discord_id" and value is not None:
+                value = int(value)
+            elif isinstance(value, str):
+                value = value.strip() or None
+                if value and field in _INTERNED:
+                    value = sys.intern(value)
+            setattr(self, field, value)
+        self.mssv = sys.intern(str(doc.get("mssv") or "").strip())
+        self.name_key = fold_text(self.full_name)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        value = getattr(self, field, None) if field in RECORD_FIELDS else None
+        return default if value is None else value
+
+    def __repr__(self) -> str:
+        return f"ParticipantRecord({self.mssv!r}, {self.full_name!r})"
+
+
+class TeamEntry:
+    """A team as seen in the participant data, with its Discord role/channel names precomputed."""
+
+    __slots__ = ("team_id", "team_name", "role_name", "channel_name", "name_key", "members")
+
+    def __init__(self, team_id: Optional[str], team_name: str):
+        self.team_id = team_id
+        self.team_name = team_name
+        self.role_name = team_role_name(team_name)
+        self.channel_name = team_channel_name(team_name)
+        self.name_key = fold_text(team_name)
+        self.members = 0
+
+    def __repr__(self) -> str:
+        return f"TeamEntry({self.team_id!r}, {self.team_name!r}, members={self.members})"
+
+
+class ParticipantIndex:
+    """Exact, prefix, typo-tolerant (edit distance 1) and accent-insensitive name lookups.
+
+    - exact MSSV / Discord ID: dict, O(1)
+    - MSSV prefix: bisect over the sorted MSSV list
+    - suggestions: every Damerau distance-1 variant of the query is probed in
+      the dict (~11 * len probes), so no extra memory is spent on typo tables
+    - name search: substring match over pre-folded names
+    - teams: grouped by team_id, with prefix search over folded team names
+
+    The sorted views are rebuilt lazily after `add()`, so a freshly loaded
+    index pays for them on the first prefix/autocomplete query only.
+    """
+
+    def __init__(self, docs: Iterable[Dict[str, Any]] = ()):
+        self._by_mssv: Dict[str, ParticipantRecord] = {}
+        self._by_discord: Dict[int, ParticipantRecord] = {}
+        self._teams: Dict[str, TeamEntry] = {}
+        self._sorted: Optional[List[str]] = None
+        self._alphabet: Optional[str] = None
+        self._team_keys: Optional[List[tuple]] = None
+        for doc in docs:
+            self.add(doc)
+
+    # ----- Maintenance -----
+    def add(self, doc: Dict[str, Any]) -> Optional[ParticipantRecord]:
+        rec = ParticipantRecord(doc)
+        if not rec.mssv:
+            return None
+        old = self._by_mssv.get(rec.mssv)
+        if old is not None and old.discord_id is not None:
+            self._by_discord.pop(old.discord_id, None)
+        if old is not None:
+            self._drop_from_team(old)
+        self._by_mssv[rec.mssv] = rec
+        if rec.discord_id is not None:
+            self._by_discord[rec.discord_id] = rec
+        if rec.team_name or rec.team_id:
+            key = rec.team_id or rec.team_name
+            team = self._teams.get(key)
+            if team is None:
+                team = self._teams[key] = TeamEntry(rec.team_id, rec.team_name or f"Team {rec.team_id}")
+                self._team_keys = None
+            team.members += 1
+        self._sorted = None
+        self._alphabet = None
+        return rec
+
+    def _drop_from_team(self, rec: ParticipantRecord) -> None:
+        team = self._teams.get(rec.team_id or rec.team_name or "")
+        if team is None:
+            return
+        team.members -= 1
+        if team.members <= 0:
+            del self._teams[rec.team_id or rec.team_name]
+            self._team_keys = None
+
+    def link(self, mssv: str, discord_id: int) -> None:
+        rec = self._by_mssv.get(mssv)
+        if rec is None:
+            return
+        if rec.discord_id is not None and self._by_discord.get(rec.discord_id) is rec:
+            del self._by_discord[rec.discord_id]
+        rec.discord_id = int(discord_id)
+        self._by_discord[rec.discord_id] = rec
+
+    def unlink(self, mssv: str) -> None:
+        rec = self._by_mssv.get(mssv)
+        if rec is None or rec.discord_id is None:
+            return
+        if self._by_discord.get(rec.discord_id) is rec:
+            del self._by_discord[rec.discord_id]
+        rec.discord_id = None
+
+    def __len__(self) -> int:
+        return len(self._by_mssv)
+
+    def __iter__(self):
+        return iter(self._by_mssv.values())
+
+    # ----- Lookups -----
+    def get(self, mssv: str) -> Optional[ParticipantRecord]:
+        return self._by_mssv.get(str(mssv).strip())
+
+    def by_discord(self, discord_id: int) -> Optional[ParticipantRecord]:
+        return self._by_discord.get(int(discord_id))
+
+    def discord_ids(self) -> List[int]:
+        return list(self._by_discord)
+
+    def _sorted_mssv(self) -> List[str]:
+        if self._sorted is None:
+            self._sorted = sorted(self._by_mssv)
+        return self._sorted
+
+    def prefix(self, prefix: str, limit: int = 25) -> List[ParticipantRecord]:
+        keys = self._sorted_mssv()
+        prefix = prefix.strip()
+        out: List[ParticipantRecord] = []
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix) or len(out) >= limit:
+                break
+            out.append(self._by_mssv[keys[i]])
+        return out
+
+    def suggest(self, mssv: str, limit: int = 5) -> List[ParticipantRecord]:
+        """MSSVs one typo away: substitution, insertion, deletion or adjacent swap."""
+        q = str(mssv).strip()
+        if not q:
+            return []
+        if self._alphabet is None:
+            self._alphabet = "".join(sorted({ch for key in self._by_mssv for ch in key}))
+        seen: Dict[str, None] = {}
+
+        def probe(candidate: str):
+            if candidate != q and candidate in self._by_mssv:
+                seen.setdefault(candidate, None)
+
+        for i in range(len(q) + 1):
+            head, tail = q[:i], q[i:]
+            if tail:
+                probe(head + tail[1:])  # deletion
+                if len(tail) > 1:
+                    probe(head + tail[1] + tail[0] + tail[2:])  # adjacent swap
+            for ch in self._alphabet:
+                probe(head + ch + tail)  # insertion
+                if tail:
+                    probe(head + ch + tail[1:])  # substitution
+            if len(seen) >= limit:
+                break
+        return [self._by_mssv[k] for k in list(seen)[:limit]]
+
+    def search_name(self, query: str, limit: int = 25) -> List[ParticipantRecord]:
+        """Accent-insensitive substring search on full_name ('nguyen van' finds 'Nguyễn Văn ...')."""
+        q = fold_text(query)
+        if not q:
+            return []
+        out: List[ParticipantRecord] = []
+        for rec in self._by_mssv.values():
+            if q in rec.name_key:
+                out.append(rec)
+                if len(out) >= limit:
+                    break
+        return out
+
+    def lookup(self, query: str, limit: int = 5) -> List[ParticipantRecord]:
+        """Best-effort candidates for a query that is not an exact MSSV."""
+        query = str(query).strip()
+        if not any(ch.isdigit() for ch in query):
+            return self.search_name(query, limit)
+        found = self.suggest(query, limit)
+        for rec in self.prefix(query, limit):
+            if len(found) >= limit:
+                break
+            if rec not in found:
+                found.append(rec)
+        return found
+
+    # ----- Teams -----
+    def teams(self) -> List[TeamEntry]:
+        return list(self._teams.values())
+
+    def _sorted_teams(self) -> List[tuple]:
+        if self._team_keys is None:
+            self._team_keys = sorted((t.name_key, t.team_name, key) for key, t in self._teams.items())
+        return self._team_keys
+
+    def team(self, name: str) -> Optional[TeamEntry]:
+        """Resolve a team from its ID, exact name, role name or accent-insensitive name."""
+        name = str(name).strip()
+        if name in self._teams:
+            return self._teams[name]
+        key = fold_text(name)
+        for team in self._teams.values():
+            if team.team_name == name or team.role_name == name or team.name_key == key:
+                return team
+        return None
+
+    def team_records(self, team: TeamEntry) -> List[ParticipantRecord]:
+        """Participants of a team (linear scan; admin checks only)."""
+        key = team.team_id or team.team_name
+        return [r for r in self._by_mssv.values() if (r.team_id or r.team_name) == key]
+
+    def search_teams(self, query: str, limit: int = 25) -> List[TeamEntry]:
+        """Teams whose folded name starts with the query, then those merely containing it."""
+        q = fold_text(query)
+        keys = self._sorted_teams()
+        out: List[TeamEntry] = []
+        for i in range(bisect_left(keys, (q,)), len(keys)):
+            if not keys[i][0].startswith(q) or len(out) >= limit:
+                break
+            out.append(self._teams[keys[i][2]])
+        if len(out) < limit and q:
+            for name_key, _, key in keys:
+                if q in name_key and not name_key.startswith(q):
+                    out.append(self._teams[key])
+                    if len(out) >= limit:
+                        break
+        return out
+
+    # ----- Autocomplete -----
+    def complete_mssv(self, current: str, limit: int = 25) -> List[ParticipantRecord]:
+        """Candidates while typing an MSSV: prefix matches, else typo or name matches."""
+        current = str(current).strip()
+        if not current:
+            return self.prefix("", limit)
+        found = self.prefix(current, limit)
+        if not found:
+            found = self.lookup(current, limit)
+        return found
+
+    # ----- Diagnostics -----
+    def memory_report(self) -> Dict[str, Any]:
+        """Approximate bytes held: records, distinct strings/values and containers."""
+        seen: set = set()
+        values_bytes = 0
+        for rec in self._by_mssv.values():
+            for field in ParticipantRecord.__slots__:
+                value = getattr(rec, field)
+                if value is None or id(value) in seen:
+                    continue
+                seen.add(id(value))
+                values_bytes += sys.getsizeof(value)
+        records = len(self._by_mssv)
+        record_bytes = records * sys.getsizeof(next(iter(self._by_mssv.values()))) if records else 0
+        container_bytes = sys.getsizeof(self._by_mssv) + sys.getsizeof(self._by_discord)
+        if self._sorted is not None:
+            container_bytes += sys.getsizeof(self._sorted)
+        total = record_bytes + values_bytes + container_bytes
+        return {
+            "records": records,
+            "record_bytes": record_bytes,
+            "value_bytes": values_bytes,
+            "container_bytes": container_bytes,
+            "total_bytes": total,
+            "bytes_per_record": round(total / records) if records else 0,
+        }
@@ -0,0 +1,155 @@
+"""
+One status message per command: later updates edit it, rapid updates are coalesced
+"""
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+import discord
+from discord.utils import MISSING
+
+# command name -> [invocations, Discord API calls]
+_api_calls: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+
+T = TypeVar("T")
+
+
+def api_call_stats() -> Dict[str, Dict[str, float]]:
+    """REST calls made through Responders, per command (busiest first)."""
+    stats = {
+        name: {"invocations": uses, "calls": calls, "per_invocation": round(calls / uses, 2) if uses else 0.0}
+        for name, (uses, calls) in _api_calls.items()
+    }
+    return dict(sorted(stats.items(), key=lambda item: item[1]["calls"], reverse=True))
+
+
+class Responder:
+    """Replies for one command (prefix or slash) or one long-lived status.
+
+    The first reply creates the message; every later one edits it, so a
+    "searching -> added" sequence costs one send and one edit instead of
+    separate messages. `update()` is for intermediate states: an edit that
+    comes less than COALESCE_SECONDS after the previous call waits, and only
+    the newest content is sent. `send()` is for the final state and goes out
+    at once, dropping any update still waiting.
+    """
+
+    COALESCE_SECONDS = 1.0
+    # Work still running this long into a slash command gets deferred (Discord allows 3 s)
+    DEFER_AFTER = 2.0
+
+    def __init__(self, command: str, *, ctx=None, interaction: Optional[discord.Interaction] = None,
+                 channel: Optional[discord.abc.Messageable] = None, ephemeral: bool = False):
+        self.command = command
+        self.ctx = ctx
+        self.interaction = interaction
+        self.ephemeral = ephemeral  # slash replies only visible to the user
+        self.channel = channel if channel is not None else (ctx.channel if ctx is not None else interaction.channel)
+        self.message: Optional[discord.Message] = None
+        self._shown = False  # message created (or interaction answered)
+        self._last_call = 0.0
+        self._pending: Optional[Dict[str, Any]] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        _api_calls[command][0] += 1
+
+    @classmethod
+    def for_context(cls, ctx) -> "Responder":
+        return cls(ctx.command.qualified_name if ctx.command else "?", ctx=ctx)
+
+    @classmethod
+    def for_interaction(cls, interaction: discord.Interaction, ephemeral: bool = False) -> "Responder":
+        name = interaction.command.qualified_name if interaction.command else "?"
+        return cls(f"/{name}", interaction=interaction, ephemeral=ephemeral)
+
+    @classmethod
+    def for_channel(cls, channel: discord.abc.Messageable, name: str) -> "Responder":
+        return cls(name, channel=channel)
+
+    def is_latest(self) -> bool:
+        """Whether our message is still the newest in the channel (gateway cache, no API call)."""
+        return self.message is not None and getattr(self.channel, "last_message_id", None) == self.message.id
+
+    # ----- Public -----
+    async def update(self, content: Any = MISSING, *, embed: Any = MISSING, view: Any = MISSING) -> None:
+        """Show an intermediate state; edits closer together than COALESCE_SECONDS are merged."""
+        changes = self._changes(content, embed, view)
+        if self._pending is not None:
+            self._pending.update(changes)
+            return
+        wait = self._last_call + self.COALESCE_SECONDS - time.monotonic() if self._shown else 0.0
+        if wait <= 0 and not self._lock.locked():
+            async with self._lock:
+                await self._apply(changes)
+            return
+        self._pending = changes
+        self._flush_task = asyncio.create_task(self._flush_later(max(0.0, wait)))
+
+    async def defer(self) -> None:
+        """Acknowledge a slash command that needs more than 3 s before its first reply."""
+        if self.interaction is not None and not self.interaction.response.is_done():
+            _api_calls[self.command][1] += 1
+            await self.interaction.response.defer(ephemeral=self.ephemeral)
+            self._shown = True
+
+    async def in_time(self, aw: Awaitable[T]) -> T:
+        """Await `aw`; a slash command still waiting after DEFER_AFTER is deferred meanwhile."""
+        task = asyncio.ensure_future(aw)
+        if self.interaction is not None:
+            done, _ = await asyncio.wait({task}, timeout=self.DEFER_AFTER)
+            if not done:
+                await self.defer()
+        return await task
+
+    async def send(self, content: Any = MISSING, *, embed: Any = MISSING, view: Any = MISSING) -> Optional[discord.Message]:
+        """Show the final state now (pending updates are merged into it)."""
+        changes = self._changes(content, embed, view)
+        if self._pending is not None:
+            changes = {**self._pending, **changes}
+            self._pending = None
+        if self._flush_task is not None and not self._lock.locked():
+            self._flush_task.cancel()
+        self._flush_task = None
+        async with self._lock:
+            await self._apply(changes)
+        return self.message
+
+    # ----- Internals -----
+    @staticmethod
+    def _changes(content, embed, view) -> Dict[str, Any]:
+        return {key: value for key, value in (("content", content), ("embed", embed), ("view", view)) if value is not MISSING}
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        async with self._lock:
+            changes, self._pending = self._pending, None
+            if changes is None:
+                return
+            try:
+                await self._apply(changes)
+            except discord.HTTPException as e:
+                print(f"[RESPONDER] {self.command}: {e}")
+
+    async def _apply(self, changes: Dict[str, Any]) -> None:
+        _api_calls[self.command][1] += 1
+        self._last_call = time.monotonic()
+        if self.interaction is not None:
+            if self.interaction.response.is_done():  # deferred or answered: one message to edit
+                self.message = await self.interaction.edit_original_response(**changes)
+            else:
+                callback = await self.interaction.response.send_message(**self._creating(changes), ephemeral=self.ephemeral)
+                resource = getattr(callback, "resource", None)
+                if isinstance(resource, discord.Message):
+                    self.message = resource
+        elif not self._shown:
+            send = self.ctx.send if self.ctx is not None else self.channel.send
+            self.message = await send(**self._creating(changes))
+        else:
+            await self.message.edit(**changes)
+        self._shown = True
+
+    @staticmethod
+    def _creating(changes: Dict[str, Any]) -> Dict[str, Any]:
+        # None means "absent" when creating; there is nothing to clear yet
+        return {key: value for key, value in changes.items() if value is not None}
@@ -3,17 +3,30 @@ Google Sheets fetching utilities
 """
 from __future__ import annotations
 
+import codecs
 import hashlib
 import json
-from typing import Dict, List, Tuple
+import re
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 import aiohttp
 
+from .http_client import HttpClient, using_client
+
+
+SHEETS_API_BASE = "https://sheets.googleapis.com/v4"
+DRIVE_API_BASE = "https://www.googleapis.com/drive/v3"
+
+# Google only gzips responses when the User-Agent also mentions gzip
+GZIP_HEADERS = {"Accept-Encoding": "gzip", "User-Agent": "VnuTourBot (gzip)"}
+
 
 HEADER_MAP = {
     "STT": "stt",
     "Tên đội": "team_name",
-    "ID đội": "team_id",
+    "ID đội": "team_id",
     "MSSV": "mssv",
     "Họ và tên": "full_name",
     "Link Facebook": "facebook",
@@ -23,11 +36,27 @@ HEADER_MAP = {
     "Số điện thoại": "phone",
 }
 
+# Field order of the compact row tuples produced by RowMapper
+ROW_FIELDS: Tuple[str, ...] = tuple(dict.fromkeys(HEADER_MAP.values()))
+MSSV_SLOT = ROW_FIELDS.index("mssv")
+
+SheetRow = Tuple[str, ...]
 
-async def fetch_sheet_values(api_key: str, sheet_id: str, range_name: str) -> Dict:
-    url = f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}/values/{range_name}?key={api_key}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, timeout=30) as resp:
+
+def _timeout(total: float, sock_read: Optional[float] = None) -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=total, sock_read=sock_read)
+
+
+async def fetch_sheet_values(
+    api_key: str,
+    sheet_id: str,
+    range_name: str,
+    base_url: str = SHEETS_API_BASE,
+    http: Optional[HttpClient] = None,
+) -> Dict:
+    url = f"{base_url}/spreadsheets/{sheet_id}/values/{range_name}?key={api_key}"
+    async with using_client(http) as client:
+        async with client.get(url, timeout=_timeout(30), headers=GZIP_HEADERS) as resp:
             resp.raise_for_status()
             return await resp.json()
 
@@ -48,16 +77,404 @@ def values_to_rows(values: List[List[str]]) -> List[Dict[str, str]]:
     return rows
 
 
+class SheetHasher:
+    """Incremental sha256 of the `values` payload.
+
+    Fed row by row, it yields the same digest as `compute_hash` on the full list.
+    """
+
+    def __init__(self):
+        self._sha = hashlib.sha256(b"[")
+        self._empty = True
+
+    def update(self, row: List[str]) -> None:
+        chunk = json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+        if not self._empty:
+            chunk = "," + chunk
+        self._empty = False
+        self._sha.update(chunk.encode("utf-8"))
+
+    def hexdigest(self) -> str:
+        sha = self._sha.copy()
+        sha.update(b"]")
+        return sha.hexdigest()
+
+
 def compute_hash(values: List[List[str]]) -> str:
     # Stable hash of the values payload
-    payload = json.dumps(values, ensure_ascii=False, separators=(",", ":"))
-    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    hasher = SheetHasher()
+    for row in values:
+        hasher.update(row)
+    return hasher.hexdigest()
 
 
-async def fetch_sheet_rows_and_hash(api_key: str, sheet_id: str, range_name: str) -> Tuple[List[Dict[str, str]], str]:
-    data = await fetch_sheet_values(api_key, sheet_id, range_name)
+async def fetch_sheet_rows_and_hash(
+    api_key: str, sheet_id: str, range_name: str, base_url: str = SHEETS_API_BASE, http: Optional[HttpClient] = None
+) -> Tuple[List[Dict[str, str]], str]:
+    data = await fetch_sheet_values(api_key, sheet_id, range_name, base_url, http)
     values = data.get("values", [])
     rows = values_to_rows(values)
     h = compute_hash(values)
     return rows, h
 
+
+# ----- Streaming ingestion -----
+class ValuesStreamParser:
+    """Incremental parser for a Sheets `values.get` response body.
+
+    Chunks are fed as they arrive; each complete row of the top-level
+    `values` array is returned as soon as it is parsed, so only the current
+    row (plus one network chunk) is held in memory.
+    """
+
+    _WS = " \t\r\n"
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._state = "object"
+        self._key: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[List[str]]:
+        self._buf = self._buf[self._pos:] + self._utf8.decode(chunk)
+        self._pos = 0
+        return self._drain(final=False)
+
+    def close(self) -> List[List[str]]:
+        self._buf = self._buf[self._pos:] + self._utf8.decode(b"", final=True)
+        self._pos = 0
+        rows = self._drain(final=True)
+        if self._state != "done":
+            raise ValueError("Phản hồi Google Sheet không hợp lệ (JSON bị cắt)")
+        return rows
+
+    def _skip(self, chars: str) -> Optional[str]:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in chars:
+            pos += 1
+        self._pos = pos
+        return buf[pos] if pos < len(buf) else None
+
+    def _decode(self, final: bool):
+        """Decode one JSON value at the cursor, or return (False, None) if incomplete."""
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return False, None
+        if end == len(self._buf) and not final and not isinstance(value, (list, dict, str)):
+            # A bare number/literal may continue in the next chunk
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _drain(self, final: bool) -> List[List[str]]:
+        rows: List[List[str]] = []
+        while self._state != "done":
+            if self._state == "object":
+                ch = self._skip(self._WS)
+                if ch is None:
+                    break
+                if ch != "{":
+                    raise ValueError("Phản hồi Google Sheet không phải JSON object")
+                self._pos += 1
+                self._state = "key"
+            elif self._state == "key":
+                ch = self._skip(self._WS + ",")
+                if ch is None:
+                    break
+                if ch == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                ok, key = self._decode(final)
+                if not ok:
+                    break
+                self._key = key
+                self._state = "colon"
+            elif self._state == "colon":
+                ch = self._skip(self._WS)
+                if ch is None:
+                    break
+                if ch != ":":
+                    raise ValueError("Phản hồi Google Sheet không hợp lệ")
+                self._pos += 1
+                self._state = "value"
+            elif self._state == "value":
+                ch = self._skip(self._WS)
+                if ch is None:
+                    break
+                if self._key == "values" and ch == "[":
+                    self._pos += 1
+                    self._state = "rows"
+                    continue
+                ok, _ = self._decode(final)
+                if not ok:
+                    break
+                self._state = "key"
+            elif self._state == "rows":
+                ch = self._skip(self._WS + ",")
+                if ch is None:
+                    break
+                if ch == "]":
+                    self._pos += 1
+                    self._state = "key"
+                    continue
+                ok, row = self._decode(final)
+                if not ok:
+                    break
+                rows.append(row)
+        return rows
+
+
+@dataclass
+class FetchStats:
+    """What one sync cycle cost on the wire."""
+    requests: int = 0
+    bytes: int = 0
+    full_fetch_avoided: bool = False
+    revision: Optional[str] = None
+    windows_total: int = 0
+    windows_changed: int = 0
+
+    def add_response(self, resp: aiohttp.ClientResponse, body_len: int) -> None:
+        # Content-Length is the compressed size when the body was gzipped
+        self.requests += 1
+        try:
+            self.bytes += int(resp.headers.get("Content-Length") or body_len)
+        except ValueError:
+            self.bytes += body_len
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+async def iter_sheet_values(
+    api_key: str,
+    sheet_id: str,
+    range_name: str,
+    base_url: str = SHEETS_API_BASE,
+    chunk_size: int = 64 * 1024,
+    stats: Optional[FetchStats] = None,
+    http: Optional[HttpClient] = None,
+) -> AsyncIterator[List[str]]:
+    """Yield the raw rows (header first) of a sheet range while it downloads."""
+    url = f"{base_url}/spreadsheets/{sheet_id}/values/{range_name}?key={api_key}"
+    parser = ValuesStreamParser()
+    received = 0
+    async with using_client(http) as client:
+        async with client.get(url, timeout=_timeout(120, sock_read=30), headers=GZIP_HEADERS) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                received += len(chunk)
+                for row in parser.feed(chunk):
+                    yield row
+            if stats is not None:
+                stats.add_response(resp, received)
+    for row in parser.close():
+        yield row
+
+
+# ----- Change detection -----
+async def fetch_sheet_revision(
+    api_key: str,
+    sheet_id: str,
+    base_url: str = DRIVE_API_BASE,
+    stats: Optional[FetchStats] = None,
+    http: Optional[HttpClient] = None,
+) -> Optional[str]:
+    """Cheap revision marker of the spreadsheet from Drive file metadata.
+
+    Returns None when it cannot be read (Drive API not enabled for the key,
+    private file, ...), in which case callers must fall back to fetching.
+    """
+    url = f"{base_url}/files/{sheet_id}"
+    params = {"fields": "version,modifiedTime", "key": api_key, "supportsAllDrives": "true"}
+    try:
+        async with using_client(http) as client:
+            async with client.get(url, params=params, timeout=_timeout(10), headers=GZIP_HEADERS) as resp:
+                body = await resp.read()
+                if stats is not None:
+                    stats.add_response(resp, len(body))
+                if resp.status != 200:
+                    return None
+                data = json.loads(body)
+    except Exception as e:
+        print(f"[SHEET SYNC] Không đọc được revision: {e}")
+        return None
+    return str(data.get("version") or data.get("modifiedTime") or "") or None
+
+
+_A1_RE = re.compile(r"^(?:(?P<sheet>.+)!)?(?P<c1>[A-Za-z]+)(?P<r1>\d*)(?::(?P<c2>[A-Za-z]+)(?P<r2>\d*))?$")
+
+
+def split_a1_range(range_name: str) -> Tuple[str, str, int, str, Optional[int]]:
+    """Split e.g. `Sheet1!A1:K` into (`Sheet1!`, `A`, 1, `K`, None)."""
+    m = _A1_RE.match(range_name.strip())
+    if not m:
+        raise ValueError(f"Range không hợp lệ: {range_name}")
+    prefix = f"{m.group('sheet')}!" if m.group("sheet") else ""
+    c1 = m.group("c1").upper()
+    c2 = (m.group("c2") or c1).upper()
+    r2 = int(m.group("r2")) if m.group("r2") else None
+    return prefix, c1, int(m.group("r1") or 1), c2, r2
+
+
+async def fetch_grid_rows(
+    api_key: str,
+    sheet_id: str,
+    sheet_title: str = "",
+    base_url: str = SHEETS_API_BASE,
+    stats: Optional[FetchStats] = None,
+    http: Optional[HttpClient] = None,
+) -> int:
+    """Row count of a tab's grid (the first tab when no title is given)."""
+    url = f"{base_url}/spreadsheets/{sheet_id}"
+    params = {"key": api_key, "fields": "sheets.properties(title,gridProperties.rowCount)"}
+    async with using_client(http) as client:
+        async with client.get(url, params=params, timeout=_timeout(10), headers=GZIP_HEADERS) as resp:
+            resp.raise_for_status()
+            body = await resp.read()
+            if stats is not None:
+                stats.add_response(resp, len(body))
+    sheets = [s.get("properties") or {} for s in json.loads(body).get("sheets", [])]
+    if not sheets:
+        raise ValueError("Google Sheet không có trang tính nào")
+    props = next((p for p in sheets if p.get("title") == sheet_title), sheets[0]) if sheet_title else sheets[0]
+    return int((props.get("gridProperties") or {}).get("rowCount") or 0)
+
+
+async def iter_value_windows(
+    api_key: str,
+    sheet_id: str,
+    range_name: str,
+    window_rows: int = 500,
+    windows_per_request: int = 10,
+    base_url: str = SHEETS_API_BASE,
+    stats: Optional[FetchStats] = None,
+    http: Optional[HttpClient] = None,
+) -> AsyncIterator[Tuple[int, List[List[str]]]]:
+    """Yield (index, rows) windows of a range via `values:batchGet`.
+
+    Window 0 is the header row; window i >= 1 covers `window_rows` data rows.
+    The API rejects ranges past the grid, so an open-ended range is first
+    bounded by the tab's row count; blank windows inside the grid are
+    yielded empty. Memory is bounded by `window_rows * windows_per_request` rows.
+    """
+    prefix, c1, r1, c2, r2 = split_a1_range(range_name)
+    url = f"{base_url}/spreadsheets/{sheet_id}/values:batchGet"
+    async with using_client(http) as client:
+        title = prefix[:-1]
+        if title.startswith("'") and title.endswith("'"):
+            title = title[1:-1].replace("''", "'")
+        grid_rows = await fetch_grid_rows(api_key, sheet_id, title, base_url, stats, client)
+        last = grid_rows if r2 is None else min(r2, grid_rows)
+
+        def window_start(i: int) -> int:
+            return r1 if i == 0 else r1 + 1 + (i - 1) * window_rows
+
+        def window_range(i: int) -> str:
+            start = window_start(i)
+            end = start if i == 0 else min(start + window_rows - 1, last)
+            return f"{prefix}{c1}{start}:{c2}{end}"
+
+        index = 0
+        while True:
+            indices = [i for i in range(index, index + windows_per_request) if window_start(i) <= last]
+            if not indices:
+                return
+            params = [("key", api_key), ("majorDimension", "ROWS")]
+            params += [("ranges", window_range(i)) for i in indices]
+            async with client.get(url, params=params, timeout=_timeout(30), headers=GZIP_HEADERS) as resp:
+                resp.raise_for_status()
+                body = await resp.read()
+                if stats is not None:
+                    stats.add_response(resp, len(body))
+            value_ranges = json.loads(body).get("valueRanges", [])
+            del body
+            for i, vr in zip(indices, value_ranges):
+                yield i, vr.get("values") or []
+            index += windows_per_request
+
+
+def window_hash(rows: List[List[str]]) -> str:
+    hasher = SheetHasher()
+    for row in rows:
+        hasher.update(row)
+    return hasher.hexdigest()
+
+
+class RowMapper:
+    """Maps raw sheet rows to ROW_FIELDS-ordered tuples.
+
+    The header row is resolved once; every data row is then a fixed
+    index lookup instead of a per-cell header dict lookup.
+    """
+
+    def __init__(self, header_row: List[str]):
+        self._slots: List[Tuple[int, int]] = []
+        for idx, header in enumerate(header_row):
+            dest = HEADER_MAP.get((header or "").strip())
+            if dest:
+                self._slots.append((idx, ROW_FIELDS.index(dest)))
+
+    def map(self, row: List[str]) -> SheetRow:
+        out = [""] * len(ROW_FIELDS)
+        size = len(row)
+        for idx, slot in self._slots:
+            if idx < size:
+                out[slot] = (row[idx] or "").strip()
+        return tuple(out)
+
+
+def row_to_dict(row: SheetRow) -> Dict[str, str]:
+    return dict(zip(ROW_FIELDS, row))
+
+
+async def iter_sheet_rows(values: AsyncIterator[List[str]], hasher: Optional[SheetHasher] = None) -> AsyncIterator[SheetRow]:
+    """Map a raw row stream to compact tuples, feeding the hasher on the way."""
+    mapper: Optional[RowMapper] = None
+    async for raw in values:
+        if hasher is not None:
+            hasher.update(raw)
+        if mapper is None:
+            mapper = RowMapper(raw)
+            continue
+        yield mapper.map(raw)
+
+
+class RowSpool:
+    """Buffer of mapped rows that spills to a temp file past `max_bytes`.
+
+    Lets the sync finish hashing the whole sheet before deciding to write,
+    without keeping every row in memory.
+    """
+
+    def __init__(self, max_bytes: int = 1024 * 1024):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_bytes, mode="w+b")
+        self._count = 0
+
+    def append(self, row: SheetRow) -> None:
+        self._file.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self._file.write(b"\n")
+        self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[SheetRow]:
+        self._file.seek(0)
+        for line in self._file:
+            yield tuple(json.loads(line))
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "RowSpool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,472 @@
+"""
+Local snapshot of the participants/teams/meta dataset for offline boots
+
+A snapshot is gzip-compressed JSON lines (BSON extended JSON, so ObjectId and
+datetime round-trip): one header line, then one line per document. When Mongo
+is unreachable the bot serves reads from it through `OfflineMongoManager` and
+journals writes to a pending file that is replayed once Mongo is back.
+"""
+from __future__ import annotations
+
+import copy
+import gzip
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import json_util
+
+from .mongo import MongoManager
+
+try:
+    from pymongo import ReturnDocument
+    from pymongo.errors import ConnectionFailure, DuplicateKeyError
+except Exception:  # pragma: no cover
+    ReturnDocument = None  # type: ignore
+    ConnectionFailure = OSError  # type: ignore
+    DuplicateKeyError = ValueError  # type: ignore
+
+
+SNAPSHOT_VERSION = 1
+COLLECTIONS = ("participants", "teams", "meta")
+# Meta keys that only make sense for the live database
+SKIP_META_PREFIXES = ("lease:",)
+
+_JSON_OPTS = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED, tz_aware=True, tzinfo=timezone.utc)
+
+
+def _dumps(obj: Any) -> str:
+    return json_util.dumps(obj, json_options=_JSON_OPTS, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(line: str) -> Any:
+    return json_util.loads(line, json_options=_JSON_OPTS)
+
+
+# ----- Export / load -----
+def export_snapshot(mongo: MongoManager, path: os.PathLike | str) -> Dict[str, int]:
+    """Dump participants, teams and meta to `path` atomically; returns per-collection counts."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    counts = {name: 0 for name in COLLECTIONS}
+
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        header = {
+            "type": "header",
+            "version": SNAPSHOT_VERSION,
+            "db": mongo.db_name,
+            "created_at": datetime.now(timezone.utc),
+        }
+        f.write(_dumps(header) + "\n")
+        for name in COLLECTIONS:
+            for doc in getattr(mongo, name).find({}):
+                if name == "meta" and str(doc.get("key", "")).startswith(SKIP_META_PREFIXES):
+                    continue
+                f.write(_dumps({"c": name, "d": doc}) + "\n")
+                counts[name] += 1
+    os.replace(tmp, path)
+    return counts
+
+
+def iter_snapshot(path: os.PathLike | str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (collection, document) pairs; the header is yielded as ("header", header)."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = _loads(line)
+            if entry.get("type") == "header":
+                if entry.get("version") != SNAPSHOT_VERSION:
+                    raise ValueError(f"Snapshot version {entry.get('version')} không được hỗ trợ")
+                yield "header", entry
+            else:
+                yield entry["c"], entry["d"]
+
+
+def restore_snapshot(mongo: MongoManager, path: os.PathLike | str, batch_size: int = 1000) -> Dict[str, int]:
+    """Upsert every snapshot document back into Mongo by `_id` (disaster recovery)."""
+    from pymongo import ReplaceOne
+
+    counts = {name: 0 for name in COLLECTIONS}
+    batches: Dict[str, list] = {name: [] for name in COLLECTIONS}
+
+    def flush(name: str):
+        if batches[name]:
+            getattr(mongo, name).bulk_write(batches[name], ordered=False)
+            counts[name] += len(batches[name])
+            batches[name] = []
+
+    for name, doc in iter_snapshot(path):
+        if name not in batches:
+            continue
+        batches[name].append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+        if len(batches[name]) >= batch_size:
+            flush(name)
+    for name in COLLECTIONS:
+        flush(name)
+    return counts
+
+
+# ----- Minimal query/update evaluation for the offline store -----
+_MISSING = object()
+
+
+def _get_path(doc: Dict[str, Any], dotted: str) -> Any:
+    cur: Any = doc
+    for part in dotted.split("."):
+        if not isinstance(cur, dict) or part not in cur:
+            return _MISSING
+        cur = cur[part]
+    return cur
+
+
+def _eq(value: Any, expected: Any) -> bool:
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def _match_cond(value: Any, cond: Any) -> bool:
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        present = value is not _MISSING
+        v = None if value is _MISSING else value
+        for op, arg in cond.items():
+            if op == "$eq" and not _eq(v, arg):
+                return False
+            if op == "$ne" and _eq(v, arg):
+                return False
+            if op == "$in" and not any(_eq(v, a) for a in arg):
+                return False
+            if op == "$nin" and any(_eq(v, a) for a in arg):
+                return False
+            if op == "$exists" and present != bool(arg):
+                return False
+            if op in ("$lt", "$lte", "$gt", "$gte"):
+                if not present or v is None:
+                    return False
+                try:
+                    ok = {"$lt": v < arg, "$lte": v <= arg, "$gt": v > arg, "$gte": v >= arg}[op]
+                except TypeError:
+                    return False
+                if not ok:
+                    return False
+        return True
+    return _eq(None if value is _MISSING else value, cond)
+
+
+def matches(doc: Dict[str, Any], flt: Optional[Dict[str, Any]]) -> bool:
+    for key, cond in (flt or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        elif not _match_cond(_get_path(doc, key), cond):
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> None:
+    """Apply the update operators the bot uses ($set, $unset, $inc, $addToSet, $push, $setOnInsert)."""
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for key, arg in fields.items():
+            if op in ("$set", "$setOnInsert"):
+                doc[key] = copy.deepcopy(arg)
+            elif op == "$unset":
+                doc.pop(key, None)
+            elif op == "$inc":
+                doc[key] = doc.get(key, 0) + arg
+            elif op == "$addToSet":
+                items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                current = doc.setdefault(key, [])
+                for item in items:
+                    if item not in current:
+                        current.append(item)
+            elif op == "$push":
+                items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                current = doc.setdefault(key, [])
+                current.extend(copy.deepcopy(items))
+                if isinstance(arg, dict) and "$slice" in arg:
+                    n = arg["$slice"]
+                    doc[key] = current[n:] if n < 0 else current[:n]
+            else:
+                raise ValueError(f"Toán tử {op} không hỗ trợ ở chế độ offline")
+
+
+class PendingJournal:
+    """Append-only JSON lines file of writes made while offline."""
+
+    def __init__(self, path: os.PathLike | str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.sealed = False
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        entry = dict(entry, at=datetime.now(timezone.utc))
+        line = _dumps(entry) + "\n"
+        with self._lock:
+            if self.sealed:
+                # The live database took over; a write here would never be replayed
+                raise ConnectionFailure("Đã chuyển sang MongoDB trực tuyến, không ghi vào bản offline")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def entries(self) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        with self.path.open("r", encoding="utf-8") as f:
+            return [_loads(line) for line in f if line.strip()]
+
+    def __len__(self) -> int:
+        if not self.path.exists():
+            return 0
+        with self.path.open("rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    def replace(self, entries: List[Dict[str, Any]]) -> None:
+        """Atomically rewrite the journal with `entries` (what is left to replay)."""
+        with self._lock:
+            if not entries:
+                self.path.unlink(missing_ok=True)
+                return
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(_dumps(entry) + "\n")
+            os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.replace([])
+
+    def drop(self, count: int) -> None:
+        """Remove the first `count` entries (replayed), keeping any appended since."""
+        with self._lock:
+            if not self.path.exists():
+                return
+            with self.path.open("r", encoding="utf-8") as f:
+                lines = [line for line in f if line.strip()]
+            rest = lines[count:]
+            if not rest:
+                self.path.unlink(missing_ok=True)
+                return
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                f.writelines(rest)
+            os.replace(tmp, self.path)
+
+    def seal(self) -> None:
+        """Refuse further appends, so a final replay sees every entry."""
+        with self._lock:
+            self.sealed = True
+
+
+class OfflineCollection:
+    """In-memory, snapshot-backed stand-in for the collection methods the bot calls.
+
+    Reads are served from memory. Writes are applied locally (so the bot's own
+    view stays consistent) and journaled for replay against the real database.
+    Single-field unique indexes are enforced like the server does (null and
+    missing values exempt), so callers relying on DuplicateKeyError behave the
+    same offline and no write is journaled that the server would reject.
+    """
+
+    def __init__(self, name: str, docs: List[Dict[str, Any]], journal: PendingJournal):
+        self.name = name
+        self._docs = docs
+        self._journal = journal
+        self._lock = threading.RLock()
+        self._unique: List[str] = []
+
+    # ----- Reads -----
+    def find(self, flt: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **_: Any):
+        with self._lock:
+            return iter([_project(d, projection) for d in self._docs if matches(d, flt)])
+
+    def find_one(self, flt: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **_: Any):
+        with self._lock:
+            for d in self._docs:
+                if matches(d, flt):
+                    return _project(d, projection)
+        return None
+
+    def count_documents(self, flt: Optional[Dict[str, Any]] = None, **_: Any) -> int:
+        with self._lock:
+            return sum(1 for d in self._docs if matches(d, flt))
+
+    def create_index(self, keys: Any, unique: bool = False, **kwargs: Any) -> None:
+        if unique and isinstance(keys, str) and keys not in self._unique:
+            self._unique.append(keys)
+
+    # ----- Writes -----
+    def _check_unique(self, doc: Dict[str, Any], replacing: Optional[Dict[str, Any]]) -> None:
+        for field in self._unique:
+            value = _get_path(doc, field)
+            if value is None or value is _MISSING:
+                continue
+            for other in self._docs:
+                if other is not replacing and _eq(_get_path(other, field), value):
+                    raise DuplicateKeyError(f"E11000 duplicate key error (offline): {self.name}.{field} = {value!r}")
+
+    def _update(self, flt: Dict[str, Any], update: Dict[str, Any], upsert: bool, many: bool):
+        matched = 0
+        upserted_id = None
+        before = None
+        for i, d in enumerate(self._docs):
+            if matches(d, flt):
+                updated = copy.deepcopy(d)
+                apply_update(updated, update)
+                self._check_unique(updated, d)
+                if before is None:
+                    before = d
+                self._docs[i] = updated
+                matched += 1
+                if not many:
+                    break
+        if not matched and upsert:
+            new_doc = {k: v for k, v in flt.items() if not k.startswith("$") and not isinstance(v, dict)}
+            apply_update(new_doc, update, inserting=True)
+            self._check_unique(new_doc, None)
+            from bson import ObjectId
+
+            new_doc.setdefault("_id", ObjectId())
+            self._docs.append(new_doc)
+            upserted_id = new_doc["_id"]
+        return matched, upserted_id, before
+
+    def _journal_write(self, op: str, flt: Dict[str, Any], update: Dict[str, Any], upsert: bool) -> None:
+        self._journal.append({"c": self.name, "op": op, "filter": flt, "update": update, "upsert": upsert})
+
+    def update_one(self, flt: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **_: Any):
+        with self._lock:
+            matched, upserted_id, _before = self._update(flt, update, upsert, many=False)
+            if matched or upserted_id is not None:
+                self._journal_write("update_one", flt, update, upsert)
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=upserted_id)
+
+    def update_many(self, flt: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **_: Any):
+        with self._lock:
+            matched, upserted_id, _before = self._update(flt, update, upsert, many=True)
+            if matched or upserted_id is not None:
+                self._journal_write("update_many", flt, update, upsert)
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=upserted_id)
+
+    def find_one_and_update(self, flt: Dict[str, Any], update: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+                            upsert: bool = False, return_document: Any = False, **_: Any):
+        with self._lock:
+            matched, upserted_id, before = self._update(flt, update, upsert, many=False)
+            if not matched and upserted_id is None:
+                return None
+            self._journal_write("update_one", flt, update, upsert)
+            if return_document == getattr(ReturnDocument, "AFTER", True):
+                key = {"_id": upserted_id} if upserted_id is not None else {"_id": before["_id"]}
+                return self.find_one(key, projection)
+            return _project(before, projection) if before is not None else None
+
+    def bulk_write(self, requests: Iterable[Any], ordered: bool = True, **_: Any):
+        matched = upserted = 0
+        for req in requests:
+            # pymongo UpdateOne/UpdateMany keep their arguments on private attributes
+            many = type(req).__name__ == "UpdateMany"
+            res = (self.update_many if many else self.update_one)(req._filter, req._doc, upsert=bool(req._upsert))
+            matched += res.matched_count
+            upserted += res.upserted_id is not None
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_count=upserted)
+
+
+class OfflineMongoManager(MongoManager):
+    """Read-mostly MongoManager served from a local snapshot while Mongo is unreachable.
+
+    Every MongoManager helper keeps working; writes land in the pending journal
+    and are replayed by `reconcile()` once a live manager is available.
+    """
+
+    offline = True
+
+    def __init__(self, snapshot_path: os.PathLike | str, pending_path: Optional[os.PathLike | str] = None):
+        # Deliberately skip MongoManager.__init__: no client, no ping
+        self.snapshot_path = Path(snapshot_path)
+        self.pending = PendingJournal(pending_path or self.snapshot_path.with_name(self.snapshot_path.name + ".pending.jsonl"))
+        docs: Dict[str, List[Dict[str, Any]]] = {name: [] for name in COLLECTIONS}
+        self.snapshot_header: Dict[str, Any] = {}
+        for name, doc in iter_snapshot(self.snapshot_path):
+            if name == "header":
+                self.snapshot_header = doc
+            elif name in docs:
+                docs[name].append(doc)
+
+        self.uri = None
+        self.db_name = self.snapshot_header.get("db") or "snapshot"
+        self.client = None
+        self.db = None
+        self.participants = OfflineCollection("participants", docs["participants"], self.pending)
+        self.teams = OfflineCollection("teams", docs["teams"], self.pending)
+        self.meta = OfflineCollection("meta", docs["meta"], self.pending)
+        self._ensure_indexes()
+
+        # Writes journaled by a previous offline run are re-applied locally
+        for entry in self.pending.entries():
+            coll = getattr(self, entry["c"], None)
+            if isinstance(coll, OfflineCollection):
+                try:
+                    coll._update(entry["filter"], entry["update"], entry.get("upsert", False), many=entry["op"] == "update_many")
+                except DuplicateKeyError as e:
+                    print(f"[SNAPSHOT] Bỏ qua ghi offline trùng khóa: {e}")
+
+    @property
+    def snapshot_created_at(self) -> Optional[datetime]:
+        return self.snapshot_header.get("created_at")
+
+    def is_healthy(self) -> bool:
+        return False
+
+    def close(self):
+        pass
+
+    def reconcile(self, online: MongoManager) -> Dict[str, int]:
+        """Replay journaled writes in order against a live manager.
+
+        Writes rejected by the server (e.g. a duplicate discord_id made online in
+        the meantime) are logged and dropped; on a connection failure the rest
+        of the journal is kept for the next attempt and the error is raised.
+        Only the replayed entries are removed: writes journaled meanwhile stay
+        for the next call (see `PendingJournal.seal` for the final one).
+        """
+        entries = self.pending.entries()
+        applied = failed = 0
+        for i, entry in enumerate(entries):
+            coll = getattr(online, entry["c"])
+            method = coll.update_many if entry["op"] == "update_many" else coll.update_one
+            try:
+                method(entry["filter"], entry["update"], upsert=entry.get("upsert", False))
+                applied += 1
+            except ConnectionFailure:
+                self.pending.drop(i)
+                raise
+            except Exception as e:
+                failed += 1
+                print(f"[SNAPSHOT] Không thể ghi lại {entry['c']} {entry['filter']}: {e}")
+        self.pending.drop(len(entries))
+        return {"applied": applied, "failed": failed}